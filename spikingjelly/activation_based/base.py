@@ -1,8 +1,12 @@
 import torch
 import torch.nn as nn
+import torch.utils.checkpoint
 import copy
 import logging
+import os
+import shutil
 from abc import abstractmethod
+from typing import Callable, Optional, Sequence
 
 try:
     import cupy
@@ -22,25 +26,34 @@ def check_backend_library(backend: str):
 
     .. _check_backend_library-cn:
 
-    :param backend: ``'torch'``, ``'cupy'`` 或 ``'lava'``
+    :param backend: ``'torch'``, ``'cupy'``, ``'cpp'``, ``'inductor'`` 或 ``'lava'``
     :type backend: str
 
-    检查某个后端的python库是否已经安装。若未安装则此函数会报错。
+    检查某个后端的python库是否已经安装。若未安装则此函数会报错。``'cpp'`` 后端需要C++编译器，``'inductor'`` 后端需要
+    支持 ``torch.compile`` 的PyTorch (>= 2.0)。
 
     * :ref:`中文 API <check_backend_library-cn>`
 
     .. _check_backend_library-en:
 
-    :param backend: ``'torch'``, ``'cupy'`` or ``'lava'``
+    :param backend: ``'torch'``, ``'cupy'``, ``'cpp'``, ``'inductor'`` or ``'lava'``
     :type backend: str
 
-    Check whether the python lib for backend is installed. If not, this function will raise an error.
+    Check whether the python lib for backend is installed. If not, this function will raise an error. The ``'cpp'`` backend
+    requires a C++ compiler, and the ``'inductor'`` backend requires PyTorch (>= 2.0) with ``torch.compile``.
     """
     if backend == 'torch':
         return
     elif backend == 'cupy':
         if cupy is None:
             raise ImportError('CuPy is not installed! You can install it from "https://github.com/cupy/cupy".')
+    elif backend == 'cpp':
+        if shutil.which(os.environ.get('CXX', 'c++')) is None:
+            raise ImportError('The C++ compiler is not found! The cpp backend uses it to compile the kernels by '
+                              '`torch.utils.cpp_extension.load_inline`. ')
+    elif backend == 'inductor':
+        if not hasattr(torch, 'compile'):
+            raise ImportError('`torch.compile` is not available! The inductor backend requires PyTorch >= 2.0. ')
     elif backend == 'lava':
         if slayer is None:
             raise ImportError('Lava-DL is not installed! You can install it from ' \
@@ -255,10 +268,10 @@ class MemoryModule(nn.Module, StepModule):
 
         """
 
-        T = x_seq.shape[0]
         y_seq = []
-        for t in range(T):
-            y = self.single_step_forward(x_seq[t], *args, **kwargs)
+        # unbind has one backward for all time-steps, while x_seq[t] creates a [T, N, *] gradient at each time-step
+        for x in x_seq.unbind(0):
+            y = self.single_step_forward(x, *args, **kwargs)
             y_seq.append(y.unsqueeze(0))
 
         return torch.cat(y_seq, 0)
@@ -306,22 +319,88 @@ class MemoryModule(nn.Module, StepModule):
         self._memories[name] = value
         self.set_reset_value(name, value)
 
-    def reset(self):
+    def reset(self, mask: Optional[torch.Tensor] = None):
         """
         * :ref:`API in English <MemoryModule.reset-en>`
 
         .. _MemoryModule.reset-cn:
 
-        重置所有有状态变量为默认值。
+        :param mask: ``shape = [N]`` 的布尔张量，``N`` 是batch大小。为 ``None`` 时重置整个batch
+        :type mask: Optional[torch.Tensor]
+
+        重置所有有状态变量为默认值。若给定 ``mask``，则只重置 ``mask[i] == True`` 的样本，其他样本的状态保持不变，
+        参见 :class:`masked_reset_memory <spikingjelly.activation_based.base.MemoryModule.masked_reset_memory>`。
+        例如在强化学习中，可以只重置已经结束的环境对应的状态。
 
         * :ref:`中文API <MemoryModule.reset-cn>`
 
         .. _MemoryModule.reset-en:
 
-        Reset all stateful variables to their default values.
+        :param mask: a bool tensor with ``shape = [N]``, where ``N`` is the batch size. If ``None``, the whole batch
+            will be reset
+        :type mask: Optional[torch.Tensor]
+
+        Reset all stateful variables to their default values. If ``mask`` is given, only samples with
+        ``mask[i] == True`` will be reset, and states of other samples are unchanged, see
+        :class:`masked_reset_memory <spikingjelly.activation_based.base.MemoryModule.masked_reset_memory>`. For
+        example, only states of the finished environments can be reset in reinforcement learning.
         """
-        for key in self._memories.keys():
-            self._memories[key] = copy.deepcopy(self._memories_rv[key])
+        if mask is None:
+            for key in self._memories.keys():
+                self._memories[key] = copy.deepcopy(self._memories_rv[key])
+        else:
+            for key in self._memories.keys():
+                self._memories[key] = self.masked_reset_memory(self._memories[key], self._memories_rv[key], mask)
+
+    @staticmethod
+    def masked_reset_memory(value, reset_value, mask: torch.Tensor):
+        """
+        * :ref:`API in English <MemoryModule.masked_reset_memory-en>`
+
+        .. _MemoryModule.masked_reset_memory-cn:
+
+        :param value: 有状态变量的当前值
+        :param reset_value: 有状态变量的重置值
+        :param mask: ``shape = [N]`` 的布尔张量
+        :type mask: torch.Tensor
+        :return: 将 ``mask`` 选中的样本重置后的值
+        :rtype: Any
+
+        ``value`` 是 ``shape = [N, *]`` 的张量时，返回 ``torch.where(mask, reset_value, value)`` （沿batch维度广播）。重置值为 ``None``
+        时（状态在第一次前向传播时才被创建，例如迹）使用0。``value`` 是列表或元组时（例如 :class:`Delay <spikingjelly.activation_based.layer.Delay>`
+        的队列），其中每个元素被选中的样本都会被置为0，与队列为空时的行为相同。其他的值（例如还没有被扩展为张量的浮点数）对所有样本都相同，
+        不会被修改。
+
+        * :ref:`中文API <MemoryModule.masked_reset_memory-cn>`
+
+        .. _MemoryModule.masked_reset_memory-en:
+
+        :param value: the current value of the stateful variable
+        :param reset_value: the reset value of the stateful variable
+        :param mask: a bool tensor with ``shape = [N]``
+        :type mask: torch.Tensor
+        :return: the value whose samples selected by ``mask`` are reset
+        :rtype: Any
+
+        If ``value`` is a tensor with ``shape = [N, *]``, ``torch.where(mask, reset_value, value)`` (broadcast along the
+        batch dimension) is returned. If the reset value is ``None`` (the state is created in the first forward, e.g., a
+        trace), 0 is used. If ``value`` is a list or a tuple (e.g., the queue of
+        :class:`Delay <spikingjelly.activation_based.layer.Delay>`), the selected samples of each element are set to 0,
+        which is the same as the behavior of an empty queue. Other values (e.g., a float that has not been expanded to a
+        tensor) are the same for all samples and are not modified.
+        """
+        if isinstance(value, torch.Tensor):
+            if value.dim() == 0 or value.shape[0] != mask.shape[0]:
+                return value
+            if reset_value is None:
+                reset_value = 0.
+            mask = mask.to(device=value.device, dtype=torch.bool).view(-1, *([1] * (value.dim() - 1)))
+            reset_value = torch.as_tensor(reset_value, dtype=value.dtype, device=value.device)
+            return torch.where(mask, reset_value, value)
+        elif isinstance(value, (list, tuple)):
+            return type(value)(MemoryModule.masked_reset_memory(item, None, mask) for item in value)
+        else:
+            return value
 
     def set_reset_value(self, name: str, value):
         self._memories_rv[name] = copy.deepcopy(value)
@@ -429,7 +508,8 @@ class MemoryModule(nn.Module, StepModule):
 
         for key in self._memories.keys():
             if isinstance(self._memories[key], torch.Tensor):
-                self._memories[key].detach_()
+                # the states can be views (e.g., v = v_seq[-1] in multi-step mode), which can not be detached in-place
+                self._memories[key] = self._memories[key].detach()
 
     def _apply(self, fn):
         for key, value in self._memories.items():
@@ -447,5 +527,264 @@ class MemoryModule(nn.Module, StepModule):
         return replica
 
 
+class StateArena:
+    def __init__(self, net: nn.Module):
+        """
+        * :ref:`API in English <StateArena.__init__-en>`
+
+        .. _StateArena.__init__-cn:
+
+        :param net: 任何属于 ``nn.Module`` 子类的网络
+        :type net: nn.Module
+
+        将网络中所有 :class:`MemoryModule <spikingjelly.activation_based.base.MemoryModule>` 的有状态变量放入一块连续的预分配内存
+        （按 ``dtype`` 和 ``device`` 分组，通常只有一组）中，每个变量都是这块内存的一个视图。创建后 ``net.state_arena = self``，
+        :class:`reset_net <spikingjelly.activation_based.functional.reset_net>` 和
+        :class:`detach_net <spikingjelly.activation_based.functional.detach_net>` 会自动使用它：
+
+        * 重置：对每组内存调用一次 ``fill_`` （所有重置值相同时）或 ``copy_`` ，然后将各个变量重新指向对应的视图，不再对每个变量进行
+          ``copy.deepcopy`` 和重新分配内存
+
+        * 分离：使用一次 ``torch._foreach_copy_`` 将当前状态复制到视图中，然后将各个变量重新指向视图
+
+        内存在第一次前向传播后根据状态的形状分配。若重置后的输入形状与分配时不同（例如最后一个batch更小），则该次重置退回到逐模块的重置，
+        并在前向传播后重新分配内存。重置值为 ``None`` 或张量、或前向传播后不是张量的变量不放入连续内存中，仍然使用逐模块的方式处理。
+
+        * :ref:`中文API <StateArena.__init__-cn>`
+
+        .. _StateArena.__init__-en:
+
+        :param net: Any network inherits from ``nn.Module``
+        :type net: nn.Module
+
+        Packs the stateful variables of all :class:`MemoryModule <spikingjelly.activation_based.base.MemoryModule>` in
+        the network into contiguous preallocated memory (grouped by ``dtype`` and ``device``, and there is usually only
+        one group), and each variable is a view of it. After creation, ``net.state_arena = self``, and
+        :class:`reset_net <spikingjelly.activation_based.functional.reset_net>` and
+        :class:`detach_net <spikingjelly.activation_based.functional.detach_net>` will use it automatically:
+
+        * reset: calls ``fill_`` (if all reset values are the same) or ``copy_`` once for each group, and then points each
+          variable to its view, without ``copy.deepcopy`` and re-allocating memory for each variable
+
+        * detach: copies the current states to the views by one ``torch._foreach_copy_``, and then points each variable
+          to its view
+
+        The memory is allocated after the first forward according to the shapes of the states. If the input shape after
+        a reset differs from that at allocation (e.g., the last batch is smaller), this reset falls back to the
+        module-wise reset, and the memory is re-allocated after the forward. Variables whose reset values are ``None``
+        or tensors, or which are not tensors after the forward, are not packed and are still handled module by module.
+
+        Codes example:
 
+        .. code-block:: python
 
+            net = nn.Sequential(layer.Linear(8, 4), neuron.LIFNode())
+            base.StateArena(net)
+            for x, label in train_data_loader:
+                y = net(x)
+                # ...
+                functional.reset_net(net)  # uses the arena
+        """
+        self.net = net
+        self.resettable_modules = []
+        self.memory_modules = []
+        for m in net.modules():
+            if isinstance(m, MemoryModule):
+                self.memory_modules.append(m)
+            elif hasattr(m, 'reset'):
+                self.resettable_modules.append(m)
+
+        # (module, memory name) of the packed memories
+        self.keys = []
+        self.unpacked_keys = []
+        self.views = []
+        # [(flat tensor, reset value or flat template)]
+        self.groups = []
+        self.input_shape = None
+        self.reset_pending = False
+        net.register_forward_pre_hook(self.forward_pre_hook)
+        net.register_forward_hook(self.forward_hook)
+        net.state_arena = self
+
+    @property
+    def allocated(self):
+        return len(self.groups) > 0
+
+    @staticmethod
+    def input_shape_of(args):
+        for arg in args:
+            if isinstance(arg, torch.Tensor):
+                return arg.shape
+        return None
+
+    def forward_pre_hook(self, module, args):
+        if self.reset_pending:
+            self.reset_pending = False
+            if self.input_shape_of(args) != self.input_shape:
+                # the views have the shapes of the last allocation, which can not be used for this input
+                self.release()
+                self.reset_modules()
+
+    def forward_hook(self, module, args, output):
+        if not self.allocated:
+            self.allocate(self.input_shape_of(args))
+
+    def allocate(self, input_shape):
+        keys = []
+        values = []
+        self.unpacked_keys = []
+        for m in self.memory_modules:
+            for name, value in m._memories.items():
+                reset_value = m._memories_rv[name]
+                if isinstance(value, torch.Tensor) and isinstance(reset_value, (int, float)) \
+                        and not isinstance(reset_value, bool):
+                    keys.append((m, name))
+                    values.append(value)
+                else:
+                    self.unpacked_keys.append((m, name))
+
+        self.keys = []
+        self.views = []
+        self.groups = []
+        groups = {}
+        for key, value in zip(keys, values):
+            groups.setdefault((value.dtype, value.device), []).append((key, value))
+
+        for (dtype, device), items in groups.items():
+            flat = torch.empty(sum(value.numel() for _, value in items), dtype=dtype, device=device)
+            reset_values = [key[0]._memories_rv[key[1]] for key, _ in items]
+            if all(rv == reset_values[0] for rv in reset_values):
+                template = reset_values[0]
+            else:
+                template = torch.cat([torch.full([value.numel()], rv, dtype=dtype, device=device)
+                                      for (_, value), rv in zip(items, reset_values)])
+            offset = 0
+            for key, value in items:
+                self.keys.append(key)
+                self.views.append(flat[offset: offset + value.numel()].view(value.shape))
+                offset += value.numel()
+            self.groups.append((flat, template))
+
+        self.input_shape = input_shape
+
+    def release(self):
+        self.keys = []
+        self.unpacked_keys = []
+        self.views = []
+        self.groups = []
+
+    def reset_modules(self):
+        for m in self.memory_modules:
+            m.reset()
+
+    def bind_views(self):
+        for (m, name), view in zip(self.keys, self.views):
+            m._memories[name] = view
+
+    def reset(self, mask: Optional[torch.Tensor] = None):
+        """
+        :param mask: a bool tensor with ``shape = [N]``. If not ``None``, only the selected samples will be reset
+        :type mask: Optional[torch.Tensor]
+
+        Resets all stateful variables of the network.
+        """
+        if mask is not None:
+            # the masked reset keeps states of other samples and can not be done by filling the arena
+            for m in self.memory_modules:
+                m.reset(mask)
+            return
+
+        for m in self.resettable_modules:
+            m.reset()
+
+        if not self.allocated:
+            self.reset_modules()
+            return
+
+        for m, name in self.unpacked_keys:
+            m._memories[name] = copy.deepcopy(m._memories_rv[name])
+
+        with torch.no_grad():
+            for flat, template in self.groups:
+                if isinstance(template, torch.Tensor):
+                    flat.copy_(template)
+                else:
+                    flat.fill_(template)
+        self.bind_views()
+        self.reset_pending = True
+
+    def detach(self):
+        """
+        Detaches all stateful variables of the network from the computation graph.
+        """
+        values = [m._memories[name] for m, name in self.keys]
+        if not self.allocated or any(not isinstance(value, torch.Tensor) or value.shape != view.shape
+                                     for value, view in zip(values, self.views)):
+            for m in self.memory_modules:
+                m.detach()
+            return
+
+        for m, name in self.unpacked_keys:
+            value = m._memories[name]
+            if isinstance(value, torch.Tensor):
+                m._memories[name] = value.detach()
+
+        with torch.no_grad():
+            torch._foreach_copy_(self.views, values)
+        self.bind_views()
+
+
+def checkpoint_memory_forward(function: Callable, x: torch.Tensor, memory_modules: Sequence[MemoryModule]):
+    """
+    * :ref:`API in English <checkpoint_memory_forward-en>`
+
+    .. _checkpoint_memory_forward-cn:
+
+    :param function: 以 ``x`` 为输入的函数，会读取并修改 ``memory_modules`` 的状态变量
+    :type function: Callable
+    :param x: 输入
+    :type x: torch.Tensor
+    :param memory_modules: ``function`` 使用的所有有状态的模块
+    :type memory_modules: Sequence[MemoryModule]
+    :return: ``function(x)``
+
+    使用 ``torch.utils.checkpoint`` 计算 ``function(x)``。前向传播时不保存中间变量，只保存 ``x`` 和 ``memory_modules`` 中所有状态
+    变量的初始值，反向传播时从这些初始值出发重新计算一遍 ``function(x)``。重新计算不会修改 ``memory_modules`` 的当前状态。
+
+    * :ref:`中文API <checkpoint_memory_forward-cn>`
+
+    .. _checkpoint_memory_forward-en:
+
+    :param function: a function whose input is ``x``, which reads and modifies the memories of ``memory_modules``
+    :type function: Callable
+    :param x: the input
+    :type x: torch.Tensor
+    :param memory_modules: all stateful modules used by ``function``
+    :type memory_modules: Sequence[MemoryModule]
+    :return: ``function(x)``
+
+    Computes ``function(x)`` with ``torch.utils.checkpoint``. The intermediate variables are not saved in forward. Only
+    ``x`` and the initial values of the memories of ``memory_modules`` are saved, and ``function(x)`` is recomputed from
+    them in backward. The recomputation does not modify the current states of ``memory_modules``.
+    """
+    keys = [(m, name) for m in memory_modules for name in m._memories.keys()]
+
+    def stateless_function(x: torch.Tensor, *states):
+        current_states = [m._memories[name] for m, name in keys]
+        for (m, name), value in zip(keys, states):
+            m._memories[name] = value
+        y = function(x)
+        next_states = tuple(m._memories[name] for m, name in keys)
+        # the recomputation in backward should not change the current states
+        for (m, name), value in zip(keys, current_states):
+            m._memories[name] = value
+        return (y,) + next_states
+
+    # early stop of the recomputation is implemented by raising an error in the unpack hook, which can not propagate
+    # through the TorchScript functions used by neurons
+    with torch.utils.checkpoint.set_checkpoint_early_stop(False):
+        outputs = torch.utils.checkpoint.checkpoint(stateless_function, x, *[m._memories[name] for m, name in keys],
+                                                    use_reentrant=False)
+    for (m, name), value in zip(keys, outputs[1:]):
+        m._memories[name] = value
+    return outputs[0]
@@ -0,0 +1,313 @@
+from typing import Callable, Optional, Union
+import logging
+import threading
+import torch
+
+try:
+    from torch.utils.cpp_extension import load_inline
+except BaseException as e:
+    logging.info(f'spikingjelly.activation_based.cpp_neuron_kernel: {e}')
+    load_inline = None
+
+
+cpp_sources = r'''
+#include <torch/extension.h>
+#include <ATen/Parallel.h>
+#include <ATen/OpMathType.h>
+#include <vector>
+
+// All neurons supported here share the linear charge
+//     H[t] = V[t-1] - decay * (V[t-1] - v_rest) + input_scale * X[t],
+// where v_rest = v_reset for hard reset and v_rest = 0 for soft reset.
+// IF:                      decay = 0,     input_scale = 1
+// LIF (decay_input=True):  decay = 1/tau, input_scale = 1/tau
+// LIF (decay_input=False): decay = 1/tau, input_scale = 1
+
+std::vector<at::Tensor> neuron_fptt(const at::Tensor & x_seq, const at::Tensor & v_init, const double v_th,
+    const double v_reset, const bool hard_reset, const double decay, const double input_scale)
+{
+    TORCH_CHECK(x_seq.device().is_cpu(), "x_seq must be a CPU tensor!");
+    TORCH_CHECK(x_seq.dim() == 2, "x_seq.shape should be [T, N]!");
+    const at::Tensor x = x_seq.contiguous();
+    const at::Tensor v0 = v_init.contiguous().to(x.scalar_type());
+    const int64_t T = x.size(0);
+    const int64_t N = x.size(1);
+    at::Tensor h_seq = at::empty_like(x);
+    at::Tensor spike_seq = at::empty_like(x);
+    at::Tensor v_seq = at::empty_like(x);
+
+    AT_DISPATCH_FLOATING_TYPES_AND2(at::kHalf, at::kBFloat16, x.scalar_type(), "neuron_fptt", [&] {
+        using acc_t = at::opmath_type<scalar_t>;
+        const scalar_t * x_ptr = x.data_ptr<scalar_t>();
+        const scalar_t * v0_ptr = v0.data_ptr<scalar_t>();
+        scalar_t * h_ptr = h_seq.data_ptr<scalar_t>();
+        scalar_t * s_ptr = spike_seq.data_ptr<scalar_t>();
+        scalar_t * v_ptr = v_seq.data_ptr<scalar_t>();
+        const acc_t th = (acc_t) v_th;
+        const acc_t vr = (acc_t) v_reset;
+        const acc_t v_rest = hard_reset ? vr : (acc_t) 0;
+        const acc_t k = (acc_t) decay;
+        const acc_t a = (acc_t) input_scale;
+
+        at::parallel_for(0, N, 2048, [&](int64_t begin, int64_t end) {
+            for (int64_t t = 0; t < T; t++)
+            {
+                const int64_t offset = t * N;
+                const scalar_t * v_last = (t == 0) ? v0_ptr : v_ptr + offset - N;
+                for (int64_t i = begin; i < end; i++)
+                {
+                    const acc_t v = (acc_t) v_last[i];
+                    const acc_t h = v - k * (v - v_rest) + a * (acc_t) x_ptr[offset + i];
+                    const acc_t s = (h >= th) ? (acc_t) 1 : (acc_t) 0;
+                    h_ptr[offset + i] = (scalar_t) h;
+                    s_ptr[offset + i] = (scalar_t) s;
+                    if (hard_reset)
+                    {
+                        v_ptr[offset + i] = (scalar_t) (h * ((acc_t) 1 - s) + vr * s);
+                    }
+                    else
+                    {
+                        v_ptr[offset + i] = (scalar_t) (h - th * s);
+                    }
+                }
+            }
+        });
+    });
+    return {h_seq, spike_seq, v_seq};
+}
+
+std::vector<at::Tensor> neuron_bptt(const at::Tensor & grad_spike_seq, const at::Tensor & grad_v_seq,
+    const at::Tensor & h_seq, const at::Tensor & grad_s_to_h, const at::Tensor & v_v_seq, const double v_th,
+    const double v_reset, const bool hard_reset, const bool detach_reset, const double decay,
+    const double input_scale, const bool decay_input, const bool requires_grad_decay)
+{
+    // v_v_seq[t] = V[t-1] with shape = [T, N]; it is only read when requires_grad_decay
+    const at::Tensor g_s = grad_spike_seq.contiguous();
+    const at::Tensor g_v = grad_v_seq.contiguous().to(g_s.scalar_type());
+    const at::Tensor h = h_seq.contiguous().to(g_s.scalar_type());
+    const at::Tensor sg = grad_s_to_h.contiguous().to(g_s.scalar_type());
+    const at::Tensor vv = requires_grad_decay ? v_v_seq.contiguous().to(g_s.scalar_type()) : h;
+    const int64_t T = g_s.size(0);
+    const int64_t N = g_s.size(1);
+    at::Tensor grad_x_seq = at::empty_like(g_s);
+    at::Tensor grad_v_init = at::empty({N}, g_s.options());
+    // accumulate the gradient of decay per neuron in float64 to avoid overflow and keep the result deterministic
+    at::Tensor grad_decay_per_neuron = at::zeros({requires_grad_decay ? N : 1}, g_s.options().dtype(at::kDouble));
+
+    AT_DISPATCH_FLOATING_TYPES_AND2(at::kHalf, at::kBFloat16, g_s.scalar_type(), "neuron_bptt", [&] {
+        using acc_t = at::opmath_type<scalar_t>;
+        const scalar_t * g_s_ptr = g_s.data_ptr<scalar_t>();
+        const scalar_t * g_v_ptr = g_v.data_ptr<scalar_t>();
+        const scalar_t * h_ptr = h.data_ptr<scalar_t>();
+        const scalar_t * sg_ptr = sg.data_ptr<scalar_t>();
+        const scalar_t * vv_ptr = vv.data_ptr<scalar_t>();
+        scalar_t * g_x_ptr = grad_x_seq.data_ptr<scalar_t>();
+        scalar_t * g_v0_ptr = grad_v_init.data_ptr<scalar_t>();
+        double * g_decay_ptr = grad_decay_per_neuron.data_ptr<double>();
+        const acc_t th = (acc_t) v_th;
+        const acc_t vr = (acc_t) v_reset;
+        const acc_t v_rest = hard_reset ? vr : (acc_t) 0;
+        const acc_t grad_h_next_to_v = (acc_t) 1 - (acc_t) decay;
+        const acc_t grad_h_to_x = (acc_t) input_scale;
+
+        at::parallel_for(0, N, 2048, [&](int64_t begin, int64_t end) {
+            const int64_t len = end - begin;
+            // grad_h holds dL/dH[t] for every neuron in [begin, end)
+            std::vector<acc_t> grad_h(len, (acc_t) 0);
+            for (int64_t t = T - 1; t >= 0; t--)
+            {
+                const int64_t offset = t * N;
+                for (int64_t j = 0; j < len; j++)
+                {
+                    const int64_t i = begin + j;
+                    const acc_t h_t = (acc_t) h_ptr[offset + i];
+                    const acc_t spike = (h_t >= th) ? (acc_t) 1 : (acc_t) 0;
+                    const acc_t grad_s = (acc_t) sg_ptr[offset + i];
+                    acc_t grad_v_to_h;
+                    if (hard_reset)
+                    {
+                        grad_v_to_h = (acc_t) 1 - spike;
+                        if (!detach_reset)
+                        {
+                            grad_v_to_h += (vr - h_t) * grad_s;
+                        }
+                    }
+                    else
+                    {
+                        grad_v_to_h = (acc_t) 1;
+                        if (!detach_reset)
+                        {
+                            grad_v_to_h -= th * grad_s;
+                        }
+                    }
+                    // grad_h[j] is dL/dH[t+1] now
+                    acc_t g = (grad_h[j] * grad_h_next_to_v + (acc_t) g_v_ptr[offset + i]) * grad_v_to_h
+                        + (acc_t) g_s_ptr[offset + i] * grad_s;
+                    grad_h[j] = g;
+                    g_x_ptr[offset + i] = (scalar_t) (g * grad_h_to_x);
+                    if (requires_grad_decay)
+                    {
+                        const acc_t v_last = (acc_t) vv_ptr[offset + i];
+                        acc_t grad_h_to_decay = v_rest - v_last;
+                        if (decay_input)
+                        {
+                            // dH/d(decay) = X[t] - (V[t-1] - v_rest) = (H[t] - V[t-1]) / decay
+                            grad_h_to_decay = (h_t - v_last) / (acc_t) decay;
+                        }
+                        g_decay_ptr[i] += (double) (g * grad_h_to_decay);
+                    }
+                }
+            }
+            for (int64_t j = 0; j < len; j++)
+            {
+                g_v0_ptr[begin + j] = (scalar_t) (grad_h[j] * grad_h_next_to_v);
+            }
+        });
+    });
+    return {grad_x_seq, grad_v_init, grad_decay_per_neuron.sum()};
+}
+'''
+
+_cpp_module = None
+_cpp_module_lock = threading.Lock()
+
+
+def get_cpp_module():
+    """
+    :return: the compiled C++ extension module, which has ``neuron_fptt`` and ``neuron_bptt``
+    :rtype: module
+
+    Compiles the C++ codes by ``torch.utils.cpp_extension.load_inline`` when it is called at the first time, and returns
+    the cached module in the following calls. The compiled library is also cached on disk by PyTorch, and
+    later processes will only load it.
+    """
+    global _cpp_module
+    if _cpp_module is None:
+        with _cpp_module_lock:
+            if _cpp_module is None:
+                if load_inline is None:
+                    raise ImportError('torch.utils.cpp_extension is not available!')
+                _cpp_module = load_inline(
+                    name='spikingjelly_cpp_neuron_kernel',
+                    cpp_sources=cpp_sources,
+                    functions=['neuron_fptt', 'neuron_bptt'],
+                    extra_cflags=['-O3', '-fopenmp'],
+                    extra_ldflags=['-fopenmp'],
+                    with_cuda=False
+                )
+    return _cpp_module
+
+
+def surrogate_grad(surrogate_function: Callable, x: torch.Tensor):
+    """
+    :param surrogate_function: the surrogate function of the neuron
+    :type surrogate_function: Callable
+    :param x: the input of the surrogate function, e.g., ``h_seq - v_th``
+    :type x: torch.Tensor
+    :return: the gradient of ``surrogate_function(x)`` to ``x``
+    :rtype: torch.Tensor
+
+    Calculates the surrogate gradient in a vectorized way. The backward function of ``surrogate_function`` is called
+    directly, so all surrogate functions (including user-defined ones) are supported.
+    """
+    with torch.enable_grad():
+        x = x.detach().requires_grad_(True)
+        return torch.autograd.grad(surrogate_function(x), x, torch.ones_like(x))[0]
+
+
+class NeuronATGF(torch.autograd.Function):
+    @staticmethod
+    def forward(ctx, x_seq: torch.Tensor, v_init: torch.Tensor, decay: Union[float, torch.Tensor], v_th: float,
+                v_reset: Optional[float], input_scale: Union[float, None], decay_input: bool, detach_reset: bool,
+                surrogate_function: Callable):
+        """
+        :param x_seq: ``shape = [T, N]``
+        :param v_init: ``shape = [N]``
+        :param decay: the decay of the neuron. If it is a tensor, its gradient will be calculated
+        :param v_th: the threshold voltage
+        :param v_reset: the reset voltage. ``None`` means soft reset
+        :param input_scale: the scale of input. If ``None``, ``input_scale = decay``
+        :param decay_input: whether the input will decay
+        :param detach_reset: whether detach the computation graph of reset in backward
+        :param surrogate_function: the surrogate function
+        :return: ``spike_seq, v_seq``
+        """
+        hard_reset = v_reset is not None
+        decay_f = float(decay)
+        input_scale = decay_f if input_scale is None else input_scale
+
+        h_seq, spike_seq, v_seq = get_cpp_module().neuron_fptt(x_seq, v_init, v_th, v_reset if hard_reset else 0.,
+                                                               hard_reset, decay_f, input_scale)
+
+        if x_seq.requires_grad or v_init.requires_grad or (isinstance(decay, torch.Tensor) and decay.requires_grad):
+            requires_grad_decay = isinstance(decay, torch.Tensor) and decay.requires_grad
+            if requires_grad_decay:
+                ctx.save_for_backward(h_seq, v_init, v_seq)
+            else:
+                ctx.save_for_backward(h_seq)
+            ctx.requires_grad_decay = requires_grad_decay
+            ctx.decay = decay_f
+            ctx.input_scale = input_scale
+            ctx.v_th = v_th
+            ctx.v_reset = v_reset
+            ctx.decay_input = decay_input
+            ctx.detach_reset = detach_reset
+            ctx.surrogate_function = surrogate_function
+            ctx.decay_dtype = decay.dtype if isinstance(decay, torch.Tensor) else None
+
+        return spike_seq, v_seq
+
+    @staticmethod
+    def backward(ctx, grad_spike_seq: torch.Tensor, grad_v_seq: torch.Tensor):
+        h_seq = ctx.saved_tensors[0]
+        if ctx.requires_grad_decay:
+            v_v_seq = torch.cat((ctx.saved_tensors[1].unsqueeze(0), ctx.saved_tensors[2][0: -1]))
+        else:
+            v_v_seq = h_seq
+
+        grad_s_to_h = surrogate_grad(ctx.surrogate_function, h_seq - ctx.v_th)
+        hard_reset = ctx.v_reset is not None
+        grad_x_seq, grad_v_init, grad_decay = get_cpp_module().neuron_bptt(
+            grad_spike_seq, grad_v_seq, h_seq, grad_s_to_h, v_v_seq, ctx.v_th,
+            ctx.v_reset if hard_reset else 0., hard_reset, ctx.detach_reset, ctx.decay, ctx.input_scale,
+            ctx.decay_input, ctx.requires_grad_decay)
+
+        if ctx.requires_grad_decay:
+            grad_decay = grad_decay.to(ctx.decay_dtype)
+        else:
+            grad_decay = None
+
+        return grad_x_seq, grad_v_init, grad_decay, None, None, None, None, None, None
+
+
+def multi_step_forward(x_seq: torch.Tensor, v_init: torch.Tensor, decay: Union[float, torch.Tensor], v_th: float,
+                       v_reset: Optional[float], decay_input: bool, detach_reset: bool, surrogate_function: Callable):
+    """
+    :param x_seq: the input with ``shape = [T, *]``
+    :type x_seq: torch.Tensor
+    :param v_init: the initial membrane potential with ``shape = x_seq.shape[1:]``
+    :type v_init: torch.Tensor
+    :param decay: ``1 / tau``. ``0.`` for the IF neuron, and a tensor with ``requires_grad = True`` for the PLIF neuron
+    :type decay: Union[float, torch.Tensor]
+    :param v_th: the threshold voltage
+    :type v_th: float
+    :param v_reset: the reset voltage. ``None`` means soft reset
+    :type v_reset: Optional[float]
+    :param decay_input: whether the input will decay
+    :type decay_input: bool
+    :param detach_reset: whether detach the computation graph of reset in backward
+    :type detach_reset: bool
+    :param surrogate_function: the surrogate function
+    :type surrogate_function: Callable
+    :return: ``spike_seq, v_seq`` with ``shape = x_seq.shape``
+    :rtype: tuple
+
+    Runs the forward (and then the backward) of the IF/LIF/PLIF neuron through all time-steps in one compiled C++ routine,
+    which is parallelized over neurons by ``at::parallel_for``. This function is used by the ``'cpp'`` backend of
+    :class:`spikingjelly.activation_based.neuron.IFNode`, :class:`spikingjelly.activation_based.neuron.LIFNode` and
+    :class:`spikingjelly.activation_based.neuron.ParametricLIFNode`.
+    """
+    input_scale = None if decay_input else 1.
+    spike_seq, v_seq = NeuronATGF.apply(x_seq.flatten(1), v_init.flatten(0), decay, v_th, v_reset, input_scale,
+                                        decay_input, detach_reset, surrogate_function)
+    return spike_seq.view(x_seq.shape), v_seq.view(x_seq.shape)
@@ -0,0 +1,101 @@
+import argparse
+import os
+import struct
+import tempfile
+import time
+import numpy as np
+from spikingjelly.datasets import load_aedat_v3
+
+'''
+Write a synthetic AEDAT 3.1 file and compare the throughput (MB/s) of the per-event `struct.unpack` parser used by
+older versions of SpikingJelly and the vectorized `spikingjelly.datasets.load_aedat_v3`. The file contains polarity
+packets, non-polarity packets (which are skipped), and empty packets. The outputs of the two parsers are checked to be
+the same.
+
+python -m spikingjelly.activation_based.examples.aedat_parser_benchmark -packets 200 -events 10000
+
+'''
+
+
+def load_aedat_v3_per_event(file_name: str):
+    # the parser of older versions, which decodes each event in a Python loop
+    with open(file_name, 'rb') as bin_f:
+        line = bin_f.readline()
+        while line.startswith(b'#'):
+            if line == b'#!END-HEADER\r\n':
+                break
+            else:
+                line = bin_f.readline()
+
+        txyp = {'t': [], 'x': [], 'y': [], 'p': []}
+        while True:
+            header = bin_f.read(28)
+            if not header or len(header) == 0:
+                break
+            e_type = struct.unpack('H', header[0:2])[0]
+            e_size = struct.unpack('I', header[4:8])[0]
+            e_tsoverflow = struct.unpack('I', header[12:16])[0]
+            e_capacity = struct.unpack('I', header[16:20])[0]
+            data = bin_f.read(e_capacity * e_size)
+            counter = 0
+            if e_type == 1:
+                while data[counter:counter + e_size]:
+                    aer_data = struct.unpack('I', data[counter:counter + 4])[0]
+                    timestamp = struct.unpack('I', data[counter + 4:counter + 8])[0] | e_tsoverflow << 31
+                    counter = counter + e_size
+                    txyp['x'].append((aer_data >> 17) & 0x00007FFF)
+                    txyp['y'].append((aer_data >> 2) & 0x00007FFF)
+                    txyp['t'].append(timestamp)
+                    txyp['p'].append((aer_data >> 1) & 0x00000001)
+        return {key: np.asarray(value) for key, value in txyp.items()}
+
+
+def write_synthetic_aedat(file_name: str, packets: int, events: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    with open(file_name, 'wb') as f:
+        f.write(b'#!AER-DAT3.1\r\n#Format: RAW\r\n#Source 1: DVS128\r\n#!END-HEADER\r\n')
+        for i in range(packets):
+            # polarity events with 8 bytes, or 12 bytes including padding
+            e_size = 8 if i % 2 == 0 else 12
+            n = events if i % 20 != 19 else 0
+            x = rng.integers(0, 128, n, dtype=np.uint32)
+            y = rng.integers(0, 128, n, dtype=np.uint32)
+            p = rng.integers(0, 2, n, dtype=np.uint32)
+            payload = np.zeros([n, e_size // 4], dtype='<u4')
+            payload[:, 0] = (x << 17) | (y << 2) | (p << 1) | 1
+            payload[:, 1] = np.sort(rng.integers(0, 1 << 31, n, dtype=np.uint32))
+            # e_type, e_source, e_size, e_offset, e_tsoverflow, e_capacity, e_number, e_valid
+            f.write(struct.pack('<HHIIIIII', 1, 1, e_size, 4, i % 3, n, n, n))
+            f.write(payload.tobytes())
+            if i % 10 == 0:
+                # a non-polarity packet, e.g., special events
+                f.write(struct.pack('<HHIIIIII', 0, 1, 8, 4, 0, 64, 64, 64))
+                f.write(bytes(8 * 64))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the AEDAT 3.1 parser')
+    parser.add_argument('-packets', default=200, type=int, help='the number of polarity packets')
+    parser.add_argument('-events', default=10000, type=int, help='the number of events in each polarity packet')
+    args = parser.parse_args()
+    print(args)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = os.path.join(tmp_dir, 'synthetic.aedat')
+        write_synthetic_aedat(file_name, args.packets, args.events)
+        size = os.path.getsize(file_name) / 1024 ** 2
+
+        results = {}
+        for name, fn in (('per-event', load_aedat_v3_per_event), ('vectorized', load_aedat_v3)):
+            t_start = time.perf_counter()
+            results[name] = fn(file_name)
+            used_time = time.perf_counter() - t_start
+            print(f'{name}: {size:.2f} MB in {used_time:.4f}s, {size / used_time:.2f} MB/s')
+
+        for key in ('t', 'x', 'y', 'p'):
+            assert np.array_equal(results['per-event'][key], results['vectorized'][key]), key
+        print(f'the outputs are the same, {results["vectorized"]["t"].size} events')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import torch
+import torch.nn as nn
+from spikingjelly import configure
+from spikingjelly.activation_based import neuron, layer, functional, surrogate
+
+'''
+Check that saving spikes as bool in the hard reset of the neuron's torch backend
+(`configure.save_spike_as_bool_in_neuron_kernel = True`) gives the same gradients as saving float spikes, and compare
+the bytes of tensors saved for backward.
+
+python -m spikingjelly.activation_based.examples.bool_spike_gradient_check -device cpu -T 16 -level 1
+
+'''
+
+
+def run(net: nn.Module, x_seq: torch.Tensor, step_mode: str):
+    n_bytes = [0]
+
+    def pack_hook(x: torch.Tensor):
+        n_bytes[0] += x.numel() * x.element_size()
+        return x
+
+    x_seq = x_seq.clone().requires_grad_(True)
+    functional.reset_net(net)
+    net.zero_grad()
+    with torch.autograd.graph.saved_tensors_hooks(pack_hook, lambda x: x):
+        if step_mode == 'm':
+            y = net(x_seq)
+        else:
+            y = torch.stack([net(x_seq[t]) for t in range(x_seq.shape[0])])
+    # a weighted sum makes the gradients depend on every time-step
+    (y * torch.arange(1, y.numel() + 1, device=y.device).view_as(y) / y.numel()).sum().backward()
+    return x_seq.grad, [p.grad.clone() for p in net.parameters()], n_bytes[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gradient check of saving spikes as bool in the hard reset')
+    parser.add_argument('-device', default='cpu', type=str)
+    parser.add_argument('-T', default=16, type=int)
+    parser.add_argument('-N', default=32, type=int, help='batch size')
+    parser.add_argument('-features', default=256, type=int)
+    parser.add_argument('-level', default=1, type=int, help='configure.save_bool_spike_level')
+    args = parser.parse_args()
+    print(args)
+
+    configure.save_bool_spike_level = args.level
+    torch.manual_seed(0)
+    net = nn.Sequential(
+        layer.Linear(args.features, args.features),
+        neuron.LIFNode(surrogate_function=surrogate.ATan()),
+        layer.Linear(args.features, args.features),
+        neuron.LIFNode(surrogate_function=surrogate.ATan()),
+        layer.Linear(args.features, args.features),
+        neuron.LIFNode(surrogate_function=surrogate.ATan()),
+    ).to(args.device)
+    x_seq = torch.rand([args.T, args.N, args.features], device=args.device) * 2.
+
+    for step_mode in ('s', 'm'):
+        functional.set_step_mode(net, step_mode)
+        configure.save_spike_as_bool_in_neuron_kernel = False
+        x_grad, w_grads, float_bytes = run(net, x_seq, step_mode)
+        configure.save_spike_as_bool_in_neuron_kernel = True
+        x_grad_b, w_grads_b, bool_bytes = run(net, x_seq, step_mode)
+        configure.save_spike_as_bool_in_neuron_kernel = False
+
+        x_error = (x_grad - x_grad_b).abs().max().item()
+        w_error = max((g - g_b).abs().max().item() for g, g_b in zip(w_grads, w_grads_b))
+        print(f'step_mode={step_mode}, max error of x.grad = {x_error}, max error of weight grads = {w_error}, '
+              f'saved MB: float = {float_bytes / 1024 ** 2:.2f}, bool = {bool_bytes / 1024 ** 2:.2f}')
+        assert x_error == 0. and w_error == 0.
+
+
+if __name__ == '__main__':
+    main()
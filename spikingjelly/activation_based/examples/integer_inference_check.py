@@ -0,0 +1,43 @@
+import argparse
+import torch
+import torch.nn as nn
+from spikingjelly.activation_based import neuron, layer, functional, integer_inference
+
+'''
+Check that the network converted by `integer_inference.to_integer_net` outputs almost the same spikes as the float
+network, for LIF neurons whose `tau` is a power of 2 (the decay only uses the shift) or not (the decay multiplies
+`decay_multiplier` before the shift, e.g., `tau = 3`). The large positive weights make the input of the neurons large,
+which checks that the membrane potential does not wrap around in the integer network.
+
+python -m spikingjelly.activation_based.examples.integer_inference_check -T 8 -N 16
+
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Spike agreement of the integer network and the float network')
+    parser.add_argument('-T', default=8, type=int)
+    parser.add_argument('-N', default=16, type=int, help='batch size')
+    parser.add_argument('-min-agreement', default=0.99, type=float)
+    args = parser.parse_args()
+    print(args)
+
+    torch.manual_seed(0)
+    for tau in (2., 3., 4., 5.):
+        fc = layer.Linear(784, 100)
+        fc.weight.data = fc.weight.data.abs() * 0.2
+        net = nn.Sequential(fc, neuron.LIFNode(tau=tau))
+        functional.set_step_mode(net, 'm')
+        net.eval()
+        x_seq = torch.rand([args.T, args.N, 784])
+        int_net = integer_inference.to_integer_net(net, x_calibration=x_seq)
+        with torch.no_grad():
+            functional.reset_net(net)
+            functional.reset_net(int_net)
+            agreement = (net(x_seq) == int_net(x_seq).float()).float().mean().item()
+        print(f'tau={tau}, {int_net[-1]}, spike agreement = {agreement:.4f}')
+        assert agreement >= args.min_agreement
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import torch
+from spikingjelly.activation_based import neuron, functional, cuda_utils
+
+'''
+Compare the memory and time of multi-step BPTT with `memory_mode='default'` and `memory_mode='recompute'`.
+
+The memory is measured by the total size of tensors saved for backward by the forward pass, which works on both CPU and
+CUDA. The tensors recomputed in backward are freed chunk by chunk and are not counted.
+
+python -m spikingjelly.activation_based.examples.recompute_benchmark -device cpu -N 4096 -T 64 256 1024
+
+'''
+
+
+def saved_bytes(net: neuron.BaseNode, x_seq: torch.Tensor):
+    n_bytes = [0]
+
+    def pack_hook(x: torch.Tensor):
+        n_bytes[0] += x.numel() * x.element_size()
+        return x
+
+    with torch.autograd.graph.saved_tensors_hooks(pack_hook, lambda x: x):
+        y_seq = net(x_seq)
+    y_seq.sum().backward()
+    functional.reset_net(net)
+    return n_bytes[0]
+
+
+def forward_backward(net: neuron.BaseNode, x_seq: torch.Tensor):
+    net(x_seq).sum().backward()
+    functional.reset_net(net)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the recompute memory mode')
+    parser.add_argument('-device', default='cpu', type=str)
+    parser.add_argument('-N', default=4096, type=int, help='number of neurons')
+    parser.add_argument('-T', default=[64, 256, 1024], type=int, nargs='+', help='numbers of time-steps')
+    parser.add_argument('-chunk', default=None, type=int, help='recompute chunk size, ceil(sqrt(T)) if not set')
+    parser.add_argument('-repeats', default=4, type=int)
+    args = parser.parse_args()
+    print(args)
+
+    print('T, memory_mode, saved MB, used time')
+    for T in args.T:
+        x_seq = (torch.rand([T, args.N], device=args.device) * 2.).requires_grad_()
+        for memory_mode in ('default', 'recompute'):
+            net = neuron.LIFNode(step_mode='m').to(args.device)
+            net.memory_mode = memory_mode
+            net.recompute_chunk_size = args.chunk
+            mb = saved_bytes(net, x_seq) / 1024 ** 2
+            t = cuda_utils.cal_fun_t(args.repeats, args.device, forward_backward, net, x_seq)
+            print(f'{T}, {memory_mode}, {mb:.2f}, {t:.4f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import warnings
+import torch
+from spikingjelly.activation_based import layer, cuda_utils
+
+'''
+Sweep the firing rate of the input spikes and compare the inference time of the dense computation and the
+sparse computation (`sparse_input='auto'`) of `layer.Linear` and `layer.Conv2d` on CPU. The results can be used to
+choose `sparse_threshold` for the CPU in use.
+
+python -m spikingjelly.activation_based.examples.sparse_input_benchmark -T 4 -N 32
+
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the sparse input of Linear and Conv2d')
+    parser.add_argument('-T', default=4, type=int)
+    parser.add_argument('-N', default=32, type=int, help='batch size')
+    parser.add_argument('-features', default=1024, type=int, help='in/out features of Linear')
+    parser.add_argument('-channels', default=128, type=int, help='in/out channels of Conv2d')
+    parser.add_argument('-size', default=16, type=int, help='height and width of the input of Conv2d')
+    parser.add_argument('-rates', default=[0.001, 0.003, 0.01, 0.03, 0.1, 0.3], type=float, nargs='+',
+                        help='firing rates')
+    parser.add_argument('-repeats', default=8, type=int)
+    args = parser.parse_args()
+    print(args)
+
+    # the sparse CSR tensor used by Linear warns that it is in beta state
+    warnings.filterwarnings('ignore', message='Sparse CSR tensor support is in beta state')
+
+    fc = layer.Linear(args.features, args.features, step_mode='m', sparse_threshold=1.)
+    conv = layer.Conv2d(args.channels, args.channels, kernel_size=3, padding=1, step_mode='m', sparse_threshold=1.)
+    shapes = {
+        'Linear': [args.T, args.N, args.features],
+        'Conv2d': [args.T, args.N, args.channels, args.size, args.size]
+    }
+
+    print('layer, firing rate, dense, sparse, speedup')
+    with torch.no_grad():
+        for name, net in (('Linear', fc), ('Conv2d', conv)):
+            for rate in args.rates:
+                x_seq = (torch.rand(shapes[name]) < rate).float()
+                net.sparse_input = None
+                t_dense = cuda_utils.cal_fun_t(args.repeats, 'cpu', net, x_seq)
+                net.sparse_input = 'auto'
+                t_sparse = cuda_utils.cal_fun_t(args.repeats, 'cpu', net, x_seq)
+                print(f'{name}, {rate}, {t_dense:.4f}, {t_sparse:.4f}, {t_dense / t_sparse:.2f}')
+
+
+if __name__ == '__main__':
+    main()
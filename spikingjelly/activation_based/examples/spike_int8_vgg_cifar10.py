@@ -0,0 +1,81 @@
+import argparse
+import copy
+import time
+import torch
+import torch.utils.data as data
+from spikingjelly.activation_based import neuron, functional, spike_op, integer_inference
+from spikingjelly.activation_based.model import spiking_vgg
+
+'''
+Compare the accuracy and the latency of the float Spiking VGG and the one whose spike-driven linear/conv layers are
+replaced by `spike_op.QuantizedSpikeLinear/QuantizedSpikeConv2d` (int8 weights and int32 accumulation) on CIFAR-10.
+
+python -m spikingjelly.activation_based.examples.spike_int8_vgg_cifar10 -data-dir /datasets/CIFAR10 -checkpoint ./vgg11_bn.pth -T 4
+
+If `-data-dir` is not given, random inputs are used, and only the latency and the agreement are meaningful.
+
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='int8 spike-driven layers on Spiking VGG')
+    parser.add_argument('-data-dir', type=str, help='root dir of the CIFAR-10 dataset')
+    parser.add_argument('-checkpoint', type=str, help='path of the state dict of the float network')
+    parser.add_argument('-T', default=4, type=int)
+    parser.add_argument('-b', default=32, type=int, help='batch size')
+    parser.add_argument('-n-batches', default=8, type=int, help='the number of test batches, -1 for the whole test set')
+    parser.add_argument('-sparse-threshold', default=0.004, type=float)
+    args = parser.parse_args()
+    print(args)
+
+    net = spiking_vgg.spiking_vgg11_bn(spiking_neuron=neuron.IFNode, num_classes=10)
+    functional.set_step_mode(net, 'm')
+    if args.checkpoint is not None:
+        net.load_state_dict(torch.load(args.checkpoint, map_location='cpu'))
+    net.eval()
+
+    if args.data_dir is not None:
+        import torchvision
+        import torchvision.transforms as transforms
+        transform = transforms.Compose([
+            transforms.ToTensor(),
+            transforms.Normalize((0.4914, 0.4822, 0.4465), (0.2023, 0.1994, 0.2010)),
+        ])
+        test_set = torchvision.datasets.CIFAR10(root=args.data_dir, train=False, transform=transform, download=True)
+    else:
+        test_set = data.TensorDataset(torch.randn([args.b * max(args.n_batches, 1), 3, 32, 32]),
+                                      torch.randint(0, 10, [args.b * max(args.n_batches, 1)]))
+    if args.n_batches > 0:
+        test_set = data.Subset(test_set, range(min(len(test_set), args.b * args.n_batches)))
+    test_loader = data.DataLoader(test_set, batch_size=args.b, shuffle=False)
+
+    def forward_fn(module, x):
+        return module(x.unsqueeze(0).repeat(args.T, 1, 1, 1, 1)).mean(0)
+
+    x_calibration, _ = next(iter(test_loader))
+    q_net = copy.deepcopy(net)
+    report = spike_op.calibrate_quantized_spike_layers(q_net, x_calibration.unsqueeze(0).repeat(args.T, 1, 1, 1, 1),
+                                                       sparse_threshold=args.sparse_threshold)
+    for name, (clip_ratio, mse) in report.items():
+        print(f'{name}: clip_ratio={clip_ratio}, mse={mse:.3e}')
+
+    accuracy = integer_inference.compare_accuracy(net, q_net, test_loader, forward_fn)
+    print(f'float accuracy={accuracy["float_accuracy"]:.4f}, int8 accuracy={accuracy["integer_accuracy"]:.4f}, '
+          f'agreement={accuracy["agreement"]:.4f}')
+
+    weight_bytes = lambda m: sum(t.numel() * t.element_size() for t in list(m.parameters()) + list(m.buffers()))
+    print(f'float weights: {weight_bytes(net) / 1024 ** 2:.2f} MB, int8 weights: {weight_bytes(q_net) / 1024 ** 2:.2f} MB')
+
+    with torch.no_grad():
+        for name, m in (('float', net), ('int8', q_net)):
+            forward_fn(m, x_calibration)
+            functional.reset_net(m)
+            t_start = time.perf_counter()
+            for x, _ in test_loader:
+                forward_fn(m, x)
+                functional.reset_net(m)
+            print(f'{name} latency per batch: {(time.perf_counter() - t_start) / len(test_loader) * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
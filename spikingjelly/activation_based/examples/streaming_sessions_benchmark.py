@@ -0,0 +1,60 @@
+import argparse
+import copy
+import time
+import torch
+import torch.nn as nn
+from spikingjelly.activation_based import neuron, layer, functional, streaming
+
+'''
+Compare the time of serving many streams with single-step inference by one model copy per stream and by
+`streaming.SessionManager`, which batches the states of all active streams and runs one forward call per tick.
+
+python -m spikingjelly.activation_based.examples.streaming_sessions_benchmark -sessions 1 16 64 -ticks 64
+
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the multi-session streaming runtime')
+    parser.add_argument('-device', default='cpu', type=str)
+    parser.add_argument('-sessions', default=[1, 16, 64], type=int, nargs='+', help='numbers of concurrent sessions')
+    parser.add_argument('-ticks', default=64, type=int)
+    parser.add_argument('-features', default=256, type=int)
+    args = parser.parse_args()
+    print(args)
+
+    net = nn.Sequential(
+        layer.Linear(args.features, args.features),
+        neuron.LIFNode(),
+        layer.Linear(args.features, args.features),
+        neuron.LIFNode(),
+        layer.Linear(args.features, 10),
+    ).to(args.device)
+
+    print('sessions, one copy per session, session manager, speedup')
+    with torch.no_grad():
+        for n in args.sessions:
+            x = torch.rand([args.ticks, n, args.features], device=args.device)
+
+            copies = [copy.deepcopy(net) for _ in range(n)]
+            t_start = time.perf_counter()
+            for t in range(args.ticks):
+                for i in range(n):
+                    copies[i](x[t, i: i + 1])
+            t_copies = time.perf_counter() - t_start
+
+            functional.reset_net(net)
+            manager = streaming.SessionManager(net, max_sessions=n)
+            for i in range(n):
+                manager.open_session(i)
+            session_ids = list(range(n))
+            t_start = time.perf_counter()
+            for t in range(args.ticks):
+                manager.step(session_ids, x[t])
+            t_manager = time.perf_counter() - t_start
+
+            print(f'{n}, {t_copies:.4f}, {t_manager:.4f}, {t_copies / t_manager:.2f}')
+
+
+if __name__ == '__main__':
+    main()
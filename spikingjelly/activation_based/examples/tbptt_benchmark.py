@@ -0,0 +1,110 @@
+import argparse
+import time
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from spikingjelly.activation_based import neuron, layer, functional, surrogate
+
+'''
+Compare the peak memory and the throughput of full BPTT and truncated BPTT (`functional.tbptt_train`) on a long
+sequence.
+
+The peak memory is measured by `torch.cuda.max_memory_allocated` on CUDA. On CPU, it is measured by the largest total
+size of tensors saved for one backward, which are freed after the backward.
+
+python -m spikingjelly.activation_based.examples.tbptt_benchmark -device cpu -T 2048 -k1 64 -k2 64 128
+
+'''
+
+
+def build_net(features: int, device: str):
+    net = nn.Sequential(
+        layer.Linear(features, features),
+        neuron.LIFNode(surrogate_function=surrogate.ATan()),
+        layer.Linear(features, features),
+        neuron.LIFNode(surrogate_function=surrogate.ATan()),
+        layer.Linear(features, 2),
+    )
+    functional.set_step_mode(net, 'm')
+    return net.to(device)
+
+
+def measure(device: str, train_fn, optimizer: torch.optim.Optimizer):
+    n_bytes = [0, 0]
+
+    def pack_hook(x: torch.Tensor):
+        n_bytes[0] += x.numel() * x.element_size()
+        return x
+
+    def step_pre_hook(optimizer, args, kwargs):
+        # the saved tensors of this backward are freed after the step
+        n_bytes[1] = max(n_bytes[1], n_bytes[0])
+        n_bytes[0] = 0
+
+    handle = optimizer.register_step_pre_hook(step_pre_hook)
+    if device.startswith('cuda'):
+        torch.cuda.synchronize(device)
+        torch.cuda.reset_peak_memory_stats(device)
+    t_start = time.perf_counter()
+    with torch.autograd.graph.saved_tensors_hooks(pack_hook, lambda x: x):
+        train_fn()
+    if device.startswith('cuda'):
+        torch.cuda.synchronize(device)
+        peak = torch.cuda.max_memory_allocated(device)
+    else:
+        peak = n_bytes[1]
+    used_time = time.perf_counter() - t_start
+    handle.remove()
+    return peak / 1024 ** 2, used_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of full BPTT and truncated BPTT')
+    parser.add_argument('-device', default='cpu', type=str)
+    parser.add_argument('-T', default=2048, type=int)
+    parser.add_argument('-N', default=32, type=int, help='batch size')
+    parser.add_argument('-features', default=256, type=int)
+    parser.add_argument('-k1', default=64, type=int)
+    parser.add_argument('-k2', default=[64, 128], type=int, nargs='+')
+    args = parser.parse_args()
+    print(args)
+
+    x_seq = torch.rand([args.T, args.N, args.features])
+    target_seq = torch.rand([args.T, args.N, 2])
+    if args.device.startswith('cuda'):
+        x_seq = x_seq.pin_memory()
+        target_seq = target_seq.pin_memory()
+
+    print('method, peak MB, used time, time-steps per second')
+
+    net = build_net(args.features, args.device)
+    optimizer = torch.optim.SGD(net.parameters(), lr=0.01)
+    # warm up the jit functions of neurons, which are compiled in the first calls
+    for _ in range(3):
+        functional.tbptt_train(net, optimizer, x_seq[0: args.k1], target_seq[0: args.k1], args.k1)
+        functional.reset_net(net)
+
+    def full_bptt():
+        loss = F.mse_loss(net(x_seq.to(args.device)), target_seq.to(args.device))
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        functional.reset_net(net)
+
+    mb, t = measure(args.device, full_bptt, optimizer)
+    print(f'full BPTT, {mb:.2f}, {t:.4f}, {args.T / t:.1f}')
+
+    for k2 in args.k2:
+        net = build_net(args.features, args.device)
+        optimizer = torch.optim.SGD(net.parameters(), lr=0.01)
+
+        def tbptt():
+            functional.tbptt_train(net, optimizer, x_seq, target_seq, args.k1, k2)
+            functional.reset_net(net)
+
+        mb, t = measure(args.device, tbptt, optimizer)
+        print(f'TBPTT(k1={args.k1}, k2={k2}), {mb:.2f}, {t:.4f}, {args.T / t:.1f}')
+
+
+if __name__ == '__main__':
+    main()
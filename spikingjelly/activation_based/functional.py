@@ -1,43 +1,90 @@
 import logging
 import copy
+import json
+import os
+import platform
+import re
 import torch
+import torch.fx
 import torch.nn as nn
 import torch.nn.functional as F
 import math
-from typing import Callable, Union
+from typing import Any, Callable, Optional, Union
 
-from . import neuron, base
+from . import neuron, base, spike_tensor, cuda_utils, cpp_neuron_kernel
+from .. import configure
 
 from torch import Tensor
 
-def reset_net(net: nn.Module):
+def reset_net(net: nn.Module, mask: Optional[Tensor] = None):
     """
     * :ref:`API in English <reset_net-en>`
 
     .. _reset_net-cn:
 
     :param net: 任何属于 ``nn.Module`` 子类的网络
+    :param mask: ``shape = [N]`` 的布尔张量。为 ``None`` 时重置整个batch，否则只重置 ``mask[i] == True`` 的样本
+    :type mask: Optional[torch.Tensor]
 
     :return: None
 
     将网络的状态重置。做法是遍历网络中的所有 ``Module``，若 ``m `` 为 ``base.MemoryModule`` 函数或者是拥有 ``reset()`` 方法，则调用 ``m.reset()``。
+    若网络使用了 :class:`StateArena <spikingjelly.activation_based.base.StateArena>`，则调用 ``net.state_arena.reset()``。
+
+    给定 ``mask`` 时，对所有 ``base.MemoryModule`` 调用 ``m.reset(mask)``，只重置被选中的样本的状态，参见
+    :class:`MemoryModule.reset <spikingjelly.activation_based.base.MemoryModule.reset>`。例如在向量化的强化学习环境中，
+    可以只重置 ``done`` 的环境对应的状态：
+
+    .. code-block:: python
+
+        for t in range(steps):
+            action = net(state)
+            state, reward, done, info = envs.step(action)
+            functional.reset_net(net, mask=torch.as_tensor(done))
 
     * :ref:`中文API <reset_net-cn>`
 
     .. _reset_net-en:
 
     :param net: Any network inherits from ``nn.Module``
+    :param mask: a bool tensor with ``shape = [N]``. If ``None``, the whole batch will be reset. Otherwise, only
+        samples with ``mask[i] == True`` will be reset
+    :type mask: Optional[torch.Tensor]
 
     :return: None
 
     Reset the whole network.  Walk through every ``Module`` as ``m``, and call ``m.reset()`` if this ``m`` is ``base.MemoryModule`` or ``m`` has ``reset()``.
+    If the network uses :class:`StateArena <spikingjelly.activation_based.base.StateArena>`, ``net.state_arena.reset()`` is called.
+
+    If ``mask`` is given, ``m.reset(mask)`` is called for all ``base.MemoryModule``, and only states of the selected
+    samples are reset, see :class:`MemoryModule.reset <spikingjelly.activation_based.base.MemoryModule.reset>`. For
+    example, only states of the ``done`` environments in vectorized reinforcement learning environments can be reset:
+
+    .. code-block:: python
+
+        for t in range(steps):
+            action = net(state)
+            state, reward, done, info = envs.step(action)
+            functional.reset_net(net, mask=torch.as_tensor(done))
     """
+    state_arena = getattr(net, 'state_arena', None)
+    if isinstance(state_arena, base.StateArena):
+        state_arena.reset(mask)
+        return
+
     for m in net.modules():
         if hasattr(m, 'reset'):
             if not isinstance(m, base.MemoryModule):
+                if mask is not None:
+                    logging.warning(f'Skipping `reset()` of {m} with mask, which is not spikingjelly.activation_based'
+                                    f'.base.MemoryModule')
+                    continue
                 logging.warning(f'Trying to call `reset()` of {m}, which is not spikingjelly.activation_based.base'
                                 f'.MemoryModule')
-            m.reset()
+            if mask is None:
+                m.reset()
+            else:
+                m.reset(mask)
 
 def set_step_mode(net: nn.Module, step_mode: str):
     """
@@ -106,6 +153,210 @@ def set_step_mode(net: nn.Module, step_mode: str):
                 m.step_mode = step_mode
 
 
+def _is_stateless(m: nn.Module):
+    return not any(isinstance(sub, base.MemoryModule) for sub in m.modules())
+
+
+def _plan_per_step_container(container: nn.Sequential):
+    from . import layer
+    planned = []
+    batched = []
+    stateless_run = []
+    stateful_run = []
+
+    def flush():
+        if len(stateless_run) > 0:
+            planned.append(layer.SeqToANNContainer(*stateless_run))
+            stateless_run.clear()
+        if len(stateful_run) > 0:
+            planned.append(layer.MultiStepContainer(*stateful_run))
+            stateful_run.clear()
+
+    for m in container:
+        supports_multi_step = isinstance(m, base.StepModule) and 'm' in m.supported_step_mode()
+        if supports_multi_step and m.step_mode == 's':
+            # this module has its own multi-step implementation, which is batched (stateless layers) or uses fused
+            # kernels (neurons)
+            flush()
+            m.step_mode = 'm'
+            planned.append(m)
+            batched.append(m)
+        elif _is_stateless(m):
+            if len(stateful_run) > 0:
+                flush()
+            stateless_run.append(m)
+            batched.append(m)
+        else:
+            if len(stateless_run) > 0:
+                flush()
+            stateful_run.append(m)
+    flush()
+    return planned, batched
+
+
+def _merge_seq_to_ann_containers(seq: nn.Sequential):
+    from . import layer
+    keys = list(seq._modules.keys())
+    i = 1
+    while i < len(keys):
+        m_pre = seq._modules[keys[i - 1]]
+        m = seq._modules[keys[i]]
+        if type(m_pre) is layer.SeqToANNContainer and type(m) is layer.SeqToANNContainer:
+            seq._modules[keys[i - 1]] = layer.SeqToANNContainer(*m_pre, *m)
+            del seq._modules[keys[i]]
+            keys.pop(i)
+        else:
+            i += 1
+
+
+def plan_step_mode(net: nn.Module, T: Optional[int] = None):
+    """
+    * :ref:`API in English <plan_step_mode-en>`
+
+    .. _plan_step_mode-cn:
+
+    :param net: 在多步模式下使用的网络，会被原地修改
+    :type net: nn.Module
+    :param T: 时间步数。若给定，则估计节省的模块调用次数
+    :type T: Optional[int]
+    :return: 规划报告，包含 ``'removed_loops'`` (被消除的逐时间步循环数量)、``'remaining_loops'`` (保留的逐时间步循环数量)、
+        ``'batched_modules'`` (从逐时间步循环中移出的模块) 和 ``'saved_calls'`` (每次前向传播节省的模块调用次数的估计，即
+        ``(T - 1) * 只运行一次的被移出的叶子模块数量``，未给定 ``T`` 时为 ``None``。只运行一次的模块是无状态模块和后端不为
+        ``'torch'`` 的神经元；``'torch'`` 后端的神经元在多步模式下仍然逐时间步调用，因此不被计入。此数值是模块调用次数，而非
+        kernel的启动次数)
+    :rtype: dict
+
+    单步模式的模块在多步模式的网络中需要使用
+    :class:`MultiStepContainer <spikingjelly.activation_based.layer.MultiStepContainer>` 包装，其前向传播是在Python中
+    对时间步的循环，每个时间步都会调用一次其中的每个模块。本函数检查 ``net`` 中的所有
+    :class:`MultiStepContainer <spikingjelly.activation_based.layer.MultiStepContainer>` 以及多步模式且 ``stateful=True`` 的
+    :class:`StepModeContainer <spikingjelly.activation_based.layer.StepModeContainer>`，将其中的子模块重新规划为：
+
+    * 支持多步模式的模块（例如神经元、``layer`` 中的无状态层），被设置为多步模式并移出循环
+    * 连续的无状态模块，被合并为一个 :class:`SeqToANNContainer <spikingjelly.activation_based.layer.SeqToANNContainer>`，
+      在 ``[T * N, ...]`` 的输入上运行一次
+    * 连续的不支持多步模式的有状态模块，仍然使用 :class:`MultiStepContainer <spikingjelly.activation_based.layer.MultiStepContainer>`
+      逐时间步运行
+
+    最后，``net`` 中所有 ``nn.Sequential`` 中相邻的 ``SeqToANNContainer`` 会被合并，以减少 ``flatten`` 与 ``unflatten``。
+
+    .. note::
+
+        ``BatchNorm`` 等层在 ``SeqToANNContainer`` 中以 ``T * N`` 作为batch大小计算统计量，这与
+        :class:`spikingjelly.activation_based.layer.BatchNorm2d` 在多步模式下的行为相同，但与逐时间步计算不同。
+
+    * :ref:`中文 API <plan_step_mode-cn>`
+
+    .. _plan_step_mode-en:
+
+    :param net: the network used in the multi-step mode, which will be modified in-place
+    :type net: nn.Module
+    :param T: the number of time-steps. If given, the number of saved module calls is estimated
+    :type T: Optional[int]
+    :return: the plan report with ``'removed_loops'`` (the number of removed per-time-step loops), ``'remaining_loops'``
+        (the number of kept per-time-step loops), ``'batched_modules'`` (the modules moved out of per-time-step loops),
+        and ``'saved_calls'`` (the estimated number of module calls saved in each forward, which is
+        ``(T - 1) * the number of moved leaf modules that run once``, or ``None`` if ``T`` is not given. The modules
+        that run once are stateless modules and neurons whose backend is not ``'torch'``. Neurons with the ``'torch'``
+        backend are not counted, because they are still called step-by-step in the multi-step mode. Note that this
+        number counts module calls, rather than kernel launches)
+    :rtype: dict
+
+    Single-step modules in a multi-step network have to be wrapped by
+    :class:`MultiStepContainer <spikingjelly.activation_based.layer.MultiStepContainer>`, whose forward is a Python loop
+    over time-steps that calls each module once at every time-step. This function inspects all
+    :class:`MultiStepContainer <spikingjelly.activation_based.layer.MultiStepContainer>` and
+    :class:`StepModeContainer <spikingjelly.activation_based.layer.StepModeContainer>` with ``stateful=True`` in the
+    multi-step mode, and re-plans their sub-modules as:
+
+    * modules that support the multi-step mode (e.g., neurons and stateless layers in ``layer``) are set to the
+      multi-step mode and moved out of the loop
+    * consecutive stateless modules are merged into one
+      :class:`SeqToANNContainer <spikingjelly.activation_based.layer.SeqToANNContainer>`, which runs once on the input
+      with ``shape = [T * N, ...]``
+    * consecutive stateful modules that do not support the multi-step mode are still run step-by-step by
+      :class:`MultiStepContainer <spikingjelly.activation_based.layer.MultiStepContainer>`
+
+    Finally, adjacent ``SeqToANNContainer`` in all ``nn.Sequential`` of ``net`` are merged to save ``flatten`` and
+    ``unflatten``.
+
+    .. admonition:: Note
+        :class: note
+
+        Layers such as ``BatchNorm`` in ``SeqToANNContainer`` compute statistics with ``T * N`` as the batch size, which
+        is the same as :class:`spikingjelly.activation_based.layer.BatchNorm2d` in the multi-step mode, but is different
+        from computing step-by-step.
+
+    Codes example:
+
+    .. code-block:: python
+
+        net = nn.Sequential(
+            layer.MultiStepContainer(nn.Conv2d(2, 8, 3), nn.BatchNorm2d(8), neuron.IFNode()),
+            layer.MultiStepContainer(nn.Flatten(), nn.Linear(8 * 30 * 30, 10), neuron.IFNode())
+        )
+        report = functional.plan_step_mode(net, T=16)
+        print(net)
+        # Sequential(
+        #   (0): Sequential(
+        #     (0): SeqToANNContainer(Conv2d, BatchNorm2d)
+        #     (1): IFNode(step_mode=m)
+        #   )
+        #   (1): Sequential(
+        #     (0): SeqToANNContainer(Flatten, Linear)
+        #     (1): IFNode(step_mode=m)
+        #   )
+        # )
+        print(report['saved_calls'])
+        # 60
+    """
+    from . import layer
+    report = {'removed_loops': 0, 'remaining_loops': 0, 'batched_modules': [], 'saved_calls': None}
+
+    def is_per_step_container(m: nn.Module):
+        if type(m) is layer.MultiStepContainer:
+            return True
+        return isinstance(m, layer.StepModeContainer) and m.stateful and m.step_mode == 'm'
+
+    def visit(module: nn.Module, prefix: str):
+        for name, child in list(module.named_children()):
+            child_name = f'{prefix}.{name}' if prefix else name
+            if is_per_step_container(child):
+                planned, batched = _plan_per_step_container(child)
+                remaining = sum(1 for m in planned if isinstance(m, layer.MultiStepContainer))
+                if remaining == 1 and len(planned) == 1:
+                    # nothing can be moved out of the loop
+                    report['remaining_loops'] += 1
+                    continue
+                if remaining == 0:
+                    report['removed_loops'] += 1
+                report['remaining_loops'] += remaining
+                report['batched_modules'].extend(batched)
+                module._modules[name] = planned[0] if len(planned) == 1 else nn.Sequential(*planned)
+                logging.info(f'spikingjelly.activation_based.functional.plan_step_mode: {child_name} is planned as '
+                             f'{[m._get_name() for m in planned]}')
+            else:
+                visit(child, child_name)
+
+    visit(net, '')
+    for m in net.modules():
+        if isinstance(m, nn.Sequential):
+            _merge_seq_to_ann_containers(m)
+
+    if T is not None:
+        n_leaves = 0
+        for m in report['batched_modules']:
+            if isinstance(m, neuron.BaseNode):
+                # the torch backend still calls single_step_forward (and the surrogate function) at each time-step
+                n_leaves += int(m.backend != 'torch')
+            elif isinstance(m, base.MemoryModule):
+                # the default multi-step forward of stateful modules is also a loop over time-steps
+                continue
+            else:
+                n_leaves += sum(1 for sub in m.modules() if len(sub._modules) == 0)
+        report['saved_calls'] = (T - 1) * n_leaves
+    return report
+
 def set_backend(net: nn.Module, backend: str, instance: Union[nn.Module, tuple[nn.Module, ...]] = (nn.Module, )):
     """
     * :ref:`API in English <set_backend-en>`
@@ -159,6 +410,7 @@ def detach_net(net: nn.Module):
     :return: None
 
     将网络与之前的时间步的计算图断开。做法是遍历网络中的所有 ``Module``，若 ``m `` 为 ``base.MemoryModule`` 函数或者是拥有 ``detach()`` 方法，则调用 ``m.detach()``。
+    若网络使用了 :class:`StateArena <spikingjelly.activation_based.base.StateArena>`，则调用 ``net.state_arena.detach()``。
 
     * :ref:`中文API <detach_net-cn>`
 
@@ -169,7 +421,13 @@ def detach_net(net: nn.Module):
     :return: None
 
     Detach the computation graph of the whole network from previous time-steps.  Walk through every ``Module`` as ``m``, and call ``m.detach()`` if this ``m`` is ``base.MemoryModule`` or ``m`` has ``detach()``.
+    If the network uses :class:`StateArena <spikingjelly.activation_based.base.StateArena>`, ``net.state_arena.detach()`` is called.
     """
+    state_arena = getattr(net, 'state_arena', None)
+    if isinstance(state_arena, base.StateArena):
+        state_arena.detach()
+        return
+
     for m in net.modules():
         if hasattr(m, 'detach'):
             if not isinstance(m, base.MemoryModule):
@@ -553,14 +811,13 @@ def multi_step_forward(x_seq: Tensor, single_step_module: Union[nn.Module, list[
     """
     y_seq = []
     if isinstance(single_step_module, (list, tuple, nn.Sequential)):
-        for t in range(x_seq.shape[0]):
-            x_seq_t = x_seq[t]
+        for x_seq_t in x_seq.unbind(0):
             for m in single_step_module:
                 x_seq_t = m(x_seq_t)
             y_seq.append(x_seq_t)
     else:
-        for t in range(x_seq.shape[0]):
-            y_seq.append(single_step_module(x_seq[t]))
+        for x in x_seq.unbind(0):
+            y_seq.append(single_step_module(x))
 
     return torch.stack(y_seq)
 
@@ -608,7 +865,7 @@ def t_last_multi_step_forward(x_seq: Tensor, single_step_module: Union[nn.Module
     return torch.stack(y_seq, dim=-1)
 
 
-def chunk_multi_step_forward(split_size: int, x_seq: Tensor, multi_step_module: nn.Module):
+def chunk_multi_step_forward(split_size: int, x_seq: Tensor, multi_step_module: nn.Module, memory_mode: str = 'default'):
     """
     * :ref:`API in English <chunk_multi_step_forward-en>`
 
@@ -620,6 +877,10 @@ def chunk_multi_step_forward(split_size: int, x_seq: Tensor, multi_step_module:
     :type x_seq: Tensor
     :param multi_step_module: 一个使用多步传播模式的网络
     :type multi_step_module: nn.Module
+    :param memory_mode: ``'default'`` 或 ``'recompute'``。若为 ``'recompute'`` 且梯度启用，则每个小tensor都使用
+        :class:`checkpoint_memory_forward <spikingjelly.activation_based.base.checkpoint_memory_forward>` 输入到
+        ``multi_step_module`` 中，只保存每个小tensor和此时网络中所有状态变量的值，在反向传播时重新计算中间变量
+    :type memory_mode: str
     :return: 输出
     :rtype: Tensor
 
@@ -627,6 +888,7 @@ def chunk_multi_step_forward(split_size: int, x_seq: Tensor, multi_step_module:
     一个tensor的 ``shape[0]`` 会小于 ``split_size``)，然后逐个输入到 ``multi_step_module`` 中，再将输出重新拼接为 ``shape = [split_size, *]``。\
 
     ``chunk_multi_step_forward`` 可以在使用很大的 ``T`` 进行不带梯度的推理(例如ANN2SNN)时使用，能够减少内存消耗量。
+    使用 ``memory_mode='recompute'`` 时，也可以在训练时减少内存消耗量，代价是反向传播时多进行一次前向传播。
 
     示例代码：
 
@@ -659,6 +921,12 @@ def chunk_multi_step_forward(split_size: int, x_seq: Tensor, multi_step_module:
     :type x_seq: Tensor
     :param multi_step_module:
     :type multi_step_module: nn.Module
+    :param memory_mode: ``'default'`` or ``'recompute'``. If ``'recompute'`` and gradients are enabled, each chunk is sent
+        to ``multi_step_module`` by
+        :class:`checkpoint_memory_forward <spikingjelly.activation_based.base.checkpoint_memory_forward>`, which only
+        saves the chunk and the memories of the network at that time, and recomputes the intermediate variables in
+        backward
+    :type memory_mode: str
     :return: the output tensor
     :rtype: Tensor
 
@@ -667,6 +935,8 @@ def chunk_multi_step_forward(split_size: int, x_seq: Tensor, multi_step_module:
     then concatenates the outputs to  ``shape = [split_size, *]``.
 
     ``chunk_multi_step_forward`` can be used for inference with a large ``T`` (e.g., ANN2SNN) to reduce the memory consumption.
+    With ``memory_mode='recompute'``, it can also reduce the memory consumption in training at the cost of an extra
+    forward pass in backward.
 
     Codes example:
 
@@ -689,11 +959,381 @@ def chunk_multi_step_forward(split_size: int, x_seq: Tensor, multi_step_module:
             print(y_seq.shape)
             # torch.Size([1024, 2])
     """
+    if memory_mode not in ('default', 'recompute'):
+        raise ValueError(f'memory_mode should be \'default\' or \'recompute\', but got {memory_mode}!')
+
     y_seq = []
-    for x in torch.split(x_seq, split_size):
-        y_seq.append(multi_step_module(x))
+    if memory_mode == 'recompute' and torch.is_grad_enabled():
+        memory_modules = [m for m in multi_step_module.modules() if isinstance(m, base.MemoryModule)]
+        for x in torch.split(x_seq, split_size):
+            y_seq.append(base.checkpoint_memory_forward(multi_step_module, x, memory_modules))
+    else:
+        for x in torch.split(x_seq, split_size):
+            y_seq.append(multi_step_module(x))
     return torch.cat(y_seq, 0)
 
+
+def index_memory_rows(value, index: Tensor, batch_size: int):
+    # select rows of a memory whose shape[0] is the batch size, including tensors in queues
+    if isinstance(value, Tensor):
+        if value.dim() > 0 and value.shape[0] == batch_size:
+            return value.index_select(0, index.to(value.device))
+        return value
+    elif isinstance(value, (list, tuple)):
+        return type(value)(index_memory_rows(item, index, batch_size) for item in value)
+    else:
+        return value
+
+
+def split_memory_rows(value, batch_size: int, n_keep: int):
+    # split a memory into the first n_keep rows and the other rows
+    if isinstance(value, Tensor):
+        if value.dim() > 0 and value.shape[0] == batch_size:
+            return value[0: n_keep], value[n_keep:]
+        return value, value
+    elif isinstance(value, (list, tuple)):
+        items = [split_memory_rows(item, batch_size, n_keep) for item in value]
+        return type(value)(item[0] for item in items), type(value)(item[1] for item in items)
+    else:
+        return value, value
+
+
+def cat_memory_rows(values: list, rows: list):
+    # concatenate the memories split by split_memory_rows, where values[i] is the memory of rows[i] samples
+    # a memory that is not a tensor (e.g., the initial v=0. of samples with length 0) is expanded to rows[i] rows
+    def is_batch_tensor(value, n_rows: int):
+        return isinstance(value, Tensor) and value.dim() > 0 and value.shape[0] == n_rows
+
+    reference = None
+    for value, n_rows in zip(values, rows):
+        if is_batch_tensor(value, n_rows):
+            reference = value
+            break
+
+    if reference is not None:
+        if all(is_batch_tensor(value, n_rows) or isinstance(value, (int, float)) for value, n_rows in zip(values, rows)):
+            return torch.cat([value if isinstance(value, Tensor) else
+                              torch.full([n_rows, *reference.shape[1:]], value, dtype=reference.dtype, device=reference.device)
+                              for value, n_rows in zip(values, rows)], 0)
+        return values[0]
+    elif isinstance(values[0], (list, tuple)) and all(isinstance(value, (list, tuple)) and len(value) == len(values[0]) for value in values):
+        return type(values[0])(cat_memory_rows([value[i] for value in values], rows) for i in range(len(values[0])))
+    else:
+        return values[0]
+
+
+def packed_multi_step_forward(x_seq: Union[Tensor, nn.utils.rnn.PackedSequence], multi_step_module: nn.Module,
+                              lengths: Optional[Tensor] = None):
+    """
+    * :ref:`API in English <packed_multi_step_forward-en>`
+
+    .. _packed_multi_step_forward-cn:
+
+    :param x_seq: ``shape = [T, N, *]`` 的补零后的输入，或 ``torch.nn.utils.rnn.PackedSequence``
+    :type x_seq: Union[Tensor, torch.nn.utils.rnn.PackedSequence]
+    :param multi_step_module: 一个使用多步传播模式的网络，例如多步模式的神经元或容器
+    :type multi_step_module: nn.Module
+    :param lengths: ``shape = [N]`` 的每个序列的长度。``x_seq`` 为 ``PackedSequence`` 时不需要给定
+    :type lengths: Optional[Tensor]
+    :return: ``shape = [T, N, *]`` 的输出，补零位置的输出为0。``x_seq`` 为 ``PackedSequence`` 时也返回 ``PackedSequence``
+    :rtype: Union[Tensor, torch.nn.utils.rnn.PackedSequence]
+
+    对长度不同的序列进行多步前向传播，只计算每个时刻仍然有效的样本。样本按长度降序排列后，有效的样本总是排在前面，因此时间被分为若干段，
+    每段内有效的batch大小不变，每段只调用一次 ``multi_step_module`` 处理有效的样本；每当有序列结束时，网络中所有有状态变量只保留
+    仍然有效的样本的行，batch随之缩小。与对补零后的完整序列进行计算相比，计算量从 ``T * N`` 降低为 ``sum(lengths)``。
+
+    计算完成后，网络中有状态变量（例如 ``v``）的第 ``i`` 行是第 ``i`` 个样本在其最后一个有效时刻的状态。
+
+    可以配合 :class:`pad_sequence_collate <spikingjelly.datasets.pad_sequence_collate>` 使用：
+
+    .. code-block:: python
+
+        for x_p, label, x_len in train_data_loader:
+            # x_p.shape = [N, T, *]
+            y_seq = functional.packed_multi_step_forward(x_p.transpose(0, 1), net, x_len)
+            out_fr = y_seq.sum(0) / x_len.unsqueeze(1)
+            functional.reset_net(net)
+
+    * :ref:`中文 API <packed_multi_step_forward-cn>`
+
+    .. _packed_multi_step_forward-en:
+
+    :param x_seq: the padded input with ``shape = [T, N, *]``, or a ``torch.nn.utils.rnn.PackedSequence``
+    :type x_seq: Union[Tensor, torch.nn.utils.rnn.PackedSequence]
+    :param multi_step_module: a network in multi-step mode, e.g., a neuron or a container in multi-step mode
+    :type multi_step_module: nn.Module
+    :param lengths: the length of each sequence with ``shape = [N]``. It is not required if ``x_seq`` is a
+        ``PackedSequence``
+    :type lengths: Optional[Tensor]
+    :return: the output with ``shape = [T, N, *]``, whose padded positions are 0. If ``x_seq`` is a
+        ``PackedSequence``, a ``PackedSequence`` will be returned
+    :rtype: Union[Tensor, torch.nn.utils.rnn.PackedSequence]
+
+    Runs the multi-step forward on sequences with different lengths, and only computes the samples that are still
+    active at each time-step. After sorting samples by their lengths in descending order, the active samples are always
+    in front. Thus, the time is divided into segments, in each of which the active batch size is constant, and
+    ``multi_step_module`` is called once per segment on the active samples. Whenever sequences end, all stateful
+    variables in the network only keep the rows of the active samples, and the batch shrinks. Compared with computing on
+    the full padded sequences, the computation is reduced from ``T * N`` to ``sum(lengths)``.
+
+    After computation, the ``i``-th row of the stateful variables (e.g., ``v``) in the network is the state of the
+    ``i``-th sample at its own last active time-step.
+
+    It can be used with :class:`pad_sequence_collate <spikingjelly.datasets.pad_sequence_collate>`:
+
+    .. code-block:: python
+
+        for x_p, label, x_len in train_data_loader:
+            # x_p.shape = [N, T, *]
+            y_seq = functional.packed_multi_step_forward(x_p.transpose(0, 1), net, x_len)
+            out_fr = y_seq.sum(0) / x_len.unsqueeze(1)
+            functional.reset_net(net)
+    """
+    packed = isinstance(x_seq, nn.utils.rnn.PackedSequence)
+    if packed:
+        x_seq, lengths = nn.utils.rnn.pad_packed_sequence(x_seq)
+    lengths = torch.as_tensor(lengths).cpu()
+    T = x_seq.shape[0]
+    N = x_seq.shape[1]
+    if lengths.numel() != N:
+        raise ValueError(f'expected lengths with {N} elements, but got {lengths.numel()} elements!')
+    if lengths.max().item() > T:
+        raise ValueError(f'the max length {lengths.max().item()} is larger than T={T}!')
+    if lengths.max().item() <= 0:
+        raise ValueError('at least one sequence should have a positive length!')
+
+    lengths, order = lengths.sort(descending=True)
+    inverse_order = torch.empty_like(order)
+    inverse_order[order] = torch.arange(N)
+    lengths = lengths.tolist()
+
+    memory_modules = [m for m in multi_step_module.modules() if isinstance(m, base.MemoryModule)]
+    for m in memory_modules:
+        for key in m._memories.keys():
+            m._memories[key] = index_memory_rows(m._memories[key], order, N)
+
+    x_seq = x_seq.index_select(1, order.to(x_seq.device))
+    # finished[(m, key)] are the final states of the finished samples, which are in descending order of lengths
+    finished = {(m, key): [] for m in memory_modules for key in m._memories.keys()}
+    # the number of samples of each element in finished[(m, key)]
+    finished_rows = []
+    y_seq = []
+    t_start = 0
+    batch_size = N
+    while t_start < T:
+        active = sum(1 for length in lengths if length > t_start)
+        if active == 0:
+            break
+        if active < batch_size:
+            for m in memory_modules:
+                for key in m._memories.keys():
+                    kept, done = split_memory_rows(m._memories[key], batch_size, active)
+                    m._memories[key] = kept
+                    finished[(m, key)].insert(0, done)
+            # samples with length 0 are finished before the first time-step, and keep their initial states
+            finished_rows.insert(0, batch_size - active)
+            batch_size = active
+        t_end = min(lengths[active - 1], T)
+        y = multi_step_module(x_seq[t_start: t_end, 0: active])
+        if active < N:
+            y = torch.cat((y, y.new_zeros([y.shape[0], N - active, *y.shape[2:]])), 1)
+        y_seq.append(y)
+        t_start = t_end
+
+    y_seq = torch.cat(y_seq, 0)
+    if y_seq.shape[0] < T:
+        y_seq = torch.cat((y_seq, y_seq.new_zeros([T - y_seq.shape[0], *y_seq.shape[1:]])), 0)
+    y_seq = y_seq.index_select(1, inverse_order.to(y_seq.device))
+
+    for m in memory_modules:
+        for key in m._memories.keys():
+            value = cat_memory_rows([m._memories[key]] + finished[(m, key)], [batch_size] + finished_rows)
+            m._memories[key] = index_memory_rows(value, inverse_order, N)
+
+    if packed:
+        return nn.utils.rnn.pack_padded_sequence(y_seq, torch.as_tensor(lengths)[inverse_order], enforce_sorted=False)
+    return y_seq
+
+def detached_memories(memory_modules: list):
+    # a snapshot of the memories, whose tensors are detached from the computation graph
+    def detach_value(value):
+        if isinstance(value, Tensor):
+            return value.detach()
+        elif isinstance(value, (list, tuple)):
+            return type(value)(detach_value(item) for item in value)
+        else:
+            return copy.deepcopy(value)
+
+    return [{key: detach_value(value) for key, value in m._memories.items()} for m in memory_modules]
+
+
+def load_memories(memory_modules: list, memories: list):
+    for m, m_memories in zip(memory_modules, memories):
+        for key, value in m_memories.items():
+            m._memories[key] = copy.copy(value) if isinstance(value, list) else value
+
+
+def tbptt_train(model: nn.Module, optimizer: torch.optim.Optimizer, x_seq: Tensor, target_seq: Tensor, k1: int,
+                k2: Optional[int] = None, loss_fn: Callable = F.mse_loss, device: Optional[torch.device] = None):
+    """
+    * :ref:`API in English <tbptt_train-en>`
+
+    .. _tbptt_train-cn:
+
+    :param model: 使用多步传播模式的网络
+    :type model: nn.Module
+    :param optimizer: 优化器
+    :type optimizer: torch.optim.Optimizer
+    :param x_seq: ``shape = [T, N, *]`` 的输入，可以位于CPU上（建议使用 ``pin_memory()``）
+    :type x_seq: Tensor
+    :param target_seq: ``shape = [T, N, *]`` 的每个时刻的目标
+    :type target_seq: Tensor
+    :param k1: 每隔 ``k1`` 个时刻更新一次参数
+    :type k1: int
+    :param k2: 每次更新时反向传播的时刻数。为 ``None`` 时使用 ``k1``
+    :type k2: Optional[int]
+    :param loss_fn: ``loss_fn(y_seq, target_seq)`` 计算损失
+    :type loss_fn: Callable
+    :param device: 计算使用的设备。为 ``None`` 时使用 ``model`` 的参数所在的设备
+    :type device: Optional[torch.device]
+    :return: 每次更新的损失
+    :rtype: list
+
+    使用截断的BPTT(TBPTT(k1, k2))在长序列上训练。每前进 ``k1`` 个时刻，计算这 ``k1`` 个时刻的损失，并只在最近的 ``k2`` 个时刻内反向传播，
+    然后更新参数。网络的状态在相邻的块之间传递，并在窗口的边界处与计算图分离。
+
+    * ``k2 <= k1`` 时，每个块的前 ``k1 - k2`` 个时刻不记录计算图，只对最后 ``k2`` 个时刻计算损失并反向传播
+
+    * ``k2 > k1`` 时，在窗口起点处保存状态的快照（与计算图分离），每次更新时从快照处重新计算 ``k2`` 个时刻，只对最新的 ``k1`` 个时刻计算损失
+
+    下一个块从 ``x_seq`` 到 ``device`` 的拷贝在当前块反向传播之前异步发起，因此在CUDA上可以与反向传播重叠。
+
+    网络的状态不会在开始时被重置，计算完成后的状态是最后一个时刻的状态（与计算图分离）。
+
+    * :ref:`中文 API <tbptt_train-cn>`
+
+    .. _tbptt_train-en:
+
+    :param model: the network in multi-step mode
+    :type model: nn.Module
+    :param optimizer: the optimizer
+    :type optimizer: torch.optim.Optimizer
+    :param x_seq: the input with ``shape = [T, N, *]``, which can be on CPU (``pin_memory()`` is recommended)
+    :type x_seq: Tensor
+    :param target_seq: the target of each time-step with ``shape = [T, N, *]``
+    :type target_seq: Tensor
+    :param k1: the parameters are updated every ``k1`` time-steps
+    :type k1: int
+    :param k2: the number of time-steps to back-propagate in each update. If ``None``, ``k1`` will be used
+    :type k2: Optional[int]
+    :param loss_fn: ``loss_fn(y_seq, target_seq)`` computes the loss
+    :type loss_fn: Callable
+    :param device: the device for computation. If ``None``, the device of the parameters of ``model`` will be used
+    :type device: Optional[torch.device]
+    :return: the loss of each update
+    :rtype: list
+
+    Trains on a long sequence by the truncated BPTT (TBPTT(k1, k2)). Every ``k1`` time-steps, the loss of these ``k1``
+    time-steps is computed and back-propagated only through the last ``k2`` time-steps, and then the parameters are
+    updated. The states of the network are carried across chunks and are detached from the computation graph at the
+    window boundary.
+
+    * If ``k2 <= k1``, the first ``k1 - k2`` time-steps of each chunk are computed without the computation graph, and
+      the loss is only computed and back-propagated on the last ``k2`` time-steps
+
+    * If ``k2 > k1``, snapshots of the states (detached from the computation graph) are saved at the window starts.
+      Each update recomputes ``k2`` time-steps from the snapshot, and the loss is only computed on the newest ``k1``
+      time-steps
+
+    The copy of the next chunk from ``x_seq`` to ``device`` is issued asynchronously before the backward of the
+    current chunk, which can overlap with the backward on CUDA.
+
+    The states of the network are not reset at the beginning, and the states after training are those of the last
+    time-step (detached from the computation graph).
+
+    Codes example:
+
+    .. code-block:: python
+
+        net = nn.Sequential(layer.Linear(8, 16), neuron.LIFNode(), layer.Linear(16, 2))
+        functional.set_step_mode(net, 'm')
+        optimizer = torch.optim.Adam(net.parameters())
+        x_seq = torch.rand([4096, 4, 8])
+        target_seq = torch.rand([4096, 4, 2])
+        losses = functional.tbptt_train(net, optimizer, x_seq, target_seq, k1=64, k2=128)
+        functional.reset_net(net)
+    """
+    if k2 is None:
+        k2 = k1
+    if k1 <= 0 or k2 <= 0:
+        raise ValueError(f'k1 and k2 should be positive, but got k1={k1}, k2={k2}!')
+    if device is None:
+        device = next(model.parameters()).device
+    T = x_seq.shape[0]
+    memory_modules = [m for m in model.modules() if isinstance(m, base.MemoryModule)]
+
+    ends = list(range(k1, T, k1)) + [T]
+    windows = []
+    t_prev = 0
+    for t_end in ends:
+        # the window [t_load, t_end) is loaded, in which [t_grad, t_end) is computed with gradients and
+        # [t_loss, t_end) is used to compute the loss
+        if k2 > k1:
+            t_grad = max(t_end - k2, 0)
+            windows.append((t_grad, t_grad, t_prev, t_end))
+        else:
+            t_grad = max(t_end - k2, t_prev)
+            windows.append((t_prev, t_grad, t_grad, t_end))
+        t_prev = t_end
+
+    snapshot_points = set(window[0] for window in windows) if k2 > k1 else set()
+    snapshots = {}
+    if 0 in snapshot_points:
+        snapshots[0] = detached_memories(memory_modules)
+
+    def load_window(i: int):
+        t_load, _, _, t_end = windows[i]
+        non_blocking = device != x_seq.device and x_seq.is_pinned()
+        return x_seq[t_load: t_end].to(device, non_blocking=non_blocking), \
+            target_seq[t_load: t_end].to(device, non_blocking=non_blocking)
+
+    losses = []
+    next_window = load_window(0)
+    for i, (t_load, t_grad, t_loss, t_end) in enumerate(windows):
+        x, target = next_window
+        if k2 > k1:
+            load_memories(memory_modules, snapshots[t_load])
+            # the window is split at the snapshot points to save the states there
+            y_seq = []
+            t_start = t_load
+            for t_point in sorted(p for p in snapshot_points if t_load < p < t_end) + [t_end]:
+                y_seq.append(model(x[t_start - t_load: t_point - t_load]))
+                if t_point in snapshot_points:
+                    snapshots[t_point] = detached_memories(memory_modules)
+                t_start = t_point
+            y_seq = torch.cat(y_seq, 0)
+            # snapshots before the start of the next window will not be used any more
+            next_start = windows[i + 1][0] if i + 1 < len(windows) else T
+            for t_point in [p for p in snapshots.keys() if p < next_start]:
+                snapshots.pop(t_point)
+        else:
+            if t_grad > t_load:
+                with torch.no_grad():
+                    model(x[0: t_grad - t_load])
+            y_seq = model(x[t_grad - t_load:])
+
+        loss = loss_fn(y_seq[t_loss - t_end:], target[t_loss - t_load:])
+        optimizer.zero_grad()
+        if i + 1 < len(windows):
+            next_window = load_window(i + 1)
+        loss.backward()
+        optimizer.step()
+        detach_net(model)
+        losses.append(loss.detach())
+
+    return [loss.item() for loss in losses]
+
+
 def seq_to_ann_forward(x_seq: Tensor, stateless_module: Union[nn.Module, list, tuple, nn.Sequential, Callable]):
     """
     * :ref:`API in English <seq_to_ann_forward-en>`
@@ -1025,6 +1665,500 @@ def fuse_convbn2d(conv2d: nn.Conv2d, bn2d: nn.BatchNorm2d):
     fused_conv.bias.data = fused_conv2d_bias_of_convbn2d(conv2d, bn2d)
     return fused_conv
 
+
+class _InferenceTracer(torch.fx.Tracer):
+    def is_leaf_module(self, m: nn.Module, module_qualified_name: str) -> bool:
+        # spiking layers and neurons are stateful or depend on the step mode and the input shape at runtime, and are kept
+        # as leaves in the graph
+        return isinstance(m, (base.StepModule, base.MemoryModule)) or super().is_leaf_module(m, module_qualified_name)
+
+
+def _batch_norm_of(m: nn.Module):
+    from . import layer
+    if isinstance(m, layer.TemporalEffectiveBatchNormNd):
+        m = m.bn
+    if isinstance(m, nn.modules.batchnorm._BatchNorm) and m.track_running_stats and m.running_mean is not None:
+        return m
+    return None
+
+
+def _foldable_linear_of(m: nn.Module):
+    from . import layer
+    if isinstance(m, (layer.SeqToANNContainer, nn.Sequential)) and len(m) > 0:
+        m = m[-1]
+    if isinstance(m, (nn.Conv1d, nn.Conv2d, nn.Conv3d, nn.Linear)):
+        return m
+    return None
+
+
+@torch.no_grad()
+def fold_batch_norm_into(conv_or_linear: nn.Module, bn: nn.modules.batchnorm._BatchNorm):
+    """
+    * :ref:`API in English <fold_batch_norm_into-en>`
+
+    .. _fold_batch_norm_into-cn:
+
+    :param conv_or_linear: 卷积层或全连接层
+    :type conv_or_linear: nn.Conv1d or nn.Conv2d or nn.Conv3d or nn.Linear
+    :param bn: 紧跟在 ``conv_or_linear`` 之后的、处于推理模式的BN层
+    :type bn: nn.modules.batchnorm._BatchNorm
+
+    将 ``bn`` 的运行统计量和仿射参数原地吸收进 ``conv_or_linear`` 的权重和偏置。若 ``conv_or_linear`` 没有偏置，则会为其创建
+    偏置。与 :class:`fuse_convbn2d` 不同，本函数适用于任意维度的卷积层和全连接层，且不创建新的模块，因而会保留
+    ``conv_or_linear`` 的类型（例如 :class:`spikingjelly.activation_based.layer.Conv2d` 的 ``step_mode``）。
+
+    * :ref:`中文 API <fold_batch_norm_into-cn>`
+
+    .. _fold_batch_norm_into-en:
+
+    :param conv_or_linear: a convolutional or linear layer
+    :type conv_or_linear: nn.Conv1d or nn.Conv2d or nn.Conv3d or nn.Linear
+    :param bn: the BN layer in inference mode that directly follows ``conv_or_linear``
+    :type bn: nn.modules.batchnorm._BatchNorm
+
+    Absorbs the running statistics and the affine parameters of ``bn`` into the weight and the bias of
+    ``conv_or_linear`` in-place. The bias will be created if ``conv_or_linear`` has no bias. Different from
+    :class:`fuse_convbn2d`, this function works for convolutional layers of any dimension and linear layers, and does
+    not create a new module. Thus, the type of ``conv_or_linear`` (e.g., the ``step_mode`` of
+    :class:`spikingjelly.activation_based.layer.Conv2d`) is kept.
+    """
+    weight = conv_or_linear.weight
+    k = (bn.running_var + bn.eps).rsqrt()
+    if bn.affine:
+        k = k * bn.weight
+    b = - bn.running_mean * k
+    if bn.affine:
+        b = b + bn.bias
+    if conv_or_linear.bias is not None:
+        b = b + conv_or_linear.bias * k
+    weight.data = weight.data * k.view(-1, *([1] * (weight.dim() - 1))).to(weight)
+    if conv_or_linear.bias is None:
+        conv_or_linear.bias = nn.Parameter(b.to(weight))
+    else:
+        conv_or_linear.bias.data = b.to(weight)
+
+
+def _fold_sequential(seq: nn.Sequential):
+    from . import layer
+    keys = list(seq._modules.keys())
+    i = 0
+    while i < len(keys):
+        m = seq._modules[keys[i]]
+        if isinstance(m, (nn.Dropout, layer.Dropout)):
+            del seq._modules[keys[i]]
+            keys.pop(i)
+            continue
+        if i > 0:
+            bn = _batch_norm_of(m)
+            linear = _foldable_linear_of(seq._modules[keys[i - 1]])
+            if bn is not None and linear is not None and getattr(m, 'step_mode', None) == getattr(linear, 'step_mode', None):
+                fold_batch_norm_into(linear, bn)
+                if isinstance(m, layer.TemporalEffectiveBatchNormNd):
+                    # the per-time-step scales are kept
+                    m.bn = nn.Identity()
+                else:
+                    del seq._modules[keys[i]]
+                    keys.pop(i)
+                    continue
+        i += 1
+
+
+def _fold_graph(gm: torch.fx.GraphModule):
+    from . import layer
+    modules = dict(gm.named_modules())
+
+    def only_user_of(node: torch.fx.Node):
+        if len(node.users) == 1:
+            user = next(iter(node.users))
+            if user.op == 'call_module' and len(user.args) == 1 and len(user.kwargs) == 0 and user.args[0] is node:
+                return user
+        return None
+
+    erased = set()
+    for node in list(gm.graph.nodes):
+        if node.op != 'call_module' or node in erased:
+            continue
+        m = modules[node.target]
+
+        if isinstance(m, (nn.Dropout, layer.Dropout)):
+            node.replace_all_uses_with(node.args[0])
+            gm.graph.erase_node(node)
+            continue
+
+        user = only_user_of(node)
+        if user is None:
+            continue
+        m_user = modules[user.target]
+
+        if isinstance(m, layer.SeqToANNContainer) and isinstance(m_user, layer.SeqToANNContainer):
+            # two adjacent containers are merged, which avoids one pair of flatten and unflatten
+            m_merged = layer.SeqToANNContainer(*m, *m_user)
+            gm.add_submodule(node.target, m_merged)
+            modules[node.target] = m_merged
+            user.replace_all_uses_with(node)
+            gm.graph.erase_node(user)
+            erased.add(user)
+            continue
+
+        bn = _batch_norm_of(m_user)
+        linear = _foldable_linear_of(m)
+        if bn is None or linear is None:
+            continue
+        if isinstance(m, layer.SeqToANNContainer):
+            if getattr(m_user, 'step_mode', 'm') != 'm':
+                continue
+        elif getattr(m, 'step_mode', None) != getattr(m_user, 'step_mode', None):
+            continue
+        fold_batch_norm_into(linear, bn)
+        if isinstance(m_user, layer.TemporalEffectiveBatchNormNd):
+            # the per-time-step scales are kept
+            m_user.bn = nn.Identity()
+        else:
+            user.replace_all_uses_with(node)
+            gm.graph.erase_node(user)
+            erased.add(user)
+
+    gm.graph.lint()
+    gm.delete_all_unused_submodules()
+    gm.recompile()
+
+
+def _set_fastest_backend(net: nn.Module, device: torch.device):
+    # the multi-step forward of IFNode and LIFNode in the eval mode does not depend on the backend
+    eval_ignores_backend = (neuron.IFNode.multi_step_forward, neuron.LIFNode.multi_step_forward)
+    preferred = ('cupy', 'torch') if device.type == 'cuda' else ('cpp', 'torch')
+    for m in net.modules():
+        if isinstance(m, neuron.BaseNode) and m.step_mode == 'm':
+            if type(m).multi_step_forward in eval_ignores_backend:
+                continue
+            for backend in preferred:
+                if backend in m.supported_backends:
+                    if backend == 'cpp' and cpp_neuron_kernel._cpp_module is None:
+                        # do not compile the C++ extension only for inference
+                        continue
+                    try:
+                        base.check_backend_library(backend)
+                    except ImportError:
+                        continue
+                    m.backend = backend
+                    break
+
+
+@torch.no_grad()
+def optimize_for_inference(net: nn.Module, example_input: Optional[Tensor] = None, atol: float = 1e-5,
+                           rtol: float = 1e-4):
+    """
+    * :ref:`API in English <optimize_for_inference-en>`
+
+    .. _optimize_for_inference-cn:
+
+    :param net: 待优化的网络，不会被修改
+    :type net: nn.Module
+    :param example_input: 用于检查优化前后网络等价性的输入。若为 ``None`` 则不检查
+    :type example_input: Optional[Tensor]
+    :param atol: 等价性检查的绝对误差容限
+    :type atol: float
+    :param rtol: 等价性检查的相对误差容限
+    :type rtol: float
+    :return: 优化后的、冻结的网络
+    :rtype: nn.Module
+
+    对整个网络进行推理优化。``net`` 首先被深拷贝并设置为推理模式，然后使用 ``torch.fx`` 进行符号追踪，其中步进模块和有状态的
+    模块（神经元、``layer`` 中的层等）被视为叶子节点。在得到的计算图上：
+
+    * 紧跟在卷积层或全连接层后的 ``BatchNorm``、:class:`ThresholdDependentBatchNorm2d <spikingjelly.activation_based.layer.ThresholdDependentBatchNorm2d>`
+      被吸收进卷积层或全连接层并移除；:class:`TemporalEffectiveBatchNorm2d <spikingjelly.activation_based.layer.TemporalEffectiveBatchNorm2d>`
+      中的BN被吸收，只保留每个时间步的缩放系数
+    * 相邻的 :class:`SeqToANNContainer <spikingjelly.activation_based.layer.SeqToANNContainer>` 被合并为一个，以减少一对
+      ``flatten`` 与 ``unflatten``
+    * ``Dropout`` 被移除
+    * 推理时根据后端进行计算的多步模式神经元被设置为当前设备上最快的可用后端（CUDA上为 ``'cupy'``，CPU上为已经编译过的
+      ``'cpp'``）。:class:`IFNode <spikingjelly.activation_based.neuron.IFNode>` 和
+      :class:`LIFNode <spikingjelly.activation_based.neuron.LIFNode>` 在推理时不使用后端，因此不会被修改
+
+    各个 ``nn.Sequential`` 叶子节点（例如 ``SeqToANNContainer``）的内部也会进行相同的BN吸收和 ``Dropout`` 移除。若网络无法被
+    符号追踪，则只进行模块层面的优化。返回的网络中所有参数的 ``requires_grad`` 均为 ``False``。
+
+    若给定 ``example_input``，则会分别用原网络和优化后的网络进行推理（推理前后均会重置状态），若输出不满足
+    ``torch.allclose(y, y_opt, rtol, atol)`` 则报错。
+
+    * :ref:`中文 API <optimize_for_inference-cn>`
+
+    .. _optimize_for_inference-en:
+
+    :param net: the network to be optimized, which will not be modified
+    :type net: nn.Module
+    :param example_input: the input to check the equivalence of the networks before and after optimization. If
+        ``None``, the check is skipped
+    :type example_input: Optional[Tensor]
+    :param atol: the absolute tolerance of the equivalence check
+    :type atol: float
+    :param rtol: the relative tolerance of the equivalence check
+    :type rtol: float
+    :return: the optimized and frozen network
+    :rtype: nn.Module
+
+    Optimizes the whole network for inference. ``net`` is deep copied and set to the eval mode, and then traced
+    symbolically by ``torch.fx``, where step modules and stateful modules (neurons, layers in ``layer``, etc.) are kept
+    as leaves. On the traced graph:
+
+    * ``BatchNorm`` and :class:`ThresholdDependentBatchNorm2d <spikingjelly.activation_based.layer.ThresholdDependentBatchNorm2d>`
+      directly following a convolutional or linear layer are folded into that layer and removed. The BN in
+      :class:`TemporalEffectiveBatchNorm2d <spikingjelly.activation_based.layer.TemporalEffectiveBatchNorm2d>` is
+      folded and only the per-time-step scales are kept
+    * adjacent :class:`SeqToANNContainer <spikingjelly.activation_based.layer.SeqToANNContainer>` are merged into one,
+      which saves one pair of ``flatten`` and ``unflatten``
+    * ``Dropout`` is removed
+    * neurons in the multi-step mode whose eval forward depends on the backend are switched to the fastest available
+      backend on their device (``'cupy'`` on CUDA, and ``'cpp'`` on CPU if it has already been compiled).
+      :class:`IFNode <spikingjelly.activation_based.neuron.IFNode>` and
+      :class:`LIFNode <spikingjelly.activation_based.neuron.LIFNode>` do not use the backend in the eval mode and are
+      not changed
+
+    The same BN folding and ``Dropout`` removal are also applied inside each ``nn.Sequential`` leaf (e.g.,
+    ``SeqToANNContainer``). If the network can not be traced symbolically, only the module-level optimizations are
+    applied. All parameters of the returned network have ``requires_grad = False``.
+
+    If ``example_input`` is given, the original network and the optimized network are run on it (the states are reset
+    before and after), and an error will be raised if the outputs do not satisfy ``torch.allclose(y, y_opt, rtol, atol)``.
+
+    Codes example:
+
+    .. code-block:: python
+
+        from spikingjelly.activation_based.model import sew_resnet
+
+        net = sew_resnet.sew_resnet18(spiking_neuron=neuron.IFNode, cnf='ADD')
+        functional.set_step_mode(net, 'm')
+        x_seq = torch.rand([4, 2, 3, 224, 224])
+        net_opt = functional.optimize_for_inference(net, example_input=x_seq)
+        with torch.no_grad():
+            y_seq = net_opt(x_seq)
+            functional.reset_net(net_opt)
+    """
+    training = net.training
+    net_opt = copy.deepcopy(net).eval()
+    try:
+        net_opt = torch.fx.GraphModule(net_opt, _InferenceTracer().trace(net_opt), net.__class__.__name__)
+        _fold_graph(net_opt)
+    except Exception as e:
+        logging.warning(f'spikingjelly.activation_based.functional.optimize_for_inference: {net.__class__.__name__} can '
+                        f'not be traced by torch.fx, and only the module-level optimizations will be applied: {e}')
+
+    for m in net_opt.modules():
+        if isinstance(m, nn.Sequential):
+            _fold_sequential(m)
+
+    try:
+        device = next(net_opt.parameters()).device
+    except StopIteration:
+        device = torch.device('cpu')
+    _set_fastest_backend(net_opt, device)
+    net_opt.requires_grad_(False)
+
+    if example_input is not None:
+        net.eval()
+        reset_net(net)
+        y = net(example_input)
+        reset_net(net)
+        net.train(training)
+        reset_net(net_opt)
+        y_opt = net_opt(example_input)
+        reset_net(net_opt)
+        if not torch.allclose(y, y_opt, rtol=rtol, atol=atol):
+            raise ValueError(f'The outputs of the optimized network are not equal to those of the original network! '
+                             f'The max absolute error is {(y - y_opt).abs().max().item()}.')
+
+    return net_opt
+
+def _autotune_machine_key(device: torch.device):
+    if device.type == 'cuda':
+        device_name = torch.cuda.get_device_name(device)
+    else:
+        device_name = platform.processor() or platform.machine()
+    return f'{platform.node()}|{device_name}|torch-{torch.__version__}'
+
+
+def _autotune_layer_key(m: base.MemoryModule, x: Tensor, with_backward: bool):
+    # the backend is removed from the extra repr, which is the same for all candidates
+    extra_repr = re.sub(r',?\s*backend=\w+', '', m.extra_repr())
+    return f'{m._get_name()}({extra_repr})|{list(x.shape)}|{x.dtype}|{"fw+bw" if with_backward else "fw"}'
+
+
+def _load_autotune_cache(cache_file: Optional[str]):
+    if cache_file is None or not os.path.exists(cache_file):
+        return {}
+    try:
+        with open(cache_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f'spikingjelly.activation_based.functional.autotune: can not read {cache_file}: {e}')
+        return {}
+
+
+def _save_autotune_cache(cache_file: Optional[str], cache: dict):
+    if cache_file is None:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+    # write to a temporary file and then rename it, such that concurrent runs never read a partial file
+    tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp_file, cache_file)
+
+
+def autotune(net: nn.Module, example_input: Any, with_backward: bool = False, n: int = 4,
+             cache_file: Optional[str] = 'default', force: bool = False):
+    """
+    * :ref:`API in English <autotune-en>`
+
+    .. _autotune-cn:
+
+    :param net: 需要调优的网络
+    :type net: nn.Module
+    :param example_input: 网络的示例输入，用于获取各层的输入
+    :type example_input: Any
+    :param with_backward: 若为 ``True``，则测量前向和反向传播的总用时；否则只测量前向传播的用时
+    :type with_backward: bool
+    :param n: 每个后端测量的重复次数，参见 :class:`spikingjelly.activation_based.cuda_utils.cal_fun_t`
+    :type n: int
+    :param cache_file: 保存调优结果的json文件。若为 ``'default'``，则使用 ``spikingjelly.configure.autotune_cache_file``；
+        若为 ``None``，则不读取和保存调优结果
+    :type cache_file: Optional[str]
+    :param force: 若为 ``True``，则忽略已保存的调优结果，重新测量
+    :type force: bool
+    :return: 一个字典，键为模块的名字，值为选择的后端
+    :rtype: dict
+
+    为 ``net`` 中每个支持多个后端的 :class:`MemoryModule <spikingjelly.activation_based.base.MemoryModule>` （例如多步模式的
+    神经元、:class:`SlidingPSN <spikingjelly.activation_based.neuron.SlidingPSN>`）选择最快的后端。
+
+    首先使用 ``example_input`` 运行一次网络以获取每层的输入，然后对每层的每个可用的后端，使用
+    :class:`cal_fun_t <spikingjelly.activation_based.cuda_utils.cal_fun_t>` 测量该层单独运行的用时，并将该层设置为最快的后端。
+
+    调优结果以层的签名（类名、超参数、输入的形状和数据类型、是否包含反向传播）和机器（主机名、设备名和PyTorch版本）为键保存在
+    ``cache_file`` 中。之后的调用会直接使用已保存的结果，跳过测量。
+
+    * :ref:`中文 API <autotune-cn>`
+
+    .. _autotune-en:
+
+    :param net: the network to be tuned
+    :type net: nn.Module
+    :param example_input: the example input of the network, which is used to get the inputs of layers
+    :type example_input: Any
+    :param with_backward: if ``True``, the total time of the forward and backward is measured. Otherwise, only the time
+        of the forward is measured
+    :type with_backward: bool
+    :param n: the repeat times to measure each backend, see :class:`spikingjelly.activation_based.cuda_utils.cal_fun_t`
+    :type n: int
+    :param cache_file: the json file to save the tuning decisions. If ``'default'``, ``spikingjelly.configure.autotune_cache_file``
+        will be used. If ``None``, the decisions will be neither loaded nor saved
+    :type cache_file: Optional[str]
+    :param force: if ``True``, the saved decisions will be ignored and the backends will be measured again
+    :type force: bool
+    :return: a dict whose keys are the names of modules and values are the chosen backends
+    :rtype: dict
+
+    Chooses the fastest backend for each :class:`MemoryModule <spikingjelly.activation_based.base.MemoryModule>` in
+    ``net`` that supports more than one backend (e.g., neurons in the multi-step mode and
+    :class:`SlidingPSN <spikingjelly.activation_based.neuron.SlidingPSN>`).
+
+    The network is run once on ``example_input`` to get the input of each layer. Then for each available backend of each
+    layer, the time of running this layer alone is measured by
+    :class:`cal_fun_t <spikingjelly.activation_based.cuda_utils.cal_fun_t>`, and the layer is set to the fastest backend.
+
+    The decisions are saved in ``cache_file``, keyed by the layer signature (the class name, the hyper-parameters, the
+    shape and dtype of the input, and whether the backward is included) and the machine (the host name, the device name
+    and the PyTorch version). Later calls use the saved decisions directly and skip measuring.
+
+    Codes example:
+
+    .. code-block:: python
+
+        net = nn.Sequential(layer.Linear(784, 256), neuron.LIFNode(), layer.Linear(256, 10), neuron.LIFNode())
+        functional.set_step_mode(net, 'm')
+        x_seq = torch.rand([8, 64, 784])
+        print(functional.autotune(net, x_seq))
+        # {'1': 'cpp', '3': 'cpp'}
+    """
+    if cache_file == 'default':
+        cache_file = configure.autotune_cache_file
+
+    tuned_modules = {}
+    for name, m in net.named_modules():
+        if isinstance(m, base.MemoryModule):
+            backends = m.supported_backends
+            if isinstance(backends, str):
+                backends = (backends,)
+            if len(backends) > 1:
+                tuned_modules[name] = m
+
+    inputs = {}
+    handles = []
+    for name, m in tuned_modules.items():
+        def hook(module, args, name=name):
+            if name not in inputs and len(args) > 0 and isinstance(args[0], Tensor):
+                inputs[name] = args[0].detach().clone()
+        handles.append(m.register_forward_pre_hook(hook))
+    reset_net(net)
+    with torch.no_grad():
+        net(example_input)
+    reset_net(net)
+    for handle in handles:
+        handle.remove()
+
+    cache = _load_autotune_cache(cache_file)
+    decisions = {}
+    updated = False
+    for name, m in tuned_modules.items():
+        if name not in inputs:
+            continue
+        x = inputs[name]
+        machine_key = _autotune_machine_key(x.device)
+        layer_key = _autotune_layer_key(m, x, with_backward)
+        machine_cache = cache.setdefault(machine_key, {})
+        backend = machine_cache.get(layer_key)
+
+        if force or backend not in m.supported_backends:
+            if with_backward:
+                x.requires_grad_(True)
+
+            def run(module: base.MemoryModule):
+                module.reset()
+                if with_backward:
+                    module(x).sum().backward()
+                else:
+                    with torch.no_grad():
+                        module(x)
+
+            device = 'cpu' if x.device.type == 'cpu' else x.device
+            used_times = {}
+            for candidate in m.supported_backends:
+                try:
+                    base.check_backend_library(candidate)
+                    m_candidate = copy.deepcopy(m)
+                    m_candidate.backend = candidate
+                    used_times[candidate] = float(cuda_utils.cal_fun_t(n, device, run, m_candidate))
+                except Exception as e:
+                    logging.info(f'spikingjelly.activation_based.functional.autotune: backend {candidate} of {name} '
+                                 f'is skipped: {e}')
+            if len(used_times) == 0:
+                continue
+            backend = min(used_times, key=used_times.get)
+            logging.info(f'spikingjelly.activation_based.functional.autotune: used times of {name} are {used_times}, '
+                         f'choose {backend}')
+            machine_cache[layer_key] = backend
+            updated = True
+
+        m.backend = backend
+        decisions[name] = backend
+
+    if updated:
+        _save_autotune_cache(cache_file, cache)
+    return decisions
+
+
 @torch.jit.script
 def temporal_efficient_training_cross_entropy(x_seq: Tensor, target: torch.Tensor):
     """
@@ -1260,6 +2394,321 @@ def delay(x_seq: torch.Tensor, delay_steps: int):
     y = torch.zeros_like(x_seq[0: delay_steps].data)
     return torch.cat((y, x_seq[0: x_seq.shape[0] - delay_steps]), 0)
 
+class LinearRecurrenceScan(torch.autograd.Function):
+    @staticmethod
+    def is_time_varying(x_seq: Tensor, decay: Union[float, Tensor]):
+        return isinstance(decay, Tensor) and decay.dim() == x_seq.dim() and decay.shape[0] > 1
+
+    @staticmethod
+    def scan(x_seq: Tensor, decay: Union[float, Tensor]):
+        # y[t] = decay[t] * y[t - 1] + x[t] with y[-1] = 0
+        if not isinstance(decay, Tensor) and decay == 1.:
+            return torch.cumsum(x_seq, 0)
+
+        time_varying = LinearRecurrenceScan.is_time_varying(x_seq, decay)
+        T = x_seq.shape[0]
+        y_seq = x_seq
+        # after the step with offset d, y_seq[t] = sum_{t - 2d < i <= t} (prod_{i < j <= t} decay[j]) * x[i], and
+        # a[t] = prod_{t - 2d < j <= t} decay[j]
+        a = decay
+        d = 1
+        while d < T:
+            if time_varying:
+                y_seq = torch.cat((y_seq[0: d], torch.addcmul(y_seq[d:], a[d:], y_seq[0: T - d])))
+                a = torch.cat((a[0: d], a[d:] * a[0: T - d]))
+            else:
+                y_seq = torch.cat((y_seq[0: d], y_seq[d:] + a * y_seq[0: T - d]))
+                a = a * a
+            d *= 2
+        return y_seq
+
+    @staticmethod
+    def forward(ctx, x_seq: Tensor, decay: Union[float, Tensor]):
+        y_seq = LinearRecurrenceScan.scan(x_seq, decay)
+        if isinstance(decay, Tensor):
+            ctx.save_for_backward(y_seq if ctx.needs_input_grad[1] else None, decay)
+        else:
+            ctx.decay = decay
+        return y_seq
+
+    @staticmethod
+    def backward(ctx, grad_y_seq: Tensor):
+        if hasattr(ctx, 'decay'):
+            y_seq = None
+            decay = ctx.decay
+        else:
+            y_seq, decay = ctx.saved_tensors
+
+        # grad_x[t] = grad_y[t] + decay[t + 1] * grad_x[t + 1], which is a scan in the reversed order
+        if LinearRecurrenceScan.is_time_varying(grad_y_seq, decay):
+            decay_next = torch.cat((decay[1:], torch.zeros_like(decay[0: 1])))
+            grad_x_seq = LinearRecurrenceScan.scan(grad_y_seq.flip(0), decay_next.flip(0)).flip(0)
+        else:
+            grad_x_seq = LinearRecurrenceScan.scan(grad_y_seq.flip(0), decay).flip(0)
+
+        grad_decay = None
+        if ctx.needs_input_grad[1]:
+            y_prev_seq = torch.cat((torch.zeros_like(y_seq[0: 1]), y_seq[0: -1]))
+            grad_decay = (grad_x_seq * y_prev_seq).sum_to_size(decay.shape)
+
+        return grad_x_seq, grad_decay
+
+
+def linear_recurrence_scan(x_seq: Tensor, decay: Union[float, Tensor], y_init: Union[float, Tensor, None] = None):
+    """
+    * :ref:`API in English <linear_recurrence_scan-en>`
+
+    .. _linear_recurrence_scan-cn:
+
+    :param x_seq: 输入的序列，``shape = [T, *]``
+    :type x_seq: torch.Tensor
+    :param decay: 衰减系数，可以为 ``float``，或者能广播到 ``x_seq.shape`` 的tensor。若其 ``shape[0] == T``，则视为随时间变化的衰减系数
+    :type decay: Union[float, torch.Tensor]
+    :param y_init: ``y[-1]`` 的值，为 ``None`` 时视为0
+    :type y_init: Union[float, torch.Tensor, None]
+    :return: 输出序列 ``y_seq``，``shape = [T, *]``
+    :rtype: torch.Tensor
+
+    计算线性递推 ``y[t] = decay[t] * y[t - 1] + x[t]``。使用并行前缀扫描（Hillis-Steele scan），只需要 ``ceil(log2(T))`` 次向量化的
+    运算，不需要在 ``T`` 上进行Python循环。反向传播同样是一次逆序的扫描。``decay`` 是tensor时，支持计算 ``decay`` 的梯度。
+
+    无重置的线性动态，例如 :class:`NonSpikingIFNode <spikingjelly.activation_based.neuron.NonSpikingIFNode>`、
+    :class:`NonSpikingLIFNode <spikingjelly.activation_based.neuron.NonSpikingLIFNode>`、
+    :class:`SynapseFilter <spikingjelly.activation_based.layer.SynapseFilter>` 和
+    :class:`stdp_multi_step <spikingjelly.activation_based.learning.stdp_multi_step>` 中的迹，在多步模式下都使用此函数计算。
+
+    代码示例：
+
+    .. code-block:: python
+
+        x_seq = torch.rand([8, 4])
+        tau = 2.
+        # the charge of NonSpikingLIFNode: v[t] = v[t - 1] + (x[t] - v[t - 1]) / tau
+        v_seq = linear_recurrence_scan(x_seq / tau, 1. - 1. / tau)
+
+    * :ref:`中文API <linear_recurrence_scan-cn>`
+
+    .. _linear_recurrence_scan-en:
+
+    :param x_seq: the input sequence with ``shape = [T, *]``
+    :type x_seq: torch.Tensor
+    :param decay: the decay factor, which can be a ``float`` or a tensor that can be broadcast to ``x_seq.shape``. If its
+        ``shape[0] == T``, it will be regarded as a time-varying decay
+    :type decay: Union[float, torch.Tensor]
+    :param y_init: the value of ``y[-1]``, which is regarded as 0 if it is ``None``
+    :type y_init: Union[float, torch.Tensor, None]
+    :return: the output sequence ``y_seq`` with ``shape = [T, *]``
+    :rtype: torch.Tensor
+
+    Computes the linear recurrence ``y[t] = decay[t] * y[t - 1] + x[t]``. A parallel prefix scan (the Hillis-Steele
+    scan) is used, which only needs ``ceil(log2(T))`` vectorized operations rather than a Python loop over ``T``. The
+    backward is also a scan in the reversed order. If ``decay`` is a tensor, its gradient is supported.
+
+    The linear dynamics without reset, e.g., :class:`NonSpikingIFNode <spikingjelly.activation_based.neuron.NonSpikingIFNode>`,
+    :class:`NonSpikingLIFNode <spikingjelly.activation_based.neuron.NonSpikingLIFNode>`,
+    :class:`SynapseFilter <spikingjelly.activation_based.layer.SynapseFilter>` and the traces in
+    :class:`stdp_multi_step <spikingjelly.activation_based.learning.stdp_multi_step>`, use this function in the multi-step mode.
+
+    Codes example:
+
+    .. code-block:: python
+
+        x_seq = torch.rand([8, 4])
+        tau = 2.
+        # the charge of NonSpikingLIFNode: v[t] = v[t - 1] + (x[t] - v[t - 1]) / tau
+        v_seq = linear_recurrence_scan(x_seq / tau, 1. - 1. / tau)
+    """
+    if y_init is not None and not (isinstance(y_init, float) and y_init == 0.):
+        if isinstance(decay, Tensor) and decay.dim() == x_seq.dim():
+            decay_0 = decay[0]
+        else:
+            decay_0 = decay
+        x_seq = torch.cat(((x_seq[0] + decay_0 * y_init).unsqueeze(0), x_seq[1:]))
+    return LinearRecurrenceScan.apply(x_seq, decay)
+
+def is_sparse_spike(x: Tensor, threshold: float):
+    """
+    * :ref:`API in English <is_sparse_spike-en>`
+
+    .. _is_sparse_spike-cn:
+
+    :param x: 输入
+    :type x: Union[torch.Tensor, SpikeTensor]
+    :param threshold: 发放率的阈值
+    :type threshold: float
+    :return: ``x`` 是否为发放率不超过 ``threshold`` 的脉冲
+    :rtype: bool
+
+    判断 ``x`` 中的元素是否都是0或1，且非零元素的比例不超过 ``threshold``。稀疏计算只支持 ``torch.float32`` 和 ``torch.float64``，
+    其他数据类型（例如 ``torch.bfloat16`` 和 ``torch.half``）总是返回 ``False``，以使用稠密计算。
+
+    * :ref:`中文API <is_sparse_spike-cn>`
+
+    .. _is_sparse_spike-en:
+
+    :param x: the input
+    :type x: Union[torch.Tensor, SpikeTensor]
+    :param threshold: the threshold of the firing rate
+    :type threshold: float
+    :return: whether ``x`` is a spike tensor whose firing rate is not larger than ``threshold``
+    :rtype: bool
+
+    Checks whether all elements of ``x`` are 0 or 1 and the ratio of non-zero elements is not larger than ``threshold``.
+    The sparse computation only supports ``torch.float32`` and ``torch.float64``, and ``False`` is always returned for
+    other dtypes (e.g., ``torch.bfloat16`` and ``torch.half``) to use the dense computation.
+    """
+    if x.dtype not in (torch.float32, torch.float64):
+        return False
+    if isinstance(x, spike_tensor.SpikeTensor):
+        # the packed spikes are always 0 or 1, and the firing rate is counted without unpacking
+        return x.numel() > 0 and x.firing_rate() <= threshold
+    if not x.is_floating_point() or x.numel() == 0:
+        return False
+    nnz = torch.count_nonzero(x).item()
+    if nnz > threshold * x.numel():
+        return False
+    return torch.count_nonzero(x == 1.).item() == nnz
+
+
+def sparse_spike_linear(spike: Tensor, weight: Tensor, bias: Optional[Tensor] = None, weight_t: Optional[Tensor] = None):
+    """
+    * :ref:`API in English <sparse_spike_linear-en>`
+
+    .. _sparse_spike_linear-cn:
+
+    :param spike: 输入脉冲，``shape = [*, in_features]``，也可以是按位压缩的脉冲
+    :type spike: Union[torch.Tensor, SpikeTensor]
+    :param weight: 权重，``shape = [out_features, in_features]``
+    :type weight: torch.Tensor
+    :param bias: 偏置，``shape = [out_features]``
+    :type bias: Optional[torch.Tensor]
+    :param weight_t: 连续的 ``weight.t()``。稀疏矩阵乘法需要连续的 ``weight.t()``，调用者可以缓存它以避免每次都进行转置
+    :type weight_t: Optional[torch.Tensor]
+    :return: 与 ``torch.nn.functional.linear(spike, weight, bias)`` 相同的输出
+    :rtype: torch.Tensor
+
+    将 ``spike`` 转换为CSR稀疏矩阵后计算全连接层，即对每个输出只累加被激活的输入对应的权重列。发放率很低时比稠密的矩阵乘法更快。
+    只用于推理。
+
+    * :ref:`中文API <sparse_spike_linear-cn>`
+
+    .. _sparse_spike_linear-en:
+
+    :param spike: the input spikes with ``shape = [*, in_features]``, which can also be the bit-packed spikes
+    :type spike: Union[torch.Tensor, SpikeTensor]
+    :param weight: the weight with ``shape = [out_features, in_features]``
+    :type weight: torch.Tensor
+    :param bias: the bias with ``shape = [out_features]``
+    :type bias: Optional[torch.Tensor]
+    :param weight_t: the contiguous ``weight.t()``. The sparse matrix multiplication requires the contiguous
+        ``weight.t()``, and the caller can cache it to avoid transposing in each call
+    :type weight_t: Optional[torch.Tensor]
+    :return: the same output as ``torch.nn.functional.linear(spike, weight, bias)``
+    :rtype: torch.Tensor
+
+    Converts ``spike`` to a CSR sparse matrix and computes the linear layer, i.e., for each output only the weight
+    columns of the active inputs are accumulated. It is faster than the dense matrix multiplication when the firing rate
+    is low. It is only used for inference.
+    """
+    if weight_t is None:
+        weight_t = weight.t().contiguous()
+    out_shape = spike.shape[0: -1] + (weight_t.shape[1],)
+    spike = spike.reshape(-1, spike.shape[-1])
+
+    # building the CSR matrix from the indices of spikes is faster than `spike.to_sparse_csr()`
+    if isinstance(spike, spike_tensor.SpikeTensor):
+        # the indices are read from the packed spikes directly without unpacking
+        flat_indices = spike.nonzero_flat_indices()
+        rows = torch.div(flat_indices, spike.shape[1], rounding_mode='floor')
+        cols = flat_indices - rows * spike.shape[1]
+    else:
+        rows, cols = spike.nonzero(as_tuple=True)
+    crow_indices = torch.zeros(spike.shape[0] + 1, device=spike.device, dtype=torch.int64)
+    torch.cumsum(torch.bincount(rows, minlength=spike.shape[0]), 0, out=crow_indices[1:])
+    spike = torch.sparse_csr_tensor(crow_indices, cols, torch.ones(cols.shape[0], device=spike.device, dtype=spike.dtype),
+                                    size=spike.shape)
+
+    if bias is None:
+        y = torch.sparse.mm(spike, weight_t)
+    else:
+        y = torch.addmm(bias, spike, weight_t)
+    return y.view(out_shape)
+
+
+def sparse_spike_conv2d(spike: Tensor, weight: Tensor, bias: Optional[Tensor] = None, stride: tuple = (1, 1),
+                        padding: tuple = (0, 0), dilation: tuple = (1, 1)):
+    """
+    * :ref:`API in English <sparse_spike_conv2d-en>`
+
+    .. _sparse_spike_conv2d-cn:
+
+    :param spike: 输入脉冲，``shape = [N, C_in, H, W]``
+    :type spike: torch.Tensor
+    :param weight: 权重，``shape = [C_out, C_in, kH, kW]``
+    :type weight: torch.Tensor
+    :param bias: 偏置，``shape = [C_out]``
+    :type bias: Optional[torch.Tensor]
+    :param stride: 步长
+    :type stride: tuple
+    :param padding: 补零的数量
+    :type padding: tuple
+    :param dilation: 膨胀
+    :type dilation: tuple
+    :return: 与 ``torch.nn.functional.conv2d(spike, weight, bias, stride, padding, dilation)`` 相同的输出
+    :rtype: torch.Tensor
+
+    只遍历被激活的输入，对每个卷积核的位置，将激活的输入对应的权重 ``weight[:, c, kh, kw]`` 累加到其影响的输出位置上。计算量与脉冲的数量
+    成正比，发放率很低时比稠密的卷积更快。只支持 ``groups = 1``，只用于推理。
+
+    * :ref:`中文API <sparse_spike_conv2d-cn>`
+
+    .. _sparse_spike_conv2d-en:
+
+    :param spike: the input spikes with ``shape = [N, C_in, H, W]``
+    :type spike: torch.Tensor
+    :param weight: the weight with ``shape = [C_out, C_in, kH, kW]``
+    :type weight: torch.Tensor
+    :param bias: the bias with ``shape = [C_out]``
+    :type bias: Optional[torch.Tensor]
+    :param stride: the stride
+    :type stride: tuple
+    :param padding: the zero padding
+    :type padding: tuple
+    :param dilation: the dilation
+    :type dilation: tuple
+    :return: the same output as ``torch.nn.functional.conv2d(spike, weight, bias, stride, padding, dilation)``
+    :rtype: torch.Tensor
+
+    Only iterates over the active inputs. For each position of the kernel, the weights ``weight[:, c, kh, kw]`` of the
+    active inputs are accumulated to the output positions that they affect. The cost is proportional to the number of
+    spikes, which is faster than the dense convolution when the firing rate is low. Only ``groups = 1`` is supported,
+    and it is only used for inference.
+    """
+    N, _, H, W = spike.shape
+    C_out, _, kH, kW = weight.shape
+    OH = (H + 2 * padding[0] - dilation[0] * (kH - 1) - 1) // stride[0] + 1
+    OW = (W + 2 * padding[1] - dilation[1] * (kW - 1) - 1) // stride[1] + 1
+
+    if bias is None:
+        y = torch.zeros([N * OH * OW, C_out], device=spike.device, dtype=weight.dtype)
+    else:
+        y = bias.expand(N * OH * OW, C_out).clone()
+
+    n, c, h, w = spike.nonzero(as_tuple=True)
+    # weight_k[kh, kw] is the weight of the kernel position (kh, kw) with shape = [C_in, C_out]
+    weight_k = weight.permute(2, 3, 1, 0)
+    for kh in range(kH):
+        oh = h + padding[0] - kh * dilation[0]
+        for kw in range(kW):
+            ow = w + padding[1] - kw * dilation[1]
+            mask = (oh >= 0) & (ow >= 0) & (oh % stride[0] == 0) & (ow % stride[1] == 0)
+            mask &= (oh < OH * stride[0]) & (ow < OW * stride[1])
+            rows = (n[mask] * OH + oh[mask] // stride[0]) * OW + ow[mask] // stride[1]
+            y.index_add_(0, rows, weight_k[kh, kw].index_select(0, c[mask]))
+
+    return y.view(N, OH, OW, C_out).permute(0, 3, 1, 2)
+
+
 def fptt_online_training_init_w_ra(optimizer: torch.optim.Optimizer) -> list:
     w_ra = []
     for item in optimizer.param_groups:
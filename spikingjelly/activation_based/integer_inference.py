@@ -0,0 +1,679 @@
+import logging
+import math
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from typing import Callable, Optional, Union
+from . import base, functional, layer, neuron
+
+
+def quantize_symmetric(x: torch.Tensor, bits: int):
+    """
+    :param x: a float tensor
+    :type x: torch.Tensor
+    :param bits: the number of bits
+    :type bits: int
+    :return: a tuple ``(x_int, scale)``, where ``x_int`` is an integer tensor with ``-(2 ** (bits - 1) - 1) <= x_int <= 2 ** (bits - 1) - 1`` and ``x ≈ x_int * scale``
+    :rtype: tuple
+
+    The per-tensor symmetric quantization, where ``scale = max(abs(x)) / (2 ** (bits - 1) - 1)``.
+    """
+    q_max = (1 << (bits - 1)) - 1
+    scale = x.abs().max().item() / q_max
+    if scale == 0.:
+        scale = 1.
+    x_int = torch.round(x / scale).clamp_(-q_max, q_max)
+    return x_int, scale
+
+
+def integer_dtype(bits: int):
+    if bits <= 8:
+        return torch.int8
+    elif bits <= 16:
+        return torch.int16
+    elif bits <= 32:
+        return torch.int32
+    else:
+        return torch.int64
+
+
+class IntegerQuantize(nn.Module, base.StepModule):
+    def __init__(self, scale: float, bits: int = 8, step_mode='s'):
+        """
+        * :ref:`API in English <IntegerQuantize.__init__-en>`
+
+        .. _IntegerQuantize.__init__-cn:
+
+        :param scale: 量化步长，输出 ``round(x / scale)``
+        :type scale: float
+        :param bits: 量化的位数
+        :type bits: int
+        :param step_mode: 步进模式，可以为 `'s'` (单步) 或 `'m'` (多步)
+        :type step_mode: str
+
+        整数网络的输入层，将浮点输入量化为 ``bits`` 位的有符号整数。这是整数网络中唯一的浮点运算，只在输入处进行一次。
+        若输入已经是整数（例如脉冲或事件），则直接转换数据类型。
+
+        * :ref:`中文API <IntegerQuantize.__init__-cn>`
+
+        .. _IntegerQuantize.__init__-en:
+
+        :param scale: the quantization step, and ``round(x / scale)`` will be outputted
+        :type scale: float
+        :param bits: the number of bits
+        :type bits: int
+        :param step_mode: the step mode, which can be `s` (single-step) or `m` (multi-step)
+        :type step_mode: str
+
+        The input layer of the integer network, which quantizes the float input to ``bits``-bit signed integers. It is
+        the only float operation in the integer network, which is only done once at the input. If the input is already
+        integers (e.g., spikes or events), only the dtype is converted.
+        """
+        super().__init__()
+        self.scale = scale
+        self.bits = bits
+        self.step_mode = step_mode
+
+    def extra_repr(self):
+        return f'scale={self.scale}, bits={self.bits}, step_mode={self.step_mode}'
+
+    def forward(self, x: torch.Tensor):
+        dtype = integer_dtype(self.bits)
+        if x.is_floating_point():
+            q_max = (1 << (self.bits - 1)) - 1
+            x = torch.round(x / self.scale).clamp_(-q_max, q_max)
+        return x.to(dtype)
+
+
+class IntegerLinear(nn.Module, base.StepModule):
+    def __init__(self, weight: torch.Tensor, bias: Optional[torch.Tensor], scale: float, step_mode='s'):
+        """
+        * :ref:`API in English <IntegerLinear.__init__-en>`
+
+        .. _IntegerLinear.__init__-cn:
+
+        :param weight: 整数权重，``dtype=torch.int8``
+        :type weight: torch.Tensor
+        :param bias: 整数偏置，``dtype=torch.int32``
+        :type bias: Optional[torch.Tensor]
+        :param scale: 输出对应的实数值为 ``scale * y``，只用于记录，不参与计算
+        :type scale: float
+        :param step_mode: 步进模式，可以为 `'s'` (单步) 或 `'m'` (多步)
+        :type step_mode: str
+
+        使用 ``int32`` 累加的整数全连接层。
+
+        * :ref:`中文API <IntegerLinear.__init__-cn>`
+
+        .. _IntegerLinear.__init__-en:
+
+        :param weight: the integer weight with ``dtype=torch.int8``
+        :type weight: torch.Tensor
+        :param bias: the integer bias with ``dtype=torch.int32``
+        :type bias: Optional[torch.Tensor]
+        :param scale: the real value of the output is ``scale * y``, which is only recorded and not used in computation
+        :type scale: float
+        :param step_mode: the step mode, which can be `s` (single-step) or `m` (multi-step)
+        :type step_mode: str
+
+        The integer linear layer with ``int32`` accumulation.
+        """
+        super().__init__()
+        self.register_buffer('weight', weight)
+        self.register_buffer('bias', bias)
+        self.scale = scale
+        self.step_mode = step_mode
+
+    def extra_repr(self):
+        return f'in_features={self.weight.shape[1]}, out_features={self.weight.shape[0]}, bias={self.bias is not None}, scale={self.scale}, step_mode={self.step_mode}'
+
+    def forward(self, x: torch.Tensor):
+        return F.linear(x.to(torch.int32), self.weight.to(torch.int32), self.bias)
+
+
+class IntegerConv2d(nn.Module, base.StepModule):
+    def __init__(self, weight: torch.Tensor, bias: Optional[torch.Tensor], scale: float, stride=1, padding=0,
+                 dilation=1, groups: int = 1, step_mode='s'):
+        """
+        * :ref:`API in English <IntegerConv2d.__init__-en>`
+
+        .. _IntegerConv2d.__init__-cn:
+
+        :param weight: 整数权重，``dtype=torch.int8``
+        :type weight: torch.Tensor
+        :param bias: 整数偏置，``dtype=torch.int32``
+        :type bias: Optional[torch.Tensor]
+        :param scale: 输出对应的实数值为 ``scale * y``，只用于记录，不参与计算
+        :type scale: float
+        :param step_mode: 步进模式，可以为 `'s'` (单步) 或 `'m'` (多步)
+        :type step_mode: str
+
+        使用 ``int32`` 累加的整数卷积层。其他的参数API参见 :class:`torch.nn.Conv2d`
+
+        * :ref:`中文API <IntegerConv2d.__init__-cn>`
+
+        .. _IntegerConv2d.__init__-en:
+
+        :param weight: the integer weight with ``dtype=torch.int8``
+        :type weight: torch.Tensor
+        :param bias: the integer bias with ``dtype=torch.int32``
+        :type bias: Optional[torch.Tensor]
+        :param scale: the real value of the output is ``scale * y``, which is only recorded and not used in computation
+        :type scale: float
+        :param step_mode: the step mode, which can be `s` (single-step) or `m` (multi-step)
+        :type step_mode: str
+
+        The integer convolutional layer with ``int32`` accumulation. Refer to :class:`torch.nn.Conv2d` for other
+        parameters' API
+        """
+        super().__init__()
+        self.register_buffer('weight', weight)
+        self.register_buffer('bias', bias)
+        self.scale = scale
+        self.stride = stride
+        self.padding = padding
+        self.dilation = dilation
+        self.groups = groups
+        self.step_mode = step_mode
+
+    def extra_repr(self):
+        return f'{self.weight.shape[1] * self.groups}, {self.weight.shape[0]}, kernel_size={tuple(self.weight.shape[2:])}, stride={self.stride}, padding={self.padding}, scale={self.scale}, step_mode={self.step_mode}'
+
+    def conv2d_forward(self, x: torch.Tensor):
+        return F.conv2d(x.to(torch.int32), self.weight.to(torch.int32), self.bias, self.stride, self.padding,
+                        self.dilation, self.groups)
+
+    def forward(self, x: torch.Tensor):
+        if self.step_mode == 's':
+            return self.conv2d_forward(x)
+        elif self.step_mode == 'm':
+            return functional.seq_to_ann_forward(x, self.conv2d_forward)
+        else:
+            raise ValueError(self.step_mode)
+
+
+class IntegerSumPool2d(nn.Module, base.StepModule):
+    def __init__(self, kernel_size, stride=None, padding=0, step_mode='s'):
+        """
+        * :ref:`API in English <IntegerSumPool2d.__init__-en>`
+
+        .. _IntegerSumPool2d.__init__-cn:
+
+        :param step_mode: 步进模式，可以为 `'s'` (单步) 或 `'m'` (多步)
+        :type step_mode: str
+
+        整数求和池化层，用于替换平均池化层。除以窗口大小的操作被合并到下一层的缩放系数中。其他的参数API参见 :class:`torch.nn.AvgPool2d`
+
+        * :ref:`中文API <IntegerSumPool2d.__init__-cn>`
+
+        .. _IntegerSumPool2d.__init__-en:
+
+        :param step_mode: the step mode, which can be `s` (single-step) or `m` (multi-step)
+        :type step_mode: str
+
+        The integer sum pooling layer, which replaces the average pooling layer. The division by the window size is
+        merged into the scale of the next layer. Refer to :class:`torch.nn.AvgPool2d` for other parameters' API
+        """
+        super().__init__()
+        self.kernel_size = nn.modules.utils._pair(kernel_size)
+        self.stride = self.kernel_size if stride is None else nn.modules.utils._pair(stride)
+        self.padding = nn.modules.utils._pair(padding)
+        self.step_mode = step_mode
+
+    def extra_repr(self):
+        return f'kernel_size={self.kernel_size}, stride={self.stride}, padding={self.padding}, step_mode={self.step_mode}'
+
+    def sum_pool2d_forward(self, x: torch.Tensor):
+        # avg_pool2d does not support integers, and the sum pooling is a depthwise convolution with an all-ones kernel
+        C = x.shape[1]
+        kernel = torch.ones([C, 1, *self.kernel_size], dtype=torch.int32, device=x.device)
+        return F.conv2d(x.to(torch.int32), kernel, None, self.stride, self.padding, 1, C)
+
+    def forward(self, x: torch.Tensor):
+        if self.step_mode == 's':
+            return self.sum_pool2d_forward(x)
+        elif self.step_mode == 'm':
+            return functional.seq_to_ann_forward(x, self.sum_pool2d_forward)
+        else:
+            raise ValueError(self.step_mode)
+
+
+class IntegerIFNode(base.MemoryModule):
+    def __init__(self, v_threshold: int, v_reset: Optional[int] = 0, v_dtype: torch.dtype = torch.int32,
+                 step_mode='s'):
+        """
+        * :ref:`API in English <IntegerIFNode.__init__-en>`
+
+        .. _IntegerIFNode.__init__-cn:
+
+        :param v_threshold: 整数阈值电压
+        :type v_threshold: int
+        :param v_reset: 整数重置电压。为 ``None`` 时使用软重置
+        :type v_reset: Optional[int]
+        :param v_dtype: 膜电位的数据类型，``torch.int16`` 或 ``torch.int32``
+        :type v_dtype: torch.dtype
+        :param step_mode: 步进模式，可以为 `'s'` (单步) 或 `'m'` (多步)
+        :type step_mode: str
+
+        只使用整数运算的IF神经元，用于推理。输出 ``dtype=torch.int8`` 的脉冲。
+
+        * :ref:`中文API <IntegerIFNode.__init__-cn>`
+
+        .. _IntegerIFNode.__init__-en:
+
+        :param v_threshold: the integer threshold
+        :type v_threshold: int
+        :param v_reset: the integer reset potential. If ``None``, the soft reset is used
+        :type v_reset: Optional[int]
+        :param v_dtype: the dtype of the membrane potential, ``torch.int16`` or ``torch.int32``
+        :type v_dtype: torch.dtype
+        :param step_mode: the step mode, which can be `s` (single-step) or `m` (multi-step)
+        :type step_mode: str
+
+        The IF neuron using only integer arithmetic for inference, which outputs spikes with ``dtype=torch.int8``.
+        """
+        super().__init__()
+        self.v_threshold = v_threshold
+        self.v_reset = v_reset
+        self.v_dtype = v_dtype
+        self.register_memory('v', 0 if v_reset is None else v_reset)
+        self.step_mode = step_mode
+
+    def extra_repr(self):
+        return f'v_threshold={self.v_threshold}, v_reset={self.v_reset}, v_dtype={self.v_dtype}, ' + super().extra_repr()
+
+    def v_int_to_tensor(self, x: torch.Tensor):
+        if isinstance(self.v, int):
+            self.v = torch.full(x.shape, self.v, dtype=self.v_dtype, device=x.device)
+
+    def neuronal_charge(self, x: torch.Tensor):
+        self.v = self.v + x.to(self.v_dtype)
+
+    def neuronal_fire_and_reset(self):
+        spike = self.v >= self.v_threshold
+        if self.v_reset is None:
+            self.v = self.v - spike.to(self.v_dtype) * self.v_threshold
+        else:
+            self.v = torch.where(spike, self.v_reset, self.v)
+        return spike.to(torch.int8)
+
+    def single_step_forward(self, x: torch.Tensor):
+        self.v_int_to_tensor(x)
+        self.neuronal_charge(x)
+        return self.neuronal_fire_and_reset()
+
+
+class IntegerLIFNode(IntegerIFNode):
+    def __init__(self, decay_shift: int, v_threshold: int, v_reset: Optional[int] = 0, decay_multiplier: int = 1,
+                 decay_input: bool = True, v_dtype: torch.dtype = torch.int32, step_mode='s'):
+        """
+        * :ref:`API in English <IntegerLIFNode.__init__-en>`
+
+        .. _IntegerLIFNode.__init__-cn:
+
+        :param decay_shift: 衰减使用的右移位数
+        :type decay_shift: int
+        :param decay_multiplier: 右移前乘的整数。``tau`` 是2的幂时为1，此时衰减只使用移位
+        :type decay_multiplier: int
+        :param decay_input: 输入是否参与衰减
+        :type decay_input: bool
+
+        其他的参数API参见 :class:`IntegerIFNode <spikingjelly.activation_based.integer_inference.IntegerIFNode>`
+
+        只使用整数运算的LIF神经元，用于推理。``1 / tau`` 被近似为 ``decay_multiplier / 2 ** decay_shift``，充电方程为
+
+        .. code-block:: python
+
+            if decay_input:
+                v = v + ((x - (v - v_reset)) * decay_multiplier >> decay_shift)
+            else:
+                v = v - ((v - v_reset) * decay_multiplier >> decay_shift) + x
+
+        乘法使用 ``int64`` 计算，以避免乘积超出 ``v_dtype`` 的范围。
+
+        * :ref:`中文API <IntegerLIFNode.__init__-cn>`
+
+        .. _IntegerLIFNode.__init__-en:
+
+        :param decay_shift: the number of bits of the right shift in decay
+        :type decay_shift: int
+        :param decay_multiplier: the integer multiplied before the right shift. It is 1 when ``tau`` is a power of 2,
+            and the decay only uses the shift
+        :type decay_multiplier: int
+        :param decay_input: whether the input will decay
+        :type decay_input: bool
+
+        Refer to :class:`IntegerIFNode <spikingjelly.activation_based.integer_inference.IntegerIFNode>` for other
+        parameters' API
+
+        The LIF neuron using only integer arithmetic for inference. ``1 / tau`` is approximated by
+        ``decay_multiplier / 2 ** decay_shift``, and the charge equation is
+
+        .. code-block:: python
+
+            if decay_input:
+                v = v + ((x - (v - v_reset)) * decay_multiplier >> decay_shift)
+            else:
+                v = v - ((v - v_reset) * decay_multiplier >> decay_shift) + x
+
+        The multiplication is computed in ``int64`` to avoid the product exceeding the range of ``v_dtype``.
+        """
+        super().__init__(v_threshold, v_reset, v_dtype, step_mode)
+        self.decay_shift = decay_shift
+        self.decay_multiplier = decay_multiplier
+        self.decay_input = decay_input
+
+    def extra_repr(self):
+        return f'decay_shift={self.decay_shift}, decay_multiplier={self.decay_multiplier}, decay_input={self.decay_input}, ' + super().extra_repr()
+
+    def decay(self, x: torch.Tensor):
+        if self.decay_multiplier != 1:
+            # the product can exceed the range of v_dtype even if x does not, e.g., 1365 * x for tau = 3
+            x = x.to(torch.int64) * self.decay_multiplier
+        return (x >> self.decay_shift).to(self.v_dtype)
+
+    def neuronal_charge(self, x: torch.Tensor):
+        x = x.to(self.v_dtype)
+        v_leak = self.v if self.v_reset is None or self.v_reset == 0 else self.v - self.v_reset
+        if self.decay_input:
+            self.v = self.v + self.decay(x.to(torch.int64) - v_leak)
+        else:
+            self.v = self.v - self.decay(v_leak) + x
+
+
+def lif_decay_to_shift(tau: float, decay_bits: int = 12):
+    """
+    :param tau: the membrane time constant
+    :type tau: float
+    :param decay_bits: the number of fractional bits used when ``tau`` is not a power of 2
+    :type decay_bits: int
+    :return: a tuple ``(decay_shift, decay_multiplier)`` with ``1 / tau ≈ decay_multiplier / 2 ** decay_shift``
+    :rtype: tuple
+    """
+    log2_tau = math.log2(tau)
+    if log2_tau == round(log2_tau) and log2_tau >= 0:
+        return int(log2_tau), 1
+    return decay_bits, round((1 << decay_bits) / tau)
+
+
+def fold_batch_norm(weight: torch.Tensor, bias: Optional[torch.Tensor], bn: nn.modules.batchnorm._BatchNorm):
+    std = torch.sqrt(bn.running_var + bn.eps)
+    k = bn.weight / std if bn.affine else 1. / std
+    if bias is None:
+        bias = torch.zeros_like(bn.running_mean)
+    bias = (bias - bn.running_mean) * k
+    if bn.affine:
+        bias = bias + bn.bias
+    weight = weight * k.view(-1, *([1] * (weight.dim() - 1)))
+    return weight, bias
+
+
+def to_integer_net(net: Union[list, tuple, nn.Sequential], x_calibration: Optional[torch.Tensor] = None,
+                   weight_bits: int = 8, input_bits: int = 8, v_dtype: torch.dtype = torch.int32,
+                   decay_bits: int = 12):
+    """
+    * :ref:`API in English <to_integer_net-en>`
+
+    .. _to_integer_net-cn:
+
+    :param net: 训练好的网络，由 ``nn.Linear, nn.Conv2d, nn.BatchNorm1d, nn.BatchNorm2d, nn.AvgPool2d, nn.MaxPool2d,
+        nn.Flatten, nn.Dropout`` 及其在 :class:`layer <spikingjelly.activation_based.layer>` 中的对应层，以及
+        :class:`IFNode <spikingjelly.activation_based.neuron.IFNode>`, :class:`LIFNode <spikingjelly.activation_based.neuron.LIFNode>` 组成
+    :type net: Union[list, tuple, nn.Sequential]
+    :param x_calibration: 用于确定输入量化步长的样本输入。为 ``None`` 时认为输入已经是整数，例如脉冲
+    :type x_calibration: Optional[torch.Tensor]
+    :param weight_bits: 权重的位数
+    :type weight_bits: int
+    :param input_bits: 输入的位数
+    :type input_bits: int
+    :param v_dtype: 膜电位的数据类型
+    :type v_dtype: torch.dtype
+    :param decay_bits: ``tau`` 不是2的幂时，LIF神经元衰减使用的小数位数
+    :type decay_bits: int
+    :return: 只使用整数运算的网络
+    :rtype: nn.Sequential
+
+    将训练好的网络转换为只使用整数运算的推理网络。每个突触层的权重被逐层对称量化为 ``weight_bits`` 位整数，BN层被合并到前一个突触层。
+    设突触层输入的实数值为 ``s_in * x``，权重为 ``s_w * w``，则突触层的整数输出 ``y`` 对应实数值 ``s_in * s_w * y``，因此后续神经元的阈值、
+    重置电压与偏置都除以 ``s_in * s_w`` 后取整。脉冲神经元输出的脉冲的 ``s_in = 1``，平均池化被替换为求和池化，其 ``1 / k^2`` 被合并到
+    ``s_in`` 中。LIF神经元的衰减使用移位实现，参见 :class:`IntegerLIFNode <spikingjelly.activation_based.integer_inference.IntegerLIFNode>`。
+
+    转换后的网络与原网络的步进模式相同，可以使用 :class:`compare_accuracy <spikingjelly.activation_based.integer_inference.compare_accuracy>`
+    比较两者的正确率。
+
+    * :ref:`中文API <to_integer_net-cn>`
+
+    .. _to_integer_net-en:
+
+    :param net: the trained network, which consists of ``nn.Linear, nn.Conv2d, nn.BatchNorm1d, nn.BatchNorm2d,
+        nn.AvgPool2d, nn.MaxPool2d, nn.Flatten, nn.Dropout`` and their counterparts in
+        :class:`layer <spikingjelly.activation_based.layer>`, and
+        :class:`IFNode <spikingjelly.activation_based.neuron.IFNode>`, :class:`LIFNode <spikingjelly.activation_based.neuron.LIFNode>`
+    :type net: Union[list, tuple, nn.Sequential]
+    :param x_calibration: the example input used to decide the quantization step of the input. If ``None``, the
+        input is regarded as integers, e.g., spikes
+    :type x_calibration: Optional[torch.Tensor]
+    :param weight_bits: the number of bits of weights
+    :type weight_bits: int
+    :param input_bits: the number of bits of the input
+    :type input_bits: int
+    :param v_dtype: the dtype of the membrane potential
+    :type v_dtype: torch.dtype
+    :param decay_bits: the number of fractional bits of the decay of LIF neurons when ``tau`` is not a power of 2
+    :type decay_bits: int
+    :return: the network using only integer arithmetic
+    :rtype: nn.Sequential
+
+    Converts the trained network to an inference network using only integer arithmetic. The weight of each synaptic
+    layer is symmetrically quantized to ``weight_bits``-bit integers layer by layer, and BN layers are merged into the
+    previous synaptic layer. Denote the real value of the input of a synaptic layer as ``s_in * x`` and the weight as
+    ``s_w * w``, then the integer output ``y`` of the synaptic layer represents ``s_in * s_w * y``. Thus, the threshold,
+    the reset potential of the next neuron and the bias are divided by ``s_in * s_w`` and rounded. The spikes outputted
+    by spiking neurons have ``s_in = 1``. The average pooling is replaced by the sum pooling, whose ``1 / k^2`` is
+    merged into ``s_in``. The decay of LIF neurons is implemented by shifts, see
+    :class:`IntegerLIFNode <spikingjelly.activation_based.integer_inference.IntegerLIFNode>`.
+
+    The converted network has the same step mode as the original network, and
+    :class:`compare_accuracy <spikingjelly.activation_based.integer_inference.compare_accuracy>` can be used to compare
+    their accuracy.
+
+    Codes example:
+
+    .. code-block:: python
+
+        net = nn.Sequential(
+            layer.Conv2d(1, 8, 3, padding=1, bias=False),
+            layer.BatchNorm2d(8),
+            neuron.LIFNode(tau=2.),
+            layer.AvgPool2d(2),
+            layer.Flatten(),
+            layer.Linear(8 * 14 * 14, 10),
+            neuron.IFNode(),
+        )
+        functional.set_step_mode(net, 'm')
+        # train net...
+        net.eval()
+        x_seq = torch.rand([4, 32, 1, 28, 28])
+        int_net = integer_inference.to_integer_net(net, x_calibration=x_seq)
+        with torch.no_grad():
+            y_seq = int_net(x_seq)
+    """
+    modules = [m for m in net if not isinstance(m, (nn.Dropout, nn.Identity, layer.Dropout))]
+    step_mode = getattr(modules[0], 'step_mode', 's')
+
+    # [x_min, x_max] is the range of the integer input of the current module, which is used to check whether the
+    # membrane potential can be represented by v_dtype
+    if x_calibration is None:
+        scale = 1.
+        x_min, x_max = 0, 1
+    elif not x_calibration.is_floating_point() or torch.equal(x_calibration, torch.round(x_calibration)):
+        # integer-valued inputs, e.g., spikes, do not need to be scaled
+        scale = 1.
+        x_min, x_max = int(x_calibration.min().item()), int(x_calibration.max().item())
+    else:
+        scale = x_calibration.abs().max().item() / ((1 << (input_bits - 1)) - 1)
+        x_max = (1 << (input_bits - 1)) - 1
+        x_min = -x_max
+    int_modules = [IntegerQuantize(scale, input_bits, step_mode)]
+    v_info = torch.iinfo(v_dtype)
+
+    i = 0
+    while i < len(modules):
+        m = modules[i]
+        m_step_mode = getattr(m, 'step_mode', 's')
+        if isinstance(m, (nn.Linear, nn.Conv2d)):
+            weight = m.weight.detach()
+            bias = None if m.bias is None else m.bias.detach()
+            if i + 1 < len(modules) and isinstance(modules[i + 1], (nn.BatchNorm1d, nn.BatchNorm2d)):
+                weight, bias = fold_batch_norm(weight, bias, modules[i + 1])
+                i += 1
+            weight, w_scale = quantize_symmetric(weight, weight_bits)
+            weight = weight.to(integer_dtype(weight_bits))
+            scale = scale * w_scale
+            if bias is not None:
+                bias = torch.round(bias / scale).to(torch.int32)
+            # the range of the output of each channel
+            w = weight.to(torch.int64).flatten(1)
+            y_max = torch.maximum(w * x_min, w * x_max).sum(1)
+            y_min = torch.minimum(w * x_min, w * x_max).sum(1)
+            if bias is not None:
+                y_max = y_max + bias.to(torch.int64)
+                y_min = y_min + bias.to(torch.int64)
+            x_min, x_max = int(y_min.min().item()), int(y_max.max().item())
+            if isinstance(m, nn.Linear):
+                int_modules.append(IntegerLinear(weight, bias, scale, m_step_mode))
+            else:
+                if m.padding_mode != 'zeros' or isinstance(m.padding, str):
+                    raise NotImplementedError(f'{m} with padding={m.padding}, padding_mode={m.padding_mode}')
+                int_modules.append(IntegerConv2d(weight, bias, scale, m.stride, m.padding, m.dilation, m.groups,
+                                                 m_step_mode))
+
+        elif isinstance(m, (neuron.IFNode, neuron.LIFNode)):
+            v_threshold = round(m.v_threshold / scale)
+            v_reset = None if m.v_reset is None else round(m.v_reset / scale)
+            # the membrane potential before firing can reach the threshold (or the reset) plus one step of input
+            for name, value in (('v_threshold', v_threshold), ('v_reset', v_reset)):
+                if value is not None and (value + x_max > v_info.max or value + x_min < v_info.min):
+                    raise ValueError(f'The integer {name}={value} of {m._get_name()} plus the input in '
+                                     f'[{x_min}, {x_max}] exceeds the range [{v_info.min}, {v_info.max}] of '
+                                     f'v_dtype={v_dtype}. Please use a wider v_dtype, or smaller '
+                                     f'weight_bits/input_bits.')
+            if isinstance(m, neuron.LIFNode):
+                decay_shift, decay_multiplier = lif_decay_to_shift(m.tau, decay_bits)
+                if decay_multiplier != 1:
+                    logging.info(f'tau={m.tau} of {m} is not a power of 2, and 1 / tau is approximated by '
+                                 f'{decay_multiplier} / 2 ** {decay_shift}.')
+                    # the decay multiplies |x - (v - v_reset)| <= |x| + |v| + |v_reset| in int64
+                    x_abs = max(abs(x_min), abs(x_max))
+                    v_abs = max(abs(v_threshold), 0 if v_reset is None else abs(v_reset)) + x_abs
+                    product_max = decay_multiplier * (x_abs + v_abs + (0 if v_reset is None else abs(v_reset)))
+                    if product_max > torch.iinfo(torch.int64).max:
+                        raise ValueError(f'The decay of {m._get_name()} multiplies the input in [{x_min}, {x_max}] '
+                                         f'and the membrane potential by decay_multiplier={decay_multiplier}, '
+                                         f'which can reach {product_max} and exceed the range of int64. Please use '
+                                         f'smaller decay_bits/weight_bits/input_bits.')
+                int_modules.append(IntegerLIFNode(decay_shift, v_threshold, v_reset, decay_multiplier,
+                                                  m.decay_input, v_dtype, m_step_mode))
+            else:
+                int_modules.append(IntegerIFNode(v_threshold, v_reset, v_dtype, m_step_mode))
+            scale = 1.
+            x_min, x_max = 0, 1
+
+        elif isinstance(m, nn.AvgPool2d):
+            if m.ceil_mode or m.divisor_override is not None or (m.padding != 0 and not m.count_include_pad):
+                raise NotImplementedError(f'{m} with ceil_mode={m.ceil_mode}, divisor_override={m.divisor_override}, '
+                                          f'count_include_pad={m.count_include_pad}')
+            int_modules.append(IntegerSumPool2d(m.kernel_size, m.stride, m.padding, m_step_mode))
+            kernel_size = nn.modules.utils._pair(m.kernel_size)
+            scale = scale / (kernel_size[0] * kernel_size[1])
+            x_min = x_min * kernel_size[0] * kernel_size[1]
+            x_max = x_max * kernel_size[0] * kernel_size[1]
+
+        elif isinstance(m, nn.MaxPool2d):
+            int_modules.append(layer.MaxPool2d(m.kernel_size, m.stride, m.padding, m.dilation, m.return_indices,
+                                               m.ceil_mode, step_mode=m_step_mode))
+
+        elif isinstance(m, nn.Flatten):
+            int_modules.append(layer.Flatten(m.start_dim, m.end_dim, step_mode=m_step_mode))
+
+        else:
+            raise NotImplementedError(type(m))
+
+        i += 1
+
+    return nn.Sequential(*int_modules)
+
+
+def compare_accuracy(net: nn.Module, int_net: nn.Module, data_loader, forward_fn: Optional[Callable] = None,
+                     device: Union[str, torch.device] = 'cpu'):
+    """
+    * :ref:`API in English <compare_accuracy-en>`
+
+    .. _compare_accuracy-cn:
+
+    :param net: 浮点网络
+    :type net: nn.Module
+    :param int_net: :class:`to_integer_net <spikingjelly.activation_based.integer_inference.to_integer_net>` 转换得到的整数网络
+    :type int_net: nn.Module
+    :param data_loader: 返回 ``(x, label)`` 的数据集加载器
+    :param forward_fn: ``forward_fn(module, x)`` 返回 ``shape = [N, C]`` 的输出。为 ``None`` 时使用 ``module(x)``，若输出的
+        ``shape = [T, N, C]`` 则对时间维度求平均
+    :type forward_fn: Optional[Callable]
+    :param device: 运行的设备
+    :type device: Union[str, torch.device]
+    :return: 包含 ``'float_accuracy', 'integer_accuracy', 'agreement'`` 的字典，``'agreement'`` 是两个网络预测相同的样本的比例
+    :rtype: dict
+
+    在 ``data_loader`` 上比较浮点网络与整数网络的正确率。每个batch后都会重置两个网络。
+
+    * :ref:`中文API <compare_accuracy-cn>`
+
+    .. _compare_accuracy-en:
+
+    :param net: the float network
+    :type net: nn.Module
+    :param int_net: the integer network converted by
+        :class:`to_integer_net <spikingjelly.activation_based.integer_inference.to_integer_net>`
+    :type int_net: nn.Module
+    :param data_loader: the data loader returning ``(x, label)``
+    :param forward_fn: ``forward_fn(module, x)`` returns the output with ``shape = [N, C]``. If ``None``,
+        ``module(x)`` is used, and the output will be averaged over the time dimension if its ``shape = [T, N, C]``
+    :type forward_fn: Optional[Callable]
+    :param device: the device to run
+    :type device: Union[str, torch.device]
+    :return: a dict containing ``'float_accuracy', 'integer_accuracy', 'agreement'``, where ``'agreement'`` is the
+        ratio of samples on which the two networks predict the same label
+    :rtype: dict
+
+    Compares the accuracy of the float network and the integer network on ``data_loader``. Both networks are reset
+    after each batch.
+    """
+    if forward_fn is None:
+        def forward_fn(module: nn.Module, x: torch.Tensor):
+            y = module(x)
+            if y.dim() == 3:
+                y = y.float().mean(0)
+            return y
+
+    n_samples = 0
+    float_correct = 0
+    integer_correct = 0
+    agreement = 0
+    with torch.no_grad():
+        for x, label in data_loader:
+            x = x.to(device)
+            label = label.to(device)
+            float_pred = forward_fn(net, x).argmax(-1)
+            functional.reset_net(net)
+            integer_pred = forward_fn(int_net, x).argmax(-1)
+            functional.reset_net(int_net)
+            n_samples += label.numel()
+            float_correct += (float_pred == label).sum().item()
+            integer_correct += (integer_pred == label).sum().item()
+            agreement += (float_pred == integer_pred).sum().item()
+
+    return {
+        'float_accuracy': float_correct / n_samples,
+        'integer_accuracy': integer_correct / n_samples,
+        'agreement': agreement / n_samples
+    }
@@ -4,7 +4,7 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import math
-from . import base, functional
+from . import base, functional, spike_tensor
 from torch import Tensor
 from torch.nn.common_types import _size_any_t, _size_1_t, _size_2_t, _size_3_t, _ratio_any_t
 from typing import Optional, List, Tuple, Union
@@ -175,7 +175,9 @@ class Conv2d(nn.Conv2d, base.StepModule):
             groups: int = 1,
             bias: bool = True,
             padding_mode: str = 'zeros',
-            step_mode: str = 's'
+            step_mode: str = 's',
+            sparse_input: Optional[str] = None,
+            sparse_threshold: float = 0.003
     ) -> None:
         """
         * :ref:`API in English <Conv2d-en>`
@@ -184,6 +186,12 @@ class Conv2d(nn.Conv2d, base.StepModule):
 
         :param step_mode: 步进模式，可以为 `'s'` (单步) 或 `'m'` (多步)
         :type step_mode: str
+        :param sparse_input: 为 ``None`` 时总是使用稠密的卷积。为 ``'auto'`` 时，若在CPU上不计算梯度地推理，且输入是发放率不超过
+            ``sparse_threshold`` 的脉冲，则使用 :class:`sparse_spike_conv2d <spikingjelly.activation_based.functional.sparse_spike_conv2d>`
+            只对激活的输入进行计算
+        :type sparse_input: Optional[str]
+        :param sparse_threshold: 使用稀疏计算的发放率阈值
+        :type sparse_threshold: float
 
         其他的参数API参见 :class:`torch.nn.Conv2d`
 
@@ -193,23 +201,49 @@ class Conv2d(nn.Conv2d, base.StepModule):
 
         :param step_mode: the step mode, which can be `s` (single-step) or `m` (multi-step)
         :type step_mode: str
+        :param sparse_input: if ``None``, the dense convolution is always used. If ``'auto'``, when running inference
+            without gradients on CPU and the input is a spike tensor whose firing rate is not larger than
+            ``sparse_threshold``, :class:`sparse_spike_conv2d <spikingjelly.activation_based.functional.sparse_spike_conv2d>`
+            will be used to only compute the active inputs
+        :type sparse_input: Optional[str]
+        :param sparse_threshold: the threshold of the firing rate for using the sparse computation
+        :type sparse_threshold: float
 
         Refer to :class:`torch.nn.Conv2d` for other parameters' API
         """
         super().__init__(in_channels, out_channels, kernel_size, stride, padding, dilation, groups, bias, padding_mode)
         self.step_mode = step_mode
+        assert sparse_input in (None, 'auto')
+        self.sparse_input = sparse_input
+        self.sparse_threshold = sparse_threshold
 
     def extra_repr(self):
-        return super().extra_repr() + f', step_mode={self.step_mode}'
+        s = super().extra_repr() + f', step_mode={self.step_mode}'
+        if self.sparse_input is not None:
+            s += f', sparse_input={self.sparse_input}, sparse_threshold={self.sparse_threshold}'
+        return s
+
+    def use_sparse_input(self, x: Tensor):
+        return self.sparse_input == 'auto' and not torch.is_grad_enabled() and x.device.type == 'cpu' \
+            and self.groups == 1 and self.padding_mode == 'zeros' and not isinstance(self.padding, str) \
+            and functional.is_sparse_spike(x, self.sparse_threshold)
+
+    def conv2d_forward(self, x: Tensor):
+        if self.use_sparse_input(x):
+            if isinstance(x, spike_tensor.SpikeTensor):
+                x = x.to_float()
+            return functional.sparse_spike_conv2d(x, self.weight, self.bias, self.stride, self.padding, self.dilation)
+        else:
+            return super().forward(x)
 
     def forward(self, x: Tensor):
         if self.step_mode == 's':
-            x = super().forward(x)
+            x = self.conv2d_forward(x)
 
         elif self.step_mode == 'm':
             if x.dim() != 5:
                 raise ValueError(f'expected x with shape [T, N, C, H, W], but got x with shape {x.shape}!')
-            x = functional.seq_to_ann_forward(x, super().forward)
+            x = functional.seq_to_ann_forward(x, self.conv2d_forward)
 
         return x
 
@@ -982,7 +1016,8 @@ class AdaptiveAvgPool3d(nn.AdaptiveAvgPool3d, base.StepModule):
         return x
 
 class Linear(nn.Linear, base.StepModule):
-    def __init__(self, in_features: int, out_features: int, bias: bool = True, step_mode='s') -> None:
+    def __init__(self, in_features: int, out_features: int, bias: bool = True, step_mode='s',
+                 sparse_input: Optional[str] = None, sparse_threshold: float = 0.03) -> None:
         """
         * :ref:`API in English <Linear-en>`
 
@@ -990,6 +1025,15 @@ class Linear(nn.Linear, base.StepModule):
 
         :param step_mode: 步进模式，可以为 `'s'` (单步) 或 `'m'` (多步)
         :type step_mode: str
+        :param sparse_input: 为 ``None`` 时总是使用稠密的矩阵乘法。为 ``'auto'`` 时，若在CPU上不计算梯度地推理，且输入是发放率不超过
+            ``sparse_threshold`` 的脉冲，则使用 :class:`sparse_spike_linear <spikingjelly.activation_based.functional.sparse_spike_linear>`
+            只对激活的输入进行计算
+        :type sparse_input: Optional[str]
+        :param sparse_threshold: 使用稀疏计算的发放率阈值
+        :type sparse_threshold: float
+
+        输入也可以是 :class:`SpikeTensor <spikingjelly.activation_based.spike_tensor.SpikeTensor>`。在CPU上若其发放率不超过
+        ``sparse_threshold``，则直接从压缩的脉冲中读取激活输入的位置并进行稀疏计算，与 ``sparse_input`` 无关；否则解压后进行稠密计算。
 
         其他的参数API参见 :class:`torch.nn.Linear`
 
@@ -999,11 +1043,54 @@ class Linear(nn.Linear, base.StepModule):
 
         :param step_mode: the step mode, which can be `s` (single-step) or `m` (multi-step)
         :type step_mode: str
+        :param sparse_input: if ``None``, the dense matrix multiplication is always used. If ``'auto'``, when running
+            inference without gradients on CPU and the input is a spike tensor whose firing rate is not larger than
+            ``sparse_threshold``, :class:`sparse_spike_linear <spikingjelly.activation_based.functional.sparse_spike_linear>`
+            will be used to only compute the active inputs
+        :type sparse_input: Optional[str]
+        :param sparse_threshold: the threshold of the firing rate for using the sparse computation
+        :type sparse_threshold: float
+
+        The input can also be a :class:`SpikeTensor <spikingjelly.activation_based.spike_tensor.SpikeTensor>`. On CPU,
+        if its firing rate is not larger than ``sparse_threshold``, the positions of the active inputs are read from the
+        packed spikes directly and the sparse computation is used regardless of ``sparse_input``. Otherwise, it is
+        unpacked and the dense computation is used.
 
         Refer to :class:`torch.nn.Linear` for other parameters' API
         """
         super().__init__(in_features, out_features, bias)
         self.step_mode = step_mode
+        assert sparse_input in (None, 'auto')
+        self.sparse_input = sparse_input
+        self.sparse_threshold = sparse_threshold
+        # the cached contiguous weight.t() used by the sparse computation
+        self.sparse_weight_t = None
+
+    def extra_repr(self):
+        s = super().extra_repr()
+        if self.sparse_input is not None:
+            s += f', sparse_input={self.sparse_input}, sparse_threshold={self.sparse_threshold}'
+        return s
+
+    def use_sparse_input(self, x: Tensor):
+        if isinstance(x, spike_tensor.SpikeTensor):
+            # the packed spikes are only emitted in inference, and their indices are read without unpacking
+            return x.device.type == 'cpu' and functional.is_sparse_spike(x, self.sparse_threshold)
+        return self.sparse_input == 'auto' and not torch.is_grad_enabled() and x.device.type == 'cpu' \
+            and functional.is_sparse_spike(x, self.sparse_threshold)
+
+    def get_sparse_weight_t(self):
+        # weight._version increases when weight is modified in-place, e.g., by the optimizer
+        key = (self.weight.data_ptr(), self.weight._version)
+        if self.sparse_weight_t is None or self.sparse_weight_t[0] != key:
+            self.sparse_weight_t = (key, self.weight.t().contiguous())
+        return self.sparse_weight_t[1]
+
+    def forward(self, x: Tensor):
+        if self.use_sparse_input(x):
+            return functional.sparse_spike_linear(x, self.weight, self.bias, self.get_sparse_weight_t())
+        else:
+            return super().forward(x)
 
 
 class Flatten(nn.Flatten, base.StepModule):
@@ -1448,6 +1535,23 @@ class SynapseFilter(base.MemoryModule):
             self.out_i = self.js_single_step_forward(x, self.tau, self.out_i)
         return self.out_i
 
+    def multi_step_forward(self, x_seq: Tensor):
+        if isinstance(self.out_i, float):
+            out_i_init = self.out_i
+            self.out_i = torch.zeros_like(x_seq[0].data)
+            if out_i_init != 0.:
+                torch.fill_(self.out_i, out_i_init)
+
+        if self.learnable:
+            inv_tau = self.w.sigmoid()
+        else:
+            inv_tau = 1. / self.tau
+
+        # out_i[t] = (1. - (1. - x[t]) * inv_tau) * out_i[t - 1] + x[t]
+        out_i_seq = functional.linear_recurrence_scan(x_seq, 1. - (1. - x_seq) * inv_tau, self.out_i)
+        self.out_i = out_i_seq[-1]
+        return out_i_seq
+
 
 class DropConnectLinear(base.MemoryModule):
     def __init__(self, in_features: int, out_features: int, bias: bool = True, p: float = 0.5, samples_num: int = 1024,
@@ -1574,12 +1678,14 @@ class DropConnectLinear(base.MemoryModule):
             bound = 1 / math.sqrt(fan_in)
             nn.init.uniform_(self.bias, -bound, bound)
 
-    def reset(self):
+    def reset(self, mask: Optional[Tensor] = None):
         """
         * :ref:`API in English <DropConnectLinear.reset-en>`
 
         .. _DropConnectLinear.reset-cn:
 
+        :param mask: ``shape = [N]`` 的布尔张量。不为 ``None`` 时只重置 ``self.activation`` 中被选中的样本的状态
+        :type mask: Optional[torch.Tensor]
         :return: None
         :rtype: None
 
@@ -1589,14 +1695,19 @@ class DropConnectLinear(base.MemoryModule):
 
         .. _DropConnectLinear.reset-en:
 
+        :param mask: a bool tensor with ``shape = [N]``. If not ``None``, only states of the selected samples in
+            ``self.activation`` will be reset
+        :type mask: Optional[torch.Tensor]
         :return: None
         :rtype: None
 
         Reset the linear layer to fully-connected status. If ``self.activation`` is also stateful, this function will
         also reset it.
         """
-        super().reset()
-        if hasattr(self.activation, 'reset'):
+        super().reset(mask)
+        if isinstance(self.activation, base.MemoryModule):
+            self.activation.reset(mask)
+        elif hasattr(self.activation, 'reset') and mask is None:
             self.activation.reset()
 
     def drop(self, batch_size: int):
@@ -1,4 +1,4 @@
-from typing import Callable, Union
+from typing import Callable, Optional, Union
 
 import math
 
@@ -6,7 +6,7 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
-from . import neuron, monitor, base
+from . import neuron, monitor, base, functional
 
 
 def stdp_linear_single_step(
@@ -26,9 +26,9 @@ def stdp_linear_single_step(
     trace_pre = trace_pre - trace_pre / tau_pre + in_spike      # shape = [batch_size, N_in]
     trace_post = trace_post - trace_post / tau_post + out_spike # shape = [batch_size, N_out]
 
-    # [batch_size, N_out, N_in] -> [N_out, N_in]
-    delta_w_pre = -f_pre(weight) * (trace_post.unsqueeze(2) * in_spike.unsqueeze(1)).sum(0)
-    delta_w_post = f_post(weight) * (trace_pre.unsqueeze(1) * out_spike.unsqueeze(2)).sum(0)
+    # [N_out, batch_size] @ [batch_size, N_in] -> [N_out, N_in]
+    delta_w_pre = -f_pre(weight) * torch.mm(trace_post.t(), in_spike)
+    delta_w_post = f_post(weight) * torch.mm(out_spike.t(), trace_pre)
     return trace_pre, trace_post, delta_w_pre + delta_w_post
 
 
@@ -134,12 +134,8 @@ def stdp_conv2d_single_step(
             tr_pre = trace_pre[:, :, h:h_end:stride_h, w:w_end:stride_w]    # shape = [batch_size, C_in, h_out, w_out]
             tr_post = trace_post    # shape = [batch_size, C_out, h_out, w_out]
 
-            delta_w_pre = - (f_pre(weight) *
-			                (tr_post.unsqueeze(2) * pre_spike.unsqueeze(1))
-                            .permute([1, 2, 0, 3, 4]).sum(dim = [2, 3, 4]))
-            delta_w_post = f_post(weight) * \
-                           (tr_pre.unsqueeze(1) * post_spike.unsqueeze(2))\
-                           .permute([1, 2, 0, 3, 4]).sum(dim = [2, 3, 4])
+            delta_w_pre = - f_pre(weight) * torch.einsum('bohw,bihw->oi', tr_post, pre_spike)
+            delta_w_post = f_post(weight) * torch.einsum('bihw,bohw->oi', tr_pre, post_spike)
             delta_w[:, :, h, w] += delta_w_pre + delta_w_post
 
     return trace_pre, trace_post, delta_w
@@ -196,12 +192,8 @@ def stdp_conv1d_single_step(
         tr_pre = trace_pre[:, :, l:l_end:stride_l]    # shape = [batch_size, C_in, l_out]
         tr_post = trace_post    # shape = [batch_size, C_out, l_out]
 
-        delta_w_pre = - (f_pre(weight) *
-                        (tr_post.unsqueeze(2) * pre_spike.unsqueeze(1))
-                        .permute([1, 2, 0, 3]).sum(dim = [2, 3]))
-        delta_w_post = f_post(weight) * \
-                       (tr_pre.unsqueeze(1) * post_spike.unsqueeze(2))\
-                       .permute([1, 2, 0, 3]).sum(dim = [2, 3])
+        delta_w_pre = - f_pre(weight) * torch.einsum('bol,bil->oi', tr_post, pre_spike)
+        delta_w_post = f_post(weight) * torch.einsum('bil,bol->oi', tr_pre, post_spike)
         delta_w[:, :, l] += delta_w_pre + delta_w_post
 
     return trace_pre, trace_post, delta_w
@@ -214,8 +206,6 @@ def stdp_multi_step(
     tau_pre: float, tau_post: float,
     f_pre: Callable = lambda x: x, f_post: Callable = lambda x: x 
 ):
-    weight = layer.weight.data
-    delta_w = torch.zeros_like(weight)
     T = in_spike.shape[0]
 
     if isinstance(layer, nn.Linear):
@@ -227,15 +217,42 @@ def stdp_multi_step(
     elif isinstance(layer, nn.Conv2d):
         stdp_single_step = stdp_conv2d_single_step
 
+    if isinstance(layer, (nn.Conv1d, nn.Conv2d)) and any(p != 0 for p in layer.padding):
+        # the trace of the conv layer is the trace of the padded input
+        in_spike_p = in_spike.flatten(0, 1)
+        if layer.padding_mode != 'zeros':
+            in_spike_p = F.pad(in_spike_p, layer._reversed_padding_repeated_twice, mode=layer.padding_mode)
+        else:
+            in_spike_p = F.pad(in_spike_p, layer._reversed_padding_repeated_twice)
+        in_spike_p = in_spike_p.view(in_spike.shape[0:2] + in_spike_p.shape[1:])
+    else:
+        in_spike_p = in_spike
+
+    # trace[t] = (1 - 1 / tau) * trace[t - 1] + spike[t]
+    trace_pre_seq = functional.linear_recurrence_scan(in_spike_p, 1. - 1. / tau_pre, trace_pre)
+    trace_post_seq = functional.linear_recurrence_scan(out_spike, 1. - 1. / tau_post, trace_post)
+
+    # delta_w is the sum of all time-steps, which is the same as regarding T as a part of the batch dimension.
+    # Thus, we use the single-step function once with the traces at t - 1, which updates them to the traces at t
+    if T > 1:
+        trace_pre_prev = torch.cat((torch.zeros_like(trace_pre_seq[0: 1]), trace_pre_seq[0: -1]))
+        trace_post_prev = torch.cat((torch.zeros_like(trace_post_seq[0: 1]), trace_post_seq[0: -1]))
+        if trace_pre is not None:
+            trace_pre_prev[0] = trace_pre
+        if trace_post is not None:
+            trace_post_prev[0] = trace_post
+        trace_pre_prev = trace_pre_prev.flatten(0, 1)
+        trace_post_prev = trace_post_prev.flatten(0, 1)
+    else:
+        trace_pre_prev = trace_pre
+        trace_post_prev = trace_post
 
-    for t in range(T):
-        trace_pre, trace_post, dw = stdp_single_step(
-            layer, in_spike[t], out_spike[t], trace_pre, trace_post,
-            tau_pre, tau_post, f_pre, f_post
-        )
-        delta_w += dw
+    _, _, delta_w = stdp_single_step(
+        layer, in_spike.flatten(0, 1), out_spike.flatten(0, 1), trace_pre_prev, trace_post_prev,
+        tau_pre, tau_post, f_pre, f_post
+    )
 
-    return trace_pre, trace_post, delta_w
+    return trace_pre_seq[-1], trace_post_seq[-1], delta_w
 
 
 class STDPLearner(base.MemoryModule):
@@ -258,10 +275,11 @@ class STDPLearner(base.MemoryModule):
         self.register_memory('trace_pre', None)
         self.register_memory('trace_post', None)
 
-    def reset(self):
-        super(STDPLearner, self).reset()
-        self.in_spike_monitor.clear_recorded_data()
-        self.out_spike_monitor.clear_recorded_data()
+    def reset(self, mask: Optional[torch.Tensor] = None):
+        super(STDPLearner, self).reset(mask)
+        if mask is None:
+            self.in_spike_monitor.clear_recorded_data()
+            self.out_spike_monitor.clear_recorded_data()
 
     def disable(self):
         self.in_spike_monitor.disable()
@@ -337,10 +355,11 @@ class MSTDPLearner(base.MemoryModule):
         self.register_memory('trace_pre', None)
         self.register_memory('trace_post', None)
 
-    def reset(self):
-        super(MSTDPLearner, self).reset()
-        self.in_spike_monitor.clear_recorded_data()
-        self.out_spike_monitor.clear_recorded_data()
+    def reset(self, mask: Optional[torch.Tensor] = None):
+        super(MSTDPLearner, self).reset(mask)
+        if mask is None:
+            self.in_spike_monitor.clear_recorded_data()
+            self.out_spike_monitor.clear_recorded_data()
 
     def disable(self):
         self.in_spike_monitor.disable()
@@ -425,10 +444,11 @@ class MSTDPETLearner(base.MemoryModule):
         self.register_memory('trace_post', None)
         self.register_memory('trace_e', None)
 
-    def reset(self):
-        super(MSTDPETLearner, self).reset()
-        self.in_spike_monitor.clear_recorded_data()
-        self.out_spike_monitor.clear_recorded_data()
+    def reset(self, mask: Optional[torch.Tensor] = None):
+        super(MSTDPETLearner, self).reset(mask)
+        if mask is None:
+            self.in_spike_monitor.clear_recorded_data()
+            self.out_spike_monitor.clear_recorded_data()
 
     def disable(self):
         self.in_spike_monitor.disable()
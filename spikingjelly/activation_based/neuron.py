@@ -1,5 +1,6 @@
 from abc import abstractmethod
 from typing import Callable, Optional
+import types
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -7,7 +8,8 @@ import math
 import numpy as np
 import logging
 
-from . import surrogate, base
+from . import surrogate, base, cpp_neuron_kernel, tensor_cache, spike_tensor
+from .. import configure
 from .auto_cuda import neuron_kernel as ac_neuron_kernel
 from .auto_cuda import ss_neuron_kernel as ss_ac_neuron_kernel
 try:
@@ -21,6 +23,48 @@ except BaseException as e:
     cuda_utils = None
 
 
+class HardResetBoolSpikeFunction(torch.autograd.Function):
+    """
+    The hard reset ``v = (1. - spike) * v + spike * v_reset`` used by the torch backend when
+    ``configure.save_spike_as_bool_in_neuron_kernel == True``. ``spike`` is saved for backward in the format defined by
+    ``configure.save_bool_spike_level`` (bool, or uint8 with each element storing 8 spikes), rather than a float/half
+    tensor.
+    """
+    @staticmethod
+    def forward(ctx, v: torch.Tensor, spike: torch.Tensor, v_reset: float):
+        saved = []
+        if ctx.needs_input_grad[0]:
+            if configure.save_bool_spike_level == 0:
+                ctx.s_dtype = spike.dtype
+                ctx.s_packed = False
+                saved.append(spike.bool())
+            else:
+                spike_b, ctx.s_dtype, ctx.s_shape, ctx.s_padding = tensor_cache.float_spike_to_bool(spike)
+                ctx.s_packed = True
+                saved.append(spike_b)
+        if ctx.needs_input_grad[1]:
+            saved.append(v)
+        ctx.save_for_backward(*saved)
+        ctx.v_reset = v_reset
+        return (1. - spike) * v + spike * v_reset
+
+    @staticmethod
+    def backward(ctx, grad_v_next: torch.Tensor):
+        grad_v = grad_spike = None
+        saved = list(ctx.saved_tensors)
+        if ctx.needs_input_grad[0]:
+            spike_b = saved.pop(0)
+            if ctx.s_packed:
+                spike = tensor_cache.bool_spike_to_float(spike_b, ctx.s_dtype, ctx.s_shape, ctx.s_padding)
+            else:
+                spike = spike_b.to(ctx.s_dtype)
+            grad_v = grad_v_next * (1. - spike)
+        if ctx.needs_input_grad[1]:
+            v = saved.pop(0)
+            grad_spike = grad_v_next * (ctx.v_reset - v)
+        return grad_v, grad_spike, None
+
+
 class SimpleBaseNode(base.MemoryModule):
     def __init__(self, v_threshold: float = 1., v_reset: Optional[float] = 0.,
                  surrogate_function: Callable = surrogate.Sigmoid(), detach_reset: bool = False,
@@ -171,6 +215,12 @@ class BaseNode(base.MemoryModule):
 
         self.store_v_seq = store_v_seq
 
+        self.memory_mode = 'default'
+        self.recompute_chunk_size = None
+
+        self.output_spike_tensor = False
+        self.mixed_precision = False
+
         # used in lava_exchange
         self.lava_s_cale = 1 << 6
 
@@ -178,6 +228,15 @@ class BaseNode(base.MemoryModule):
         self.forward_kernel = None
         self.backward_kernel = None
 
+    @property
+    def supported_backends(self):
+        if self.step_mode == 's':
+            return ('torch',)
+        elif self.step_mode == 'm':
+            return ('torch', 'inductor')
+        else:
+            raise ValueError(self.step_mode)
+
     @property
     def store_v_seq(self):
         return self._store_v_seq
@@ -189,6 +248,160 @@ class BaseNode(base.MemoryModule):
             if not hasattr(self, 'v_seq'):
                 self.register_memory('v_seq', None)
 
+    @property
+    def memory_mode(self):
+        """
+        * :ref:`API in English <BaseNode.memory_mode-en>`
+
+        .. _BaseNode.memory_mode-cn:
+
+        :return: 多步模式下训练时的显存/内存使用模式，``'default'`` 或 ``'recompute'``
+        :rtype: str
+
+        ``'default'`` 时，``multi_step_forward`` 会保存全部 ``T`` 个时间步的计算图。``'recompute'`` 时，输入序列被拆分成长度为
+        ``self.recompute_chunk_size`` （若为 ``None`` 则使用 ``ceil(sqrt(T))``）的块，每个块都使用
+        :class:`checkpoint_memory_forward <spikingjelly.activation_based.base.checkpoint_memory_forward>` 计算，只保存块的
+        输入和块边界处的状态变量，在反向传播时重新计算块内的中间变量。设块长度为 ``k``，保存的中间变量的数量由 ``O(T)`` 降低为
+        ``O(T/k + k)``，代价是多进行一次前向传播。
+
+        ``'recompute'`` 只在梯度启用且使用 ``BaseNode.multi_step_forward`` 的后端（例如 ``'torch'``）时生效。
+
+        * :ref:`中文API <BaseNode.memory_mode-cn>`
+
+        .. _BaseNode.memory_mode-en:
+
+        :return: the memory mode of multi-step training, ``'default'`` or ``'recompute'``
+        :rtype: str
+
+        If ``'default'``, ``multi_step_forward`` keeps the computation graph of all ``T`` time-steps. If ``'recompute'``,
+        the input sequence is split into chunks with length ``self.recompute_chunk_size`` (``ceil(sqrt(T))`` if it is
+        ``None``), and each chunk is computed by
+        :class:`checkpoint_memory_forward <spikingjelly.activation_based.base.checkpoint_memory_forward>`, which only
+        saves the input of the chunk and the memories at the chunk boundary, and recomputes the intermediate variables in
+        backward. With chunk length ``k``, the number of saved intermediate variables is reduced from ``O(T)`` to
+        ``O(T/k + k)`` at the cost of one extra forward pass.
+
+        ``'recompute'`` only takes effect when gradients are enabled and the backend uses ``BaseNode.multi_step_forward``
+        (e.g., ``'torch'``).
+        """
+        return self._memory_mode
+
+    @memory_mode.setter
+    def memory_mode(self, value: str):
+        if value not in ('default', 'recompute'):
+            raise ValueError(f'memory_mode should be \'default\' or \'recompute\', but got {value}!')
+        self._memory_mode = value
+
+    @property
+    def output_spike_tensor(self):
+        """
+        * :ref:`API in English <BaseNode.output_spike_tensor-en>`
+
+        .. _BaseNode.output_spike_tensor-cn:
+
+        :return: 是否在不计算梯度时输出按位压缩的脉冲
+        :rtype: bool
+
+        为 ``True`` 且梯度被禁用时，``forward`` 输出 :class:`SpikeTensor <spikingjelly.activation_based.spike_tensor.SpikeTensor>`
+        而不是 ``torch.Tensor``，层与层之间传递的脉冲的内存变为原来的1/8（相比于 ``torch.bool``）或1/32（相比于 ``torch.float``）。
+        梯度启用时总是输出 ``torch.Tensor``。
+
+        * :ref:`中文API <BaseNode.output_spike_tensor-cn>`
+
+        .. _BaseNode.output_spike_tensor-en:
+
+        :return: whether to output the bit-packed spikes when gradients are disabled
+        :rtype: bool
+
+        If ``True`` and gradients are disabled, ``forward`` outputs a
+        :class:`SpikeTensor <spikingjelly.activation_based.spike_tensor.SpikeTensor>` rather than a ``torch.Tensor``,
+        and the memory of spikes passed between layers becomes 1/8 (compared with ``torch.bool``) or 1/32 (compared with
+        ``torch.float``) of the original. ``torch.Tensor`` is always outputted when gradients are enabled.
+        """
+        return self._output_spike_tensor
+
+    @output_spike_tensor.setter
+    def output_spike_tensor(self, value: bool):
+        self._output_spike_tensor = value
+
+    @property
+    def mixed_precision(self):
+        """
+        * :ref:`API in English <BaseNode.mixed_precision-en>`
+
+        .. _BaseNode.mixed_precision-cn:
+
+        :return: 是否使用低精度脉冲和 ``float32`` 膜电位的混合精度策略
+        :rtype: bool
+
+        为 ``True`` 且使用 ``'torch'`` 或 ``'inductor'`` 后端时，若输入是 ``torch.bfloat16`` 或 ``torch.float16``，膜电位 ``v``
+        以 ``float32`` 创建和累加，阈值比较和替代函数（包括其反向传播）都以 ``float32`` 计算，而输出的脉冲被转换为输入的数据类型。
+        在 ``torch.autocast`` 中时，即便输入是 ``float32``，输出的脉冲也会被转换为autocast的数据类型。由于脉冲只取0或1，转换是
+        无损的，而层与层之间传递的脉冲的内存和访存量减半。
+
+        ``'cupy'`` 和 ``'cpp'`` 后端不受此选项影响。
+
+        * :ref:`中文API <BaseNode.mixed_precision-cn>`
+
+        .. _BaseNode.mixed_precision-en:
+
+        :return: whether to use the mixed precision policy with reduced-precision spikes and a ``float32`` membrane
+            potential
+        :rtype: bool
+
+        If ``True`` and the ``'torch'`` or ``'inductor'`` backend is used, when the input is ``torch.bfloat16`` or
+        ``torch.float16``, the membrane potential ``v`` is created and accumulated in ``float32``, the threshold comparison
+        and the surrogate function (including its backward) are computed in ``float32``, and the output spikes are cast
+        to the dtype of the input. In ``torch.autocast``, the output spikes are cast to the autocast dtype even if the
+        input is ``float32``. As spikes are only 0 or 1, the cast is lossless, and the memory and the memory traffic of
+        spikes passed between layers are halved.
+
+        The ``'cupy'`` and ``'cpp'`` backends are not affected by this option.
+
+        Codes example:
+
+        .. code-block:: python
+
+            net = nn.Sequential(layer.Linear(784, 256), neuron.LIFNode(), layer.Linear(256, 10))
+            for m in net.modules():
+                if isinstance(m, neuron.BaseNode):
+                    m.mixed_precision = True
+            with torch.autocast('cpu', dtype=torch.bfloat16):
+                y = net(x)
+            y.float().sum().backward()
+        """
+        return self._mixed_precision
+
+    @mixed_precision.setter
+    def mixed_precision(self, value: bool):
+        self._mixed_precision = value
+
+    @staticmethod
+    def reduced_precision_dtype(x: torch.Tensor):
+        # returns the reduced dtype of the input or the enabled autocast, or None
+        if x.dtype in (torch.bfloat16, torch.float16):
+            return x.dtype
+        try:
+            if torch.is_autocast_enabled(x.device.type):
+                return torch.get_autocast_dtype(x.device.type)
+        except TypeError:
+            # PyTorch < 2.4
+            if x.device.type == 'cpu' and torch.is_autocast_cpu_enabled():
+                return torch.get_autocast_cpu_dtype()
+            elif x.device.type == 'cuda' and torch.is_autocast_enabled():
+                return torch.get_autocast_gpu_dtype()
+        return None
+
+    def forward(self, *args, **kwargs):
+        spike = super().forward(*args, **kwargs)
+        if self.mixed_precision and len(args) > 0 and isinstance(args[0], torch.Tensor):
+            dtype = self.reduced_precision_dtype(args[0])
+            if dtype is not None and spike.dtype != dtype:
+                spike = spike.to(dtype)
+        if self.output_spike_tensor and not torch.is_grad_enabled():
+            spike = spike_tensor.SpikeTensor.from_float(spike)
+        return spike
+
     @staticmethod
     @torch.jit.script
     def jit_hard_reset(v: torch.Tensor, spike: torch.Tensor, v_reset: float):
@@ -263,7 +476,11 @@ class BaseNode(base.MemoryModule):
 
         else:
             # hard reset
-            self.v = self.jit_hard_reset(self.v, spike_d, self.v_reset)
+            if configure.save_spike_as_bool_in_neuron_kernel and torch.is_grad_enabled() \
+                    and not torch.compiler.is_compiling():
+                self.v = HardResetBoolSpikeFunction.apply(self.v, spike_d, self.v_reset)
+            else:
+                self.v = self.jit_hard_reset(self.v, spike_d, self.v_reset)
 
     def extra_repr(self):
         return f'v_threshold={self.v_threshold}, v_reset={self.v_reset}, detach_reset={self.detach_reset}, step_mode={self.step_mode}, backend={self.backend}'
@@ -303,12 +520,20 @@ class BaseNode(base.MemoryModule):
         return spike
 
     def multi_step_forward(self, x_seq: torch.Tensor):
-        T = x_seq.shape[0]
+        if self.backend == 'inductor':
+            return self.inductor_multi_step_forward(x_seq)
+        elif self.memory_mode == 'recompute' and torch.is_grad_enabled():
+            return self.recompute_multi_step_forward(x_seq)
+        else:
+            return self.loop_multi_step_forward(x_seq)
+
+    def loop_multi_step_forward(self, x_seq: torch.Tensor):
         y_seq = []
         if self.store_v_seq:
             v_seq = []
-        for t in range(T):
-            y = self.single_step_forward(x_seq[t])
+        # unbind has one backward for all time-steps, while x_seq[t] creates a [T, N, *] gradient at each time-step
+        for x in x_seq.unbind(0):
+            y = self.single_step_forward(x)
             y_seq.append(y)
             if self.store_v_seq:
                 v_seq.append(self.v)
@@ -318,10 +543,118 @@ class BaseNode(base.MemoryModule):
 
         return torch.stack(y_seq)
 
+    def recompute_multi_step_forward(self, x_seq: torch.Tensor):
+        T = x_seq.shape[0]
+        chunk_size = self.recompute_chunk_size
+        if chunk_size is None:
+            chunk_size = math.ceil(math.sqrt(T))
+        y_seq = []
+        if self.store_v_seq:
+            v_seq = []
+        for x_chunk in torch.split(x_seq, chunk_size):
+            y_seq.append(base.checkpoint_memory_forward(self.loop_multi_step_forward, x_chunk, (self,)))
+            if self.store_v_seq:
+                v_seq.append(self.v_seq)
+
+        if self.store_v_seq:
+            self.v_seq = torch.cat(v_seq)
+
+        return torch.cat(y_seq)
+
     def v_float_to_tensor(self, x: torch.Tensor):
         if isinstance(self.v, float):
             v_init = self.v
-            self.v = torch.full_like(x.data, v_init)
+            if self.mixed_precision and self.backend in ('torch', 'inductor') \
+                    and x.dtype in (torch.bfloat16, torch.float16):
+                # the membrane potential is accumulated in float32
+                self.v = torch.full_like(x.data, v_init, dtype=torch.float32)
+            else:
+                self.v = torch.full_like(x.data, v_init)
+
+    # the compiled functions of the inductor backend, which are shared by all neurons
+    inductor_cache = {}
+
+    @staticmethod
+    def inductor_traced_function(node, x_seq: torch.Tensor):
+        return BaseNode.loop_multi_step_forward(node, x_seq)
+
+    def inductor_cache_key(self, x_seq: torch.Tensor):
+        """
+        * :ref:`API in English <BaseNode.inductor_cache_key-en>`
+
+        .. _BaseNode.inductor_cache_key-cn:
+
+        :param x_seq: 输入，``shape = [T, N, *]``
+        :type x_seq: torch.Tensor
+        :return: 缓存编译结果时使用的键
+        :rtype: tuple
+
+        由神经元的类型、超参数（所有 ``bool, int, float, str`` 类型的成员变量以及子模块，例如替代函数）、状态变量的类型，以及输入的
+        ``dtype, device, shape`` 组成的键。键相同的神经元会共享同一个编译后的函数。
+
+        * :ref:`中文API <BaseNode.inductor_cache_key-cn>`
+
+        .. _BaseNode.inductor_cache_key-en:
+
+        :param x_seq: the input with ``shape = [T, N, *]``
+        :type x_seq: torch.Tensor
+        :return: the key for caching the compiled function
+        :rtype: tuple
+
+        The key is made up of the type of the neuron, the hyper-parameters (all members whose types are ``bool, int,
+        float, str`` and the sub-modules, e.g., the surrogate function), the types of the memories, and the
+        ``dtype, device, shape`` of the input. Neurons with the same key will share the same compiled function.
+        """
+        config = []
+        for name, value in self.__dict__.items():
+            if value is None or isinstance(value, (bool, int, float, str)):
+                config.append((name, value))
+        for name, value in self._modules.items():
+            config.append((name, repr(value)))
+        for name, value in self._memories.items():
+            config.append((name, type(value)))
+        return self.__class__, tuple(config), x_seq.dtype, x_seq.device, x_seq.shape
+
+    def inductor_multi_step_forward(self, x_seq: torch.Tensor):
+        """
+        * :ref:`API in English <BaseNode.inductor_multi_step_forward-en>`
+
+        .. _BaseNode.inductor_multi_step_forward-cn:
+
+        :param x_seq: 输入，``shape = [T, N, *]``
+        :type x_seq: torch.Tensor
+        :return: 输出脉冲，``shape = [T, N, *]``
+        :rtype: torch.Tensor
+
+        ``backend == 'inductor'`` 时使用的多步前向传播。使用 ``torch.compile`` 将 ``T`` 个时间步的 ``neuronal_charge``、
+        ``neuronal_fire`` 和 ``neuronal_reset`` 追踪为一个融合的计算图，因而任何 ``BaseNode`` 的子类都可以使用。编译结果按照
+        :class:`BaseNode.inductor_cache_key <spikingjelly.activation_based.neuron.BaseNode.inductor_cache_key>` 缓存在
+        ``BaseNode.inductor_cache`` 中。
+
+        * :ref:`中文API <BaseNode.inductor_multi_step_forward-cn>`
+
+        .. _BaseNode.inductor_multi_step_forward-en:
+
+        :param x_seq: the input with ``shape = [T, N, *]``
+        :type x_seq: torch.Tensor
+        :return: output spikes with ``shape = [T, N, *]``
+        :rtype: torch.Tensor
+
+        The multi-step forward used when ``backend == 'inductor'``. ``torch.compile`` traces ``neuronal_charge``,
+        ``neuronal_fire`` and ``neuronal_reset`` over ``T`` time-steps into one fused graph. Thus, any sub-class of
+        ``BaseNode`` can use it. The compiled functions are cached in ``BaseNode.inductor_cache`` by
+        :class:`BaseNode.inductor_cache_key <spikingjelly.activation_based.neuron.BaseNode.inductor_cache_key>`.
+        """
+        key = self.inductor_cache_key(x_seq)
+        f = BaseNode.inductor_cache.get(key)
+        if f is None:
+            # give each key its own code object, so that dynamo caches its graph separately and never recompiles it
+            # for other keys
+            traced = BaseNode.inductor_traced_function
+            f = types.FunctionType(traced.__code__.replace(), traced.__globals__, traced.__name__)
+            f = torch.compile(f, backend='inductor')
+            BaseNode.inductor_cache[key] = f
+        return f(self, x_seq)
 
 
 class AdaptBaseNode(BaseNode):
@@ -456,7 +789,7 @@ class IFNode(BaseNode):
         :type step_mode: str
 
         :param backend: 使用哪种后端。不同的 ``step_mode`` 可能会带有不同的后端。可以通过打印 ``self.supported_backends`` 查看当前
-            使用的步进模式支持的后端。在支持的情况下，使用 ``'cupy'`` 后端是速度最快的
+            使用的步进模式支持的后端。在支持的情况下，使用 ``'cupy'`` 后端是速度最快的。在CPU上训练时，可以使用 ``'cpp'`` 后端
         :type backend: str
 
         :param store_v_seq: 在使用 ``step_mode = 'm'`` 时，给与 ``shape = [T, N, *]`` 的输入后，是否保存中间过程的 ``shape = [T, N, *]``
@@ -491,7 +824,7 @@ class IFNode(BaseNode):
 
         :param backend: backend fot this neurons layer. Different ``step_mode`` may support for different backends. The user can
         print ``self.supported_backends`` and check what backends are supported by the current ``step_mode``. If supported,
-        using ``'cupy'`` backend will have the fastest training speed
+        using ``'cupy'`` backend will have the fastest training speed. When training on CPU, the ``'cpp'`` backend can be used
         :type backend: str
 
         :param store_v_seq: when using ``step_mode = 'm'`` and given input with ``shape = [T, N, *]``, this option controls
@@ -514,7 +847,7 @@ class IFNode(BaseNode):
         if self.step_mode == 's':
             return ('torch', 'cupy')
         elif self.step_mode == 'm':
-            return ('torch', 'cupy')
+            return ('torch', 'cupy', 'cpp', 'inductor')
         else:
             raise ValueError(self.step_mode)
 
@@ -589,7 +922,7 @@ class IFNode(BaseNode):
 
     def multi_step_forward(self, x_seq: torch.Tensor):
         if self.training:
-            if self.backend == 'torch':
+            if self.backend in ('torch', 'inductor'):
                 return super().multi_step_forward(x_seq)
             elif self.backend == 'cupy':
                 hard_reset = self.v_reset is not None
@@ -627,6 +960,19 @@ class IFNode(BaseNode):
 
                 self.v = v_seq[-1].clone()
 
+                return spike_seq
+            elif self.backend == 'cpp':
+                self.v_float_to_tensor(x_seq[0])
+
+                spike_seq, v_seq = cpp_neuron_kernel.multi_step_forward(x_seq, self.v, 0., self.v_threshold,
+                                                                        self.v_reset, False, self.detach_reset,
+                                                                        self.surrogate_function)
+
+                if self.store_v_seq:
+                    self.v_seq = v_seq
+
+                self.v = v_seq[-1].clone()
+
                 return spike_seq
             else:
                 raise ValueError(self.backend)
@@ -653,7 +999,7 @@ class IFNode(BaseNode):
 
     def single_step_forward(self, x: torch.Tensor):
         if self.training:
-            if self.backend == 'torch':
+            if self.backend in ('torch', 'inductor'):
                 return super().single_step_forward(x)
             elif self.backend == 'cupy':
                 hard_reset = self.v_reset is not None
@@ -733,7 +1079,7 @@ class LIFNode(BaseNode):
         :type step_mode: str
 
         :param backend: 使用哪种后端。不同的 ``step_mode`` 可能会带有不同的后端。可以通过打印 ``self.supported_backends`` 查看当前
-            使用的步进模式支持的后端。在支持的情况下，使用 ``'cupy'`` 后端是速度最快的
+            使用的步进模式支持的后端。在支持的情况下，使用 ``'cupy'`` 后端是速度最快的。在CPU上训练时，可以使用 ``'cpp'`` 后端
         :type backend: str
 
         :param store_v_seq: 在使用 ``step_mode = 'm'`` 时，给与 ``shape = [T, N, *]`` 的输入后，是否保存中间过程的 ``shape = [T, N, *]``
@@ -782,7 +1128,7 @@ class LIFNode(BaseNode):
 
         :param backend: backend fot this neurons layer. Different ``step_mode`` may support for different backends. The user can
         print ``self.supported_backends`` and check what backends are supported by the current ``step_mode``. If supported,
-        using ``'cupy'`` backend will have the fastest training speed
+        using ``'cupy'`` backend will have the fastest training speed. When training on CPU, the ``'cpp'`` backend can be used
         :type backend: str
 
         :param store_v_seq: when using ``step_mode = 'm'`` and given input with ``shape = [T, N, *]``, this option controls
@@ -817,7 +1163,7 @@ class LIFNode(BaseNode):
         if self.step_mode == 's':
             return ('torch', 'cupy')
         elif self.step_mode == 'm':
-            return ('torch', 'cupy')
+            return ('torch', 'cupy', 'cpp', 'inductor')
         else:
             raise ValueError(self.step_mode)
 
@@ -1005,7 +1351,7 @@ class LIFNode(BaseNode):
 
     def single_step_forward(self, x: torch.Tensor):
         if self.training:
-            if self.backend == 'torch':
+            if self.backend in ('torch', 'inductor'):
                 return super().single_step_forward(x)
             elif self.backend == 'cupy':
                 hard_reset = self.v_reset is not None
@@ -1071,7 +1417,7 @@ class LIFNode(BaseNode):
 
     def multi_step_forward(self, x_seq: torch.Tensor):
         if self.training:
-            if self.backend == 'torch':
+            if self.backend in ('torch', 'inductor'):
                 return super().multi_step_forward(x_seq)
             elif self.backend == 'cupy':
 
@@ -1113,6 +1459,20 @@ class LIFNode(BaseNode):
 
                 self.v = v_seq[-1].clone()
 
+                return spike_seq
+            elif self.backend == 'cpp':
+                self.v_float_to_tensor(x_seq[0])
+
+                spike_seq, v_seq = cpp_neuron_kernel.multi_step_forward(x_seq, self.v, 1. / self.tau,
+                                                                        self.v_threshold, self.v_reset,
+                                                                        self.decay_input, self.detach_reset,
+                                                                        self.surrogate_function)
+
+                if self.store_v_seq:
+                    self.v_seq = v_seq
+
+                self.v = v_seq[-1].clone()
+
                 return spike_seq
             else:
                 raise ValueError(self.backend)
@@ -1191,7 +1551,7 @@ class ParametricLIFNode(BaseNode):
         :type step_mode: str
 
         :param backend: 使用哪种后端。不同的 ``step_mode`` 可能会带有不同的后端。可以通过打印 ``self.supported_backends`` 查看当前
-            使用的步进模式支持的后端。在支持的情况下，使用 ``'cupy'`` 后端是速度最快的
+            使用的步进模式支持的后端。在支持的情况下，使用 ``'cupy'`` 后端是速度最快的。在CPU上训练时，可以使用 ``'cpp'`` 后端
         :type backend: str
 
         :param store_v_seq: 在使用 ``step_mode = 'm'`` 时，给与 ``shape = [T, N, *]`` 的输入后，是否保存中间过程的 ``shape = [T, N, *]``
@@ -1246,7 +1606,7 @@ class ParametricLIFNode(BaseNode):
 
         :param backend: backend fot this neurons layer. Different ``step_mode`` may support for different backends. The user can
         print ``self.supported_backends`` and check what backends are supported by the current ``step_mode``. If supported,
-        using ``'cupy'`` backend will have the fastest training speed
+        using ``'cupy'`` backend will have the fastest training speed. When training on CPU, the ``'cpp'`` backend can be used
         :type backend: str
 
         :param store_v_seq: when using ``step_mode = 'm'`` and given input with ``shape = [T, N, *]``, this option controls
@@ -1286,7 +1646,7 @@ class ParametricLIFNode(BaseNode):
         if self.step_mode == 's':
             return ('torch',)
         elif self.step_mode == 'm':
-            return ('torch', 'cupy')
+            return ('torch', 'cupy', 'cpp', 'inductor')
         else:
             raise ValueError(self.step_mode)
 
@@ -1308,7 +1668,7 @@ class ParametricLIFNode(BaseNode):
                 self.v = self.v - (self.v - self.v_reset) * self.w.sigmoid() + x
 
     def multi_step_forward(self, x_seq: torch.Tensor):
-        if self.backend == 'torch':
+        if self.backend in ('torch', 'inductor'):
             return super().multi_step_forward(x_seq)
         elif self.backend == 'cupy':
             hard_reset = self.v_reset is not None
@@ -1348,6 +1708,19 @@ class ParametricLIFNode(BaseNode):
 
             self.v = v_seq[-1].clone()
 
+            return spike_seq
+        elif self.backend == 'cpp':
+            self.v_float_to_tensor(x_seq[0])
+
+            spike_seq, v_seq = cpp_neuron_kernel.multi_step_forward(x_seq, self.v, self.w.sigmoid(),
+                                                                    self.v_threshold, self.v_reset, self.decay_input,
+                                                                    self.detach_reset, self.surrogate_function)
+
+            if self.store_v_seq:
+                self.v_seq = v_seq
+
+            self.v = v_seq[-1].clone()
+
             return spike_seq
         else:
             raise ValueError(self.backend)
@@ -1476,12 +1849,12 @@ class QIFNode(BaseNode):
         if self.step_mode == 's':
             return ('torch',)
         elif self.step_mode == 'm':
-            return ('torch', 'cupy')
+            return ('torch', 'cupy', 'inductor')
         else:
             raise ValueError(self.step_mode)
 
     def multi_step_forward(self, x_seq: torch.Tensor):
-        if self.backend == 'torch':
+        if self.backend in ('torch', 'inductor'):
             return super().multi_step_forward(x_seq)
         elif self.backend == 'cupy':
             self.v_float_to_tensor(x_seq[0])
@@ -1628,12 +2001,12 @@ class EIFNode(BaseNode):
         if self.step_mode == 's':
             return ('torch',)
         elif self.step_mode == 'm':
-            return ('torch', 'cupy')
+            return ('torch', 'cupy', 'inductor')
         else:
             raise ValueError(self.step_mode)
 
     def multi_step_forward(self, x_seq: torch.Tensor):
-        if self.backend == 'torch':
+        if self.backend in ('torch', 'inductor'):
             return super().multi_step_forward(x_seq)
         elif self.backend == 'cupy':
             self.v_float_to_tensor(x_seq[0])
@@ -1681,12 +2054,12 @@ class IzhikevichNode(AdaptBaseNode):
         if self.step_mode == 's':
             return ('torch',)
         elif self.step_mode == 'm':
-            return ('torch', 'cupy')
+            return ('torch', 'cupy', 'inductor')
         else:
             raise ValueError(self.step_mode)
 
     def multi_step_forward(self, x_seq: torch.Tensor):
-        if self.backend == 'torch':
+        if self.backend in ('torch', 'inductor'):
             return super().multi_step_forward(x_seq)
         elif self.backend == 'cupy':
             self.v_float_to_tensor(x_seq[0])
@@ -2173,7 +2546,7 @@ class SlidingPSN(base.MemoryModule):
 
     @property
     def supported_backends(self):
-        return 'gemm', 'conv'
+        return 'gemm', 'conv', 'fft', 'auto'
 
     def gen_gemm_weight(self, T: int):
         weight = torch.zeros([T, T], device=self.weight.device)
@@ -2185,6 +2558,29 @@ class SlidingPSN(base.MemoryModule):
 
         return weight
 
+    @staticmethod
+    def fft_causal_conv1d(x_seq: torch.Tensor, weight: torch.Tensor):
+        # x_seq.shape = [T, M], weight.shape = [k]
+        # h[t] = \sum_{i=0}^{k-1} weight[i] * x_seq[t - k + 1 + i], which costs O(T log T) by FFT, rather than O(Tk)
+        T = x_seq.shape[0]
+        k = weight.shape[0]
+        n = T + k - 1
+        dtype = x_seq.dtype
+        if dtype not in (torch.float, torch.double):
+            # the FFT of half precision only supports lengths of powers of 2 on CUDA, and loses much precision
+            x_seq = x_seq.float()
+        x_f = torch.fft.rfft(x_seq, n=n, dim=0)
+        w_f = torch.fft.rfft(weight.flip(0).to(x_seq), n=n)
+        return torch.fft.irfft(x_f * w_f.unsqueeze(1), n=n, dim=0)[0: T].to(dtype)
+
+    def select_multi_step_backend(self, T: int):
+        if self.backend != 'auto':
+            return self.backend
+        # the costs of 'conv' and 'gemm' grow with T * k and T * T, while the cost of 'fft' grows with T log T
+        if self.k >= 64 and T >= 256:
+            return 'fft'
+        return 'conv'
+
     def __init__(self, k: int, exp_init: bool = True,
                  surrogate_function: surrogate.SurrogateFunctionBase = surrogate.ATan(), step_mode: str = 's',
                  backend: str = 'gemm'):
@@ -2197,7 +2593,7 @@ class SlidingPSN(base.MemoryModule):
         :type surrogate_function: Callable
         :param step_mode: the step mode, which can be `s` (single-step) or `m` (multi-step)
         :type step_mode: str
-        :param backend: backend fot this neuron layer, which can be "gemm" or "conv". This option only works for the multi-step mode
+        :param backend: backend fot this neuron layer, which can be "gemm", "conv", "fft" or "auto". This option only works for the multi-step mode
         :type backend: str
 
         The Sliding Parallel Spiking Neuron proposed in `Parallel Spiking Neurons with High Efficiency and Long-term Dependencies Learning Ability <https://arxiv.org/abs/2304.12760>`_. The neuronal dynamics are defined as
@@ -2216,11 +2612,21 @@ class SlidingPSN(base.MemoryModule):
 
             The Sliding PSN supports both single-step and multi-step mode. But using the multi-step mode is much faster than the single-step mode.
 
+        .. admonition:: Note
+            :class: note
+
+            The "gemm" backend builds a dense ``[T, T]`` weight, and the "conv" backend costs :math:`O(Tk)`. The "fft"
+            backend computes the causal convolution by FFT with :math:`O(T \\log T)` cost, which is faster when both
+            ``T`` and ``k`` are large (e.g., long audio or DVS sequences). The "auto" backend selects "fft" or "conv"
+            according to ``T`` and ``k`` in each forward.
+
 
         """
 
         super().__init__()
-        self.register_memory('queue', [])
+        # the single-step mode stores the last k inputs in a ring buffer with shape = [k, N * (*)]
+        self.register_memory('queue', None)
+        self.register_memory('queue_t', 0)
         self.step_mode = step_mode
         self.k = k
         self.surrogate_function = surrogate_function
@@ -2239,27 +2645,42 @@ class SlidingPSN(base.MemoryModule):
         self.bias = nn.Parameter(torch.as_tensor(-1.))
 
     def single_step_forward(self, x: torch.Tensor):
-        self.queue.append(x.flatten())
-        if self.queue.__len__() > self.k:
-            self.queue.pop(0)
-
-        weight = self.weight[self.k - self.queue.__len__(): self.k]
-        x_seq = torch.stack(self.queue)
-
-        weight = weight.unsqueeze(-1)
+        x_flatten = x.flatten()
+        if self.queue is None:
+            self.queue = torch.zeros([self.k, x_flatten.numel()], dtype=x.dtype, device=x.device)
+
+        slot = self.queue_t % self.k
+        if torch.is_grad_enabled() and (x.requires_grad or self.weight.requires_grad or self.queue.requires_grad):
+            # the ring buffer is saved for backward by the previous steps, and can not be modified in-place
+            self.queue = self.queue.index_copy(0, torch.as_tensor([slot], device=x.device), x_flatten.unsqueeze(0))
+        else:
+            self.queue[slot] = x_flatten
+        self.queue_t += 1
 
-        h = torch.sum(weight * x_seq, 0)
+        # the newest input is in the slot, and the weight of queue[slot - j] is weight[k - 1 - j]
+        # the slots that have not been written are zeros
+        weight = torch.roll(self.weight, slot + 1).to(x)
+        h = torch.mv(self.queue.t(), weight)
         spike = self.surrogate_function(h + self.bias)
 
         return spike.view(x.shape)
 
+    def reset(self, mask: Optional[torch.Tensor] = None):
+        if mask is None or self.queue is None:
+            super().reset(mask)
+        else:
+            # the ring buffer has shape = [k, N * (*)]
+            N = mask.shape[0]
+            self.queue = self.masked_reset_memory(self.queue.view(self.k, N, -1).transpose(0, 1), None, mask).transpose(0, 1).reshape(self.k, -1)
+
     def multi_step_forward(self, x_seq: torch.Tensor):
-        if self.backend == 'gemm':
+        backend = self.select_multi_step_backend(x_seq.shape[0])
+        if backend == 'gemm':
 
             weight = self.gen_gemm_weight(x_seq.shape[0])
             h_seq = torch.addmm(self.bias, weight, x_seq.flatten(1)).view(x_seq.shape)
             return self.surrogate_function(h_seq)
-        elif self.backend == 'conv':
+        elif backend == 'conv':
 
             # x_seq.shape = [T, N, *]
             x_seq_shape = x_seq.shape
@@ -2272,6 +2693,10 @@ class SlidingPSN(base.MemoryModule):
             x_seq = x_seq.squeeze(1).t().view(x_seq_shape)
             return self.surrogate_function(x_seq + self.bias)
 
+        elif backend == 'fft':
+            h_seq = self.fft_causal_conv1d(x_seq.flatten(1), self.weight).view(x_seq.shape)
+            return self.surrogate_function(h_seq + self.bias)
+
         else:
             raise NotImplementedError(self.backend)
 
@@ -2892,8 +3317,15 @@ class OTTTLIFNode(LIFNode):
         """
         self._memories.pop('v')
 
-    def reset(self):
-        super().reset()
+    def reset(self, mask: Optional[torch.Tensor] = None):
+        super().reset(mask)
+        if mask is not None:
+            # v and trace are buffers rather than memories
+            if hasattr(self, 'v'):
+                self.v = self.masked_reset_memory(self.v, 0. if self.v_reset is None else self.v_reset, mask)
+            if hasattr(self, 'trace'):
+                self.trace = self.masked_reset_memory(self.trace, 0., mask)
+            return
         if hasattr(self, 'v'):
             del self.v
         if hasattr(self, 'trace'):
@@ -3075,8 +3507,13 @@ class SLTTLIFNode(LIFNode):
         assert step_mode == 's', "Please use single-step mode to enable memory-efficient training."
         self._memories.pop('v')
 
-    def reset(self):
-        super().reset()
+    def reset(self, mask: Optional[torch.Tensor] = None):
+        super().reset(mask)
+        if mask is not None:
+            # v is a buffer rather than a memory
+            if hasattr(self, 'v'):
+                self.v = self.masked_reset_memory(self.v, 0. if self.v_reset is None else self.v_reset, mask)
+            return
         if hasattr(self, 'v'):
             del self.v
 
@@ -3168,6 +3605,10 @@ class CLIFNode(BaseNode):
         return spike
 
     def multi_step_forward(self, x_seq: torch.Tensor):
+        if self.backend == 'inductor':
+            # the traced loop calls single_step_forward, which also updates c
+            return self.inductor_multi_step_forward(x_seq)
+
         T = x_seq.shape[0]
         spike_seq = []
 
@@ -3694,9 +4135,7 @@ class NonSpikingBaseNode(nn.Module, base.MultiStepModule):
     def neuronal_charge(self, x: torch.Tensor):
         raise NotImplementedError
 
-    def forward(self, x_seq: torch.Tensor):
-        self.v = torch.full_like(x_seq[0].data, fill_value=0.0)
-
+    def multi_step_neuronal_charge(self, x_seq: torch.Tensor):
         T = x_seq.shape[0]
         v_seq = []
 
@@ -3704,17 +4143,23 @@ class NonSpikingBaseNode(nn.Module, base.MultiStepModule):
             self.neuronal_charge(x_seq[t])
             v_seq.append(self.v)
 
+        return torch.stack(v_seq, 0)
+
+    def forward(self, x_seq: torch.Tensor):
+        self.v = torch.full_like(x_seq[0].data, fill_value=0.0)
+
+        v_seq = self.multi_step_neuronal_charge(x_seq)
+
         if self.decode == 'max-mem':
-            mem = torch.max(torch.stack(v_seq, 0), 0).values
+            mem = torch.max(v_seq, 0).values
 
         elif self.decode == 'max-abs-mem':
-            v_stack = torch.stack(v_seq, 0)
-            max_mem = torch.max(v_stack, 0).values
-            min_mem = torch.min(v_stack, 0).values
+            max_mem = torch.max(v_seq, 0).values
+            min_mem = torch.min(v_seq, 0).values
             mem = max_mem * (max_mem.abs() > min_mem.abs()) + min_mem * (max_mem.abs() <= min_mem.abs())
 
         elif self.decode == 'mean-mem':
-            mem = torch.mean(torch.stack(v_seq, 0), 0)
+            mem = torch.mean(v_seq, 0)
 
         else:  # 'last-mem'
             mem = v_seq[-1]
@@ -3729,6 +4174,12 @@ class NonSpikingIFNode(NonSpikingBaseNode):
     def neuronal_charge(self, x: torch.Tensor):
         self.v = self.v + x
 
+    def multi_step_neuronal_charge(self, x_seq: torch.Tensor):
+        from . import functional
+        v_seq = functional.linear_recurrence_scan(x_seq, 1., self.v)
+        self.v = v_seq[-1]
+        return v_seq
+
 
 class NonSpikingLIFNode(NonSpikingBaseNode):
     def __init__(self, tau: float = 2., decode='last-mem'):
@@ -3739,6 +4190,13 @@ class NonSpikingLIFNode(NonSpikingBaseNode):
     def neuronal_charge(self, x: torch.Tensor):
         self.v = self.v + (x - self.v) / self.tau
 
+    def multi_step_neuronal_charge(self, x_seq: torch.Tensor):
+        from . import functional
+        # v[t] = (1 - 1 / tau) * v[t - 1] + x[t] / tau
+        v_seq = functional.linear_recurrence_scan(x_seq / self.tau, 1. - 1. / self.tau, self.v)
+        self.v = v_seq[-1]
+        return v_seq
+
 
 ##########################################################################################################
 # Noisy Non-spiking modules
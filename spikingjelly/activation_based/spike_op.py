@@ -4,10 +4,10 @@ import torch.nn.functional as F
 from torch.utils.cpp_extension import load_inline
 from torch.cuda.amp import custom_fwd, custom_bwd
 import logging
-from . import tensor_cache
+from . import tensor_cache, base, functional, quantize
 
 from torch import Tensor
-from typing import Optional, Union
+from typing import Callable, Optional, Union
 from torch.types import _int, _size
 from torch.nn.modules.utils import _single, _pair, _triple
 
@@ -504,3 +504,380 @@ class SpikeConv3d(nn.Conv3d):
         return spike_conv3d(
             spike, weight, bias, self.stride, self.padding, self.dilation, self.groups
         )
+
+
+def quantize_weight_per_channel(weight: Tensor, bits: int = 8, clip_ratio: float = 1.):
+    """
+    * :ref:`API in English <quantize_weight_per_channel-en>`
+
+    .. _quantize_weight_per_channel-cn:
+
+    :param weight: 浮点权重，``shape = [C_out, *]``
+    :type weight: torch.Tensor
+    :param bits: 量化的位数
+    :type bits: int
+    :param clip_ratio: 每个输出通道的截断阈值为 ``clip_ratio * max(abs(weight[i]))``
+    :type clip_ratio: float
+    :return: ``(weight_int, scale)``，其中 ``weight_int`` 是 ``dtype=torch.int8`` 的整数权重，``scale`` 是 ``shape = [C_out]``
+        的缩放系数，``weight[i] ≈ weight_int[i] * scale[i]``
+    :rtype: tuple
+
+    基于 :class:`spikingjelly.activation_based.quantize.k_bit_quantize` 的逐通道对称量化。``abs(weight[i])`` 被截断阈值归一化到
+    ``[0, 1]`` 后用 ``bits - 1`` 位量化，再乘以符号，得到 ``[-(2 ** (bits - 1) - 1), 2 ** (bits - 1) - 1]`` 中的整数。
+
+    * :ref:`中文API <quantize_weight_per_channel-cn>`
+
+    .. _quantize_weight_per_channel-en:
+
+    :param weight: the float weight with ``shape = [C_out, *]``
+    :type weight: torch.Tensor
+    :param bits: the number of bits
+    :type bits: int
+    :param clip_ratio: the clipping threshold of each output channel is ``clip_ratio * max(abs(weight[i]))``
+    :type clip_ratio: float
+    :return: ``(weight_int, scale)``, where ``weight_int`` is the integer weight with ``dtype=torch.int8`` and
+        ``scale`` is the scale with ``shape = [C_out]``, and ``weight[i] ≈ weight_int[i] * scale[i]``
+    :rtype: tuple
+
+    The per-channel symmetric quantization based on :class:`spikingjelly.activation_based.quantize.k_bit_quantize`.
+    ``abs(weight[i])`` is normalized to ``[0, 1]`` by the clipping threshold and quantized with ``bits - 1`` bits, and
+    then multiplied by the sign, which gives integers in ``[-(2 ** (bits - 1) - 1), 2 ** (bits - 1) - 1]``.
+    """
+    assert 2 <= bits <= 8
+    q_max = (1 << (bits - 1)) - 1
+    with torch.no_grad():
+        w = weight.detach().flatten(1).float()
+        threshold = w.abs().amax(1) * clip_ratio
+        threshold = torch.where(threshold > 0., threshold, torch.ones_like(threshold))
+        w = (w / threshold.unsqueeze(1)).clamp(-1., 1.)
+        w_int = torch.round(torch.sign(w) * quantize.k_bit_quantize(w.abs(), bits - 1) * q_max)
+    return w_int.to(torch.int8).view(weight.shape), threshold / q_max
+
+
+def exact_accumulation_dtype(fan_in: int, q_max: int = 127):
+    # the float dtype in which the sums of at most ``fan_in`` integers in [-q_max, q_max] are exact, which is used by the
+    # dense path as an exact replacement of the int32 accumulation
+    if fan_in * q_max < (1 << 24):
+        return torch.float32
+    return torch.float64
+
+
+class QuantizedSpikeLinear(nn.Module, base.StepModule):
+    def __init__(self, weight_int: Tensor, scale: Tensor, bias: Optional[Tensor] = None,
+                 sparse_threshold: float = 0.004, step_mode: str = 's'):
+        """
+        * :ref:`API in English <QuantizedSpikeLinear.__init__-en>`
+
+        .. _QuantizedSpikeLinear.__init__-cn:
+
+        :param weight_int: 整数权重，``shape = [out_features, in_features], dtype=torch.int8``
+        :type weight_int: torch.Tensor
+        :param scale: 每个输出通道的缩放系数，``shape = [out_features]``
+        :type scale: torch.Tensor
+        :param bias: 浮点偏置
+        :type bias: Optional[torch.Tensor]
+        :param sparse_threshold: 发放率不超过此值时使用稀疏的累加
+        :type sparse_threshold: float
+        :param step_mode: 步进模式，可以为 `'s'` (单步) 或 `'m'` (多步)
+        :type step_mode: str
+
+        :class:`SpikeLinear` 的 ``int8`` 权重、``int32`` 累加的CPU推理版本。由于输入的脉冲只取0或1，每个输出只需要累加被激活的输入
+        对应的整数权重，不需要乘法，最后再乘以缩放系数 ``scale`` 并加上偏置。
+
+        发放率不超过 ``sparse_threshold`` 时，只遍历激活的输入并累加其整数权重；否则在CPU上使用 ``int8`` 输入和 ``int8`` 权重、
+        ``int32`` 输出的矩阵乘法 ``torch._int_mm``。稀疏的累加在浮点数中进行，而整数的和在浮点数中是精确的（参见
+        ``exact_accumulation_dtype``），因此两种方式的结果完全相同。可以使用 :class:`from_float` 或
+        :class:`calibrate_quantized_spike_layers` 创建。
+
+        .. warning::
+
+            输入中的任何元素都必须为0或1。
+
+        * :ref:`中文API <QuantizedSpikeLinear.__init__-cn>`
+
+        .. _QuantizedSpikeLinear.__init__-en:
+
+        :param weight_int: the integer weight with ``shape = [out_features, in_features], dtype=torch.int8``
+        :type weight_int: torch.Tensor
+        :param scale: the scale of each output channel with ``shape = [out_features]``
+        :type scale: torch.Tensor
+        :param bias: the float bias
+        :type bias: Optional[torch.Tensor]
+        :param sparse_threshold: the sparse accumulation is used if the firing rate is not larger than this value
+        :type sparse_threshold: float
+        :param step_mode: the step mode, which can be `s` (single-step) or `m` (multi-step)
+        :type step_mode: str
+
+        The CPU inference version of :class:`SpikeLinear` with ``int8`` weights and ``int32`` accumulation. As the input
+        spikes are only 0 or 1, each output only accumulates the integer weights of the active inputs without
+        multiplications, and is then multiplied by ``scale`` and added with the bias.
+
+        If the firing rate is not larger than ``sparse_threshold``, only the active inputs are iterated and their integer
+        weights are accumulated. Otherwise, the matrix multiplication ``torch._int_mm`` with ``int8`` inputs, ``int8``
+        weights and ``int32`` outputs is used on CPU. The sparse accumulation is done in float, where the sums of integers
+        are exact (see ``exact_accumulation_dtype``). Thus, the two ways give identical results. It can be created by
+        :class:`from_float` or :class:`calibrate_quantized_spike_layers`.
+
+        .. admonition:: Warning
+            :class: warning
+
+            Any element in the input must be 0 or 1.
+        """
+        super().__init__()
+        # the transposed weight makes the weights of one input contiguous for the sparse accumulation
+        self.register_buffer('weight_t', weight_int.t().contiguous())
+        self.register_buffer('scale', scale.float())
+        self.register_buffer('bias', None if bias is None else bias.detach().float())
+        self.sparse_threshold = sparse_threshold
+        self.step_mode = step_mode
+
+    @staticmethod
+    def from_float(linear: nn.Linear, bits: int = 8, clip_ratio: float = 1., sparse_threshold: float = 0.004):
+        weight_int, scale = quantize_weight_per_channel(linear.weight, bits, clip_ratio)
+        return QuantizedSpikeLinear(weight_int, scale, linear.bias, sparse_threshold,
+                                    getattr(linear, 'step_mode', 's'))
+
+    @property
+    def in_features(self):
+        return self.weight_t.shape[0]
+
+    @property
+    def out_features(self):
+        return self.weight_t.shape[1]
+
+    def extra_repr(self):
+        return f'in_features={self.in_features}, out_features={self.out_features}, bias={self.bias is not None}, sparse_threshold={self.sparse_threshold}, step_mode={self.step_mode}'
+
+    def accumulate(self, spike: Tensor):
+        # returns the integer sums of the weights of the active inputs with shape = [M, out_features]
+        dtype = exact_accumulation_dtype(self.in_features)
+        if functional.is_sparse_spike(spike, self.sparse_threshold):
+            rows, cols = spike.nonzero(as_tuple=True)
+            acc = torch.zeros([spike.shape[0], self.out_features], dtype=dtype, device=spike.device)
+            acc.index_add_(0, rows, self.weight_t.index_select(0, cols).to(dtype))
+            return acc
+        if hasattr(torch, '_int_mm') and spike.device.type == 'cpu':
+            # int8 x int8 -> int32 matrix multiplication
+            return torch._int_mm(spike.to(torch.int8), self.weight_t)
+        return torch.mm(spike.to(dtype), self.weight_t.to(dtype))
+
+    def forward(self, spike: Tensor):
+        out_shape = spike.shape[0: -1] + (self.out_features,)
+        y = self.accumulate(spike.reshape(-1, self.in_features)).float() * self.scale
+        if self.bias is not None:
+            y += self.bias
+        return y.view(out_shape)
+
+
+class QuantizedSpikeConv2d(nn.Module, base.StepModule):
+    def __init__(self, weight_int: Tensor, scale: Tensor, bias: Optional[Tensor] = None, stride=1, padding=0,
+                 dilation=1, sparse_threshold: float = 0.004, step_mode: str = 's'):
+        """
+        * :ref:`API in English <QuantizedSpikeConv2d.__init__-en>`
+
+        .. _QuantizedSpikeConv2d.__init__-cn:
+
+        :param weight_int: 整数权重，``shape = [C_out, C_in, kH, kW], dtype=torch.int8``
+        :type weight_int: torch.Tensor
+        :param scale: 每个输出通道的缩放系数，``shape = [C_out]``
+        :type scale: torch.Tensor
+        :param bias: 浮点偏置
+        :type bias: Optional[torch.Tensor]
+        :param sparse_threshold: 发放率不超过此值时使用稀疏的累加
+        :type sparse_threshold: float
+        :param step_mode: 步进模式，可以为 `'s'` (单步) 或 `'m'` (多步)
+        :type step_mode: str
+
+        :class:`SpikeConv2d` 的 ``int8`` 权重、``int32`` 累加的CPU推理版本，只支持 ``groups = 1`` 和补零填充。其他的参数API参见
+        :class:`torch.nn.Conv2d`。稀疏的累加使用 :class:`spikingjelly.activation_based.functional.sparse_spike_conv2d`，稠密的
+        累加使用卷积，两者都以浮点数精确地计算整数的和（参见 :class:`QuantizedSpikeLinear`），结果完全相同。
+
+        * :ref:`中文API <QuantizedSpikeConv2d.__init__-cn>`
+
+        .. _QuantizedSpikeConv2d.__init__-en:
+
+        :param weight_int: the integer weight with ``shape = [C_out, C_in, kH, kW], dtype=torch.int8``
+        :type weight_int: torch.Tensor
+        :param scale: the scale of each output channel with ``shape = [C_out]``
+        :type scale: torch.Tensor
+        :param bias: the float bias
+        :type bias: Optional[torch.Tensor]
+        :param sparse_threshold: the sparse accumulation is used if the firing rate is not larger than this value
+        :type sparse_threshold: float
+        :param step_mode: the step mode, which can be `s` (single-step) or `m` (multi-step)
+        :type step_mode: str
+
+        The CPU inference version of :class:`SpikeConv2d` with ``int8`` weights and ``int32`` accumulation, which only
+        supports ``groups = 1`` and zero padding. Refer to :class:`torch.nn.Conv2d` for other parameters' API. The
+        sparse accumulation uses :class:`spikingjelly.activation_based.functional.sparse_spike_conv2d` and the dense
+        accumulation uses the convolution. Both compute the integer sums exactly in float (see
+        :class:`QuantizedSpikeLinear`) and give identical results.
+        """
+        super().__init__()
+        self.register_buffer('weight', weight_int)
+        self.register_buffer('scale', scale.float())
+        self.register_buffer('bias', None if bias is None else bias.detach().float())
+        self.stride = _pair(stride)
+        self.padding = _pair(padding)
+        self.dilation = _pair(dilation)
+        self.sparse_threshold = sparse_threshold
+        self.step_mode = step_mode
+
+    @staticmethod
+    def from_float(conv2d: nn.Conv2d, bits: int = 8, clip_ratio: float = 1., sparse_threshold: float = 0.004):
+        if conv2d.groups != 1 or conv2d.padding_mode != 'zeros' or isinstance(conv2d.padding, str):
+            raise NotImplementedError('QuantizedSpikeConv2d only supports groups = 1 and zero padding with integers!')
+        weight_int, scale = quantize_weight_per_channel(conv2d.weight, bits, clip_ratio)
+        return QuantizedSpikeConv2d(weight_int, scale, conv2d.bias, conv2d.stride, conv2d.padding, conv2d.dilation,
+                                    sparse_threshold, getattr(conv2d, 'step_mode', 's'))
+
+    def extra_repr(self):
+        return f'{self.weight.shape[1]}, {self.weight.shape[0]}, kernel_size={tuple(self.weight.shape[2:])}, stride={self.stride}, padding={self.padding}, bias={self.bias is not None}, sparse_threshold={self.sparse_threshold}, step_mode={self.step_mode}'
+
+    def accumulate(self, spike: Tensor):
+        dtype = exact_accumulation_dtype(self.weight[0].numel())
+        if functional.is_sparse_spike(spike, self.sparse_threshold):
+            return functional.sparse_spike_conv2d(spike, self.weight.to(dtype), None, self.stride, self.padding,
+                                                  self.dilation)
+        return F.conv2d(spike.to(dtype), self.weight.to(dtype), None, self.stride, self.padding, self.dilation)
+
+    def conv2d_forward(self, spike: Tensor):
+        y = self.accumulate(spike).float() * self.scale.view(1, -1, 1, 1)
+        if self.bias is not None:
+            y += self.bias.view(1, -1, 1, 1)
+        return y
+
+    def forward(self, spike: Tensor):
+        if self.step_mode == 's':
+            return self.conv2d_forward(spike)
+        elif self.step_mode == 'm':
+            return functional.seq_to_ann_forward(spike, self.conv2d_forward)
+        else:
+            raise ValueError(self.step_mode)
+
+
+@torch.no_grad()
+def calibrate_quantized_spike_layers(net: nn.Module, x_calibration: Tensor, bits: int = 8,
+                                     clip_ratios: tuple = (1., 0.99, 0.98, 0.95, 0.9, 0.8),
+                                     sparse_threshold: float = 0.004, forward_fn: Optional[Callable] = None):
+    """
+    * :ref:`API in English <calibrate_quantized_spike_layers-en>`
+
+    .. _calibrate_quantized_spike_layers-cn:
+
+    :param net: 网络，会被原地修改
+    :type net: nn.Module
+    :param x_calibration: 用于校准的输入
+    :type x_calibration: torch.Tensor
+    :param bits: 权重量化的位数
+    :type bits: int
+    :param clip_ratios: 候选的截断比例，参见 :class:`quantize_weight_per_channel`
+    :type clip_ratios: tuple
+    :param sparse_threshold: 量化层的 ``sparse_threshold``
+    :type sparse_threshold: float
+    :param forward_fn: ``forward_fn(net, x_calibration)`` 运行网络。为 ``None`` 时使用 ``net(x_calibration)``
+    :type forward_fn: Optional[Callable]
+    :return: 一个字典，键为被替换的模块的名字，值为 ``(clip_ratio, mse)``
+    :rtype: dict
+
+    使用 ``x_calibration`` 运行一次网络，记录 ``net`` 中每个全连接层和卷积层（``groups = 1``、补零填充）的输入。输入全部为0或1
+    的层（例如神经元之后的层）被替换为 :class:`QuantizedSpikeLinear` 或 :class:`QuantizedSpikeConv2d`，输入不是脉冲的层（例如
+    接收图片的第一层）保持不变。对每个被替换的层，从 ``clip_ratios`` 中选择使该层在校准输入上的输出与浮点输出的均方误差最小的截断
+    比例。
+
+    * :ref:`中文API <calibrate_quantized_spike_layers-cn>`
+
+    .. _calibrate_quantized_spike_layers-en:
+
+    :param net: the network, which will be modified in-place
+    :type net: nn.Module
+    :param x_calibration: the input for calibration
+    :type x_calibration: torch.Tensor
+    :param bits: the number of bits of the quantized weights
+    :type bits: int
+    :param clip_ratios: the candidate clipping ratios, see :class:`quantize_weight_per_channel`
+    :type clip_ratios: tuple
+    :param sparse_threshold: ``sparse_threshold`` of the quantized layers
+    :type sparse_threshold: float
+    :param forward_fn: ``forward_fn(net, x_calibration)`` runs the network. If ``None``, ``net(x_calibration)`` is used
+    :type forward_fn: Optional[Callable]
+    :return: a dict whose keys are the names of the replaced modules and values are ``(clip_ratio, mse)``
+    :rtype: dict
+
+    Runs the network on ``x_calibration`` once and records the inputs of each linear and convolutional layer
+    (``groups = 1`` and zero padding) in ``net``. Layers whose inputs are all 0 or 1 (e.g., layers after neurons) are
+    replaced by :class:`QuantizedSpikeLinear` or :class:`QuantizedSpikeConv2d`, while layers whose inputs are not spikes
+    (e.g., the first layer receiving images) are kept. For each replaced layer, the clipping ratio in ``clip_ratios``
+    that minimizes the mean squared error between its outputs and the float outputs on the calibration inputs is chosen.
+
+    Codes example:
+
+    .. code-block:: python
+
+        net = spiking_vgg.spiking_vgg11_bn(spiking_neuron=neuron.IFNode, num_classes=10)
+        functional.set_step_mode(net, 'm')
+        net.eval()
+        x_seq = x.unsqueeze(0).repeat(T, 1, 1, 1, 1)
+        print(spike_op.calibrate_quantized_spike_layers(net, x_seq))
+        functional.reset_net(net)
+        y_seq = net(x_seq)
+    """
+    if forward_fn is None:
+        def forward_fn(module: nn.Module, x: Tensor):
+            return module(x)
+
+    candidates = {}
+    for name, m in net.named_modules():
+        if isinstance(m, nn.Linear) or (isinstance(m, nn.Conv2d) and m.groups == 1 and m.padding_mode == 'zeros'
+                                        and not isinstance(m.padding, str)):
+            candidates[name] = m
+
+    inputs = {name: [] for name in candidates}
+    handles = []
+    for name, m in candidates.items():
+        def hook(module, args, name=name):
+            x = args[0]
+            if isinstance(module, nn.Conv2d) and x.dim() == 5:
+                x = x.flatten(0, 1)
+            inputs[name].append(x.detach())
+        handles.append(m.register_forward_pre_hook(hook))
+    functional.reset_net(net)
+    forward_fn(net, x_calibration)
+    functional.reset_net(net)
+    for handle in handles:
+        handle.remove()
+
+    modules = dict(net.named_modules())
+    report = {}
+    for name, m in candidates.items():
+        if len(inputs[name]) == 0:
+            continue
+        x = torch.cat(inputs[name])
+        if not torch.all((x == 0.) | (x == 1.)):
+            continue
+
+        if isinstance(m, nn.Conv2d):
+            y = F.conv2d(x, m.weight, None, m.stride, m.padding, m.dilation)
+        else:
+            y = F.linear(x, m.weight)
+        best = None
+        for clip_ratio in clip_ratios:
+            weight_int, scale = quantize_weight_per_channel(m.weight, bits, clip_ratio)
+            weight_q = weight_int.float() * scale.view(-1, *([1] * (weight_int.dim() - 1)))
+            if isinstance(m, nn.Conv2d):
+                y_q = F.conv2d(x, weight_q.to(x), None, m.stride, m.padding, m.dilation)
+            else:
+                y_q = F.linear(x, weight_q.to(x))
+            mse = F.mse_loss(y_q, y).item()
+            if best is None or mse < best[1]:
+                best = (clip_ratio, mse)
+
+        if isinstance(m, nn.Conv2d):
+            m_q = QuantizedSpikeConv2d.from_float(m, bits, best[0], sparse_threshold)
+        else:
+            m_q = QuantizedSpikeLinear.from_float(m, bits, best[0], sparse_threshold)
+        parent_name, _, child_name = name.rpartition('.')
+        setattr(modules[parent_name], child_name, m_q.to(m.weight.device))
+        report[name] = best
+
+    return report
@@ -0,0 +1,229 @@
+import math
+import torch
+from . import tensor_cache
+
+
+# POPCOUNT_TABLES[device][b] is the number of 1 bits in the byte b
+POPCOUNT_TABLES = {}
+
+
+def popcount_table(device: torch.device):
+    table = POPCOUNT_TABLES.get(device)
+    if table is None:
+        table = ((torch.arange(256, device=device).unsqueeze(1) >> torch.arange(8, device=device)) & 1).sum(1)
+        POPCOUNT_TABLES[device] = table
+    return table
+
+
+def unpack_spike_tensors(obj):
+    if isinstance(obj, SpikeTensor):
+        return obj.to_float()
+    elif isinstance(obj, (list, tuple)):
+        return type(obj)(unpack_spike_tensors(item) for item in obj)
+    elif isinstance(obj, dict):
+        return {key: unpack_spike_tensors(value) for key, value in obj.items()}
+    else:
+        return obj
+
+
+class SpikeTensor:
+    def __init__(self, spike_b: torch.Tensor, s_dtype: torch.dtype, s_shape: torch.Size, s_padding: int = 0):
+        """
+        * :ref:`API in English <SpikeTensor.__init__-en>`
+
+        .. _SpikeTensor.__init__-cn:
+
+        :param spike_b: 压缩后的脉冲，``dtype=torch.uint8``，每个元素保存8个脉冲
+        :type spike_b: torch.Tensor
+        :param s_dtype: 原始脉冲的数据类型
+        :type s_dtype: torch.dtype
+        :param s_shape: 原始脉冲的形状
+        :type s_shape: torch.Size
+        :param s_padding: 压缩时填充的元素数量
+        :type s_padding: int
+
+        按位压缩的脉冲，使用的内存是 ``float32`` 脉冲的1/32，用于在推理时减少层与层之间传递脉冲的内存带宽。参数与
+        :class:`float_spike_to_bool <spikingjelly.activation_based.tensor_cache.float_spike_to_bool>` 的返回值相同，通常使用
+        :class:`SpikeTensor.from_float <spikingjelly.activation_based.spike_tensor.SpikeTensor.from_float>` 创建。
+
+        ``SpikeTensor`` 可以被以下模块直接使用：
+
+        * 设置了 ``output_spike_tensor = True`` 的 :class:`BaseNode <spikingjelly.activation_based.neuron.BaseNode>` 在不计算梯度时输出 ``SpikeTensor``
+
+        * :class:`Linear <spikingjelly.activation_based.layer.Linear>` 在发放率不超过 ``sparse_threshold`` 时直接根据压缩的脉冲找到激活的输入，只累加它们对应的权重列，否则解压后使用稠密的矩阵乘法
+
+        * :class:`Flatten <spikingjelly.activation_based.layer.Flatten>` 以及 ``flatten, view, reshape`` 只修改形状，不解压
+
+        * 其他的 ``torch`` 函数，例如卷积层和池化层中的 ``torch.nn.functional.conv2d, max_pool2d``，会通过 ``__torch_function__`` 自动将 ``SpikeTensor`` 解压为原始的脉冲
+
+        * :ref:`中文API <SpikeTensor.__init__-cn>`
+
+        .. _SpikeTensor.__init__-en:
+
+        :param spike_b: the compressed spikes with ``dtype=torch.uint8``, and each element stores 8 spikes
+        :type spike_b: torch.Tensor
+        :param s_dtype: the dtype of the original spikes
+        :type s_dtype: torch.dtype
+        :param s_shape: the shape of the original spikes
+        :type s_shape: torch.Size
+        :param s_padding: the number of padding elements in compression
+        :type s_padding: int
+
+        The bit-packed spikes, which use 1/32 memory of ``float32`` spikes and reduce the memory bandwidth of passing
+        spikes between layers in inference. The arguments are the same as the outputs of
+        :class:`float_spike_to_bool <spikingjelly.activation_based.tensor_cache.float_spike_to_bool>`, and
+        :class:`SpikeTensor.from_float <spikingjelly.activation_based.spike_tensor.SpikeTensor.from_float>` is usually
+        used to create it.
+
+        ``SpikeTensor`` can be used directly by the following modules:
+
+        * :class:`BaseNode <spikingjelly.activation_based.neuron.BaseNode>` with ``output_spike_tensor = True`` outputs ``SpikeTensor`` when gradients are disabled
+
+        * :class:`Linear <spikingjelly.activation_based.layer.Linear>` finds the active inputs from the packed spikes and only accumulates their weight columns if the firing rate is not larger than ``sparse_threshold``. Otherwise, it unpacks spikes and uses the dense matrix multiplication
+
+        * :class:`Flatten <spikingjelly.activation_based.layer.Flatten>` and ``flatten, view, reshape`` only change the shape without unpacking
+
+        * Other ``torch`` functions, e.g., ``torch.nn.functional.conv2d, max_pool2d`` in convolutional and pooling layers, unpack ``SpikeTensor`` to the original spikes automatically by ``__torch_function__``
+
+        Codes example:
+
+        .. code-block:: python
+
+            import torch
+            from spikingjelly.activation_based import neuron, layer, spike_tensor
+
+            net = torch.nn.Sequential(
+                neuron.IFNode(step_mode='m'),
+                layer.Flatten(step_mode='m'),
+                layer.Linear(32, 10, step_mode='m'),
+            )
+            net[0].output_spike_tensor = True
+            with torch.no_grad():
+                s = net[0](torch.rand([4, 2, 2, 16]))
+                print(type(s), s.shape)
+                # <class 'spikingjelly.activation_based.spike_tensor.SpikeTensor'> torch.Size([4, 2, 2, 16])
+                y = net[2](net[1](s))
+                print(y.shape)
+                # torch.Size([4, 2, 10])
+        """
+        self.spike_b = spike_b
+        self.s_dtype = s_dtype
+        self.s_shape = torch.Size(s_shape)
+        self.s_padding = s_padding
+
+    @staticmethod
+    def from_float(spike: torch.Tensor):
+        """
+        :param spike: a spike tensor whose elements are 0 or 1
+        :type spike: torch.Tensor
+        :return: the packed spikes
+        :rtype: SpikeTensor
+        """
+        return SpikeTensor(*tensor_cache.float_spike_to_bool(spike))
+
+    def to_float(self):
+        """
+        :return: the unpacked spikes with ``dtype = self.dtype`` and ``shape = self.shape``
+        :rtype: torch.Tensor
+        """
+        return tensor_cache.bool_spike_to_float(self.spike_b, self.s_dtype, self.s_shape, self.s_padding)
+
+    @classmethod
+    def __torch_function__(cls, func, types, args=(), kwargs=None):
+        # unpack on demand for all torch functions that are not implemented for the packed spikes
+        if kwargs is None:
+            kwargs = {}
+        return func(*unpack_spike_tensors(args), **unpack_spike_tensors(kwargs))
+
+    @property
+    def shape(self):
+        return self.s_shape
+
+    @property
+    def dtype(self):
+        return self.s_dtype
+
+    @property
+    def device(self):
+        return self.spike_b.device
+
+    def size(self, dim: int = None):
+        if dim is None:
+            return self.s_shape
+        return self.s_shape[dim]
+
+    def dim(self):
+        return len(self.s_shape)
+
+    def numel(self):
+        return self.s_shape.numel()
+
+    def __len__(self):
+        return self.s_shape[0]
+
+    def __repr__(self):
+        return f'SpikeTensor(shape={tuple(self.s_shape)}, dtype={self.s_dtype}, device={self.device})'
+
+    def view(self, *shape):
+        if len(shape) == 1 and not isinstance(shape[0], int):
+            shape = shape[0]
+        shape = list(shape)
+        if -1 in shape:
+            i = shape.index(-1)
+            shape[i] = 1
+            shape[i] = self.numel() // math.prod(shape)
+        if math.prod(shape) != self.numel():
+            raise RuntimeError(f'shape {shape} is invalid for SpikeTensor of size {self.numel()}')
+        # the spikes are packed in the flattened order, thus changing the shape does not change the packed data
+        return SpikeTensor(self.spike_b, self.s_dtype, torch.Size(shape), self.s_padding)
+
+    def reshape(self, *shape):
+        return self.view(*shape)
+
+    def flatten(self, start_dim: int = 0, end_dim: int = -1):
+        ndim = self.dim()
+        if ndim == 0:
+            return self.view(1)
+        start_dim = start_dim % ndim
+        end_dim = end_dim % ndim
+        shape = self.s_shape[0: start_dim] + (math.prod(self.s_shape[start_dim: end_dim + 1]),) + self.s_shape[end_dim + 1:]
+        return self.view(shape)
+
+    def __getitem__(self, index):
+        inner = math.prod(self.s_shape[1:])
+        if isinstance(index, int) and inner % 8 == 0:
+            # x[t] is byte-aligned, which can be sliced from the packed data without unpacking
+            n = self.s_shape[0]
+            if not -n <= index < n:
+                raise IndexError(f'index {index} is out of bounds for dimension 0 with size {n}')
+            if index < 0:
+                index += n
+            n_bytes = inner // 8
+            return SpikeTensor(self.spike_b[index * n_bytes: (index + 1) * n_bytes], self.s_dtype, self.s_shape[1:], 0)
+        return self.to_float()[index]
+
+    def count_nonzero(self):
+        """
+        :return: the number of spikes, which is counted by the popcount of the packed bytes
+        :rtype: int
+        """
+        return popcount_table(self.device).index_select(0, self.spike_b.long()).sum().item()
+
+    def firing_rate(self):
+        """
+        :return: the ratio of spikes in all elements
+        :rtype: float
+        """
+        return self.count_nonzero() / max(self.numel(), 1)
+
+    def nonzero_flat_indices(self):
+        """
+        :return: the indices of the spikes in the flattened spikes, which are ascending
+        :rtype: torch.Tensor
+
+        Only the non-zero bytes are unpacked, which is much cheaper than unpacking all spikes when spikes are sparse.
+        """
+        byte_indices = self.spike_b.nonzero(as_tuple=True)[0]
+        bits = tensor_cache.cpu_unpack_bits(self.spike_b.index_select(0, byte_indices), torch.uint8).view(-1, 8)
+        j, bit = bits.nonzero(as_tuple=True)
+        return byte_indices[j] * 8 + bit
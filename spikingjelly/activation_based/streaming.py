@@ -0,0 +1,207 @@
+import copy
+import torch
+import torch.nn as nn
+from typing import Any, Hashable, List, Sequence
+from . import base
+
+
+class SessionManager:
+    def __init__(self, net: nn.Module, max_sessions: int):
+        """
+        * :ref:`API in English <SessionManager.__init__-en>`
+
+        .. _SessionManager.__init__-cn:
+
+        :param net: 单步模式的网络
+        :type net: nn.Module
+        :param max_sessions: 最多同时存在的会话数量
+        :type max_sessions: int
+
+        多会话的流式推理运行时。每个会话（例如一个事件相机或音频流）都有独立的状态，但所有会话共享一个网络。
+
+        ``net`` 中所有 :class:`MemoryModule <spikingjelly.activation_based.base.MemoryModule>` 的每个有状态变量都有一个
+        ``shape = [max_sessions, *]`` 的预分配缓冲区，每个会话占用其中一个槽位。每次调用 ``step`` 时，将活跃会话的状态从缓冲区中
+        收集为一个batch，调用一次网络的单步前向传播，再将新的状态写回缓冲区。这样 ``N`` 个会话的 ``N`` 次前向传播被合并为一次batch
+        大小为 ``N`` 的前向传播。
+
+        缓冲区在第一次 ``step`` 时根据状态的形状创建。状态的重置值为 ``None`` 的模块（其状态在第一次前向传播时才被创建）要求同一次
+        ``step`` 中的会话要么全部是新的，要么全部不是新的。
+
+        * :ref:`中文API <SessionManager.__init__-cn>`
+
+        .. _SessionManager.__init__-en:
+
+        :param net: the network in single-step mode
+        :type net: nn.Module
+        :param max_sessions: the maximum number of concurrent sessions
+        :type max_sessions: int
+
+        The multi-session streaming inference runtime. Each session (e.g., an event camera or audio stream) has its own
+        states, while all sessions share one network.
+
+        Each stateful variable of all :class:`MemoryModule <spikingjelly.activation_based.base.MemoryModule>` in ``net``
+        has a preallocated buffer with ``shape = [max_sessions, *]``, and each session occupies one slot of it. Each call
+        of ``step`` gathers the states of the active sessions from the buffers into a batch, runs the single-step forward
+        of the network once, and scatters the new states back to the buffers. Thus, ``N`` forward calls of ``N``
+        sessions are merged into one forward call with batch size ``N``.
+
+        The buffers are created in the first ``step`` according to the shapes of the states. Modules whose states have
+        ``None`` as the reset value (the states are created in the first forward) require that the sessions in one
+        ``step`` are either all new or all not new.
+
+        Codes example:
+
+        .. code-block:: python
+
+            net = nn.Sequential(layer.Linear(8, 4), neuron.LIFNode())
+            manager = streaming.SessionManager(net, max_sessions=64)
+            manager.open_session('camera0')
+            manager.open_session('camera1')
+            with torch.no_grad():
+                for t in range(T):
+                    y = manager.step(['camera0', 'camera1'], torch.rand([2, 8]))
+                manager.open_session('mic0')
+                y = manager.step(['mic0', 'camera1'], torch.rand([2, 8]))
+            manager.close_session('camera0')
+        """
+        self.net = net
+        self.max_sessions = max_sessions
+        # session id -> slot
+        self.slots = {}
+        self.free_slots = list(range(max_sessions - 1, -1, -1))
+        # (module, memory name) -> [max_sessions, *] buffer
+        self.memory_modules = [m for m in net.modules() if isinstance(m, base.MemoryModule)]
+        self.buffers = {}
+        # (module, memory name) -> [max_sessions] bool tensor indicating whether the slot has a state, which is only
+        # used for states whose reset value is None
+        self.initialized = {}
+
+    @property
+    def sessions(self):
+        return list(self.slots.keys())
+
+    def open_session(self, session_id: Hashable):
+        """
+        :param session_id: the id of the new session
+        :type session_id: Hashable
+        :return: the slot of the session
+        :rtype: int
+
+        Opens a session, whose states are set to the reset values.
+        """
+        if session_id in self.slots:
+            raise KeyError(f'session {session_id} has been opened!')
+        if len(self.free_slots) == 0:
+            raise RuntimeError(f'the number of sessions exceeds max_sessions={self.max_sessions}!')
+        slot = self.free_slots.pop()
+        self.slots[session_id] = slot
+        self.reset_slots([slot])
+        return slot
+
+    def close_session(self, session_id: Hashable):
+        """
+        :param session_id: the id of the session
+        :type session_id: Hashable
+
+        Closes a session and releases its slot.
+        """
+        self.free_slots.append(self.slots.pop(session_id))
+
+    def reset_session(self, session_id: Hashable):
+        """
+        :param session_id: the id of the session
+        :type session_id: Hashable
+
+        Resets the states of a session to the reset values.
+        """
+        self.reset_slots([self.slots[session_id]])
+
+    def reset_slots(self, slots: List[int]):
+        for (m, name), buffer in self.buffers.items():
+            reset_value = m._memories_rv[name]
+            if reset_value is None:
+                self.initialized[(m, name)][slots] = False
+            else:
+                buffer[slots] = reset_value
+
+    def create_buffer(self, m: base.MemoryModule, name: str, value: torch.Tensor):
+        buffer = torch.empty([self.max_sessions, *value.shape[1:]], dtype=value.dtype, device=value.device)
+        reset_value = m._memories_rv[name]
+        if reset_value is None:
+            self.initialized[(m, name)] = torch.zeros(self.max_sessions, dtype=torch.bool)
+        else:
+            buffer[:] = reset_value
+        self.buffers[(m, name)] = buffer
+        return buffer
+
+    def gather(self, m: base.MemoryModule, name: str, index: torch.Tensor, slots: List[int]):
+        buffer = self.buffers.get((m, name))
+        if buffer is None:
+            # the first step: the module creates its states from the reset value
+            return copy.deepcopy(m._memories_rv[name])
+
+        if (m, name) in self.initialized:
+            initialized = self.initialized[(m, name)][slots]
+            if not initialized.any():
+                return None
+            elif not initialized.all():
+                raise ValueError(f'the reset value of {name} in {m._get_name()} is None, and new sessions can not be '
+                                 f'stepped together with other sessions!')
+        return buffer.index_select(0, index.to(buffer.device))
+
+    def scatter(self, m: base.MemoryModule, name: str, index: torch.Tensor, slots: List[int], batch_size: int):
+        value = m._memories[name]
+        if not isinstance(value, torch.Tensor) or value.dim() == 0 or value.shape[0] != batch_size:
+            # scalars that are not expanded to the batch are the same for all sessions and are not stored
+            return
+        buffer = self.buffers.get((m, name))
+        if buffer is None:
+            buffer = self.create_buffer(m, name, value)
+        buffer.index_copy_(0, index.to(buffer.device), value.to(buffer.dtype))
+        if (m, name) in self.initialized:
+            self.initialized[(m, name)][slots] = True
+
+    def step(self, session_ids: Sequence[Hashable], x: Any):
+        """
+        * :ref:`API in English <SessionManager.step-en>`
+
+        .. _SessionManager.step-cn:
+
+        :param session_ids: 活跃会话的id
+        :type session_ids: Sequence[Hashable]
+        :param x: 输入，``shape = [len(session_ids), *]``，``x[i]`` 是会话 ``session_ids[i]`` 的输入
+        :type x: Any
+        :return: 网络的输出，``y[i]`` 是会话 ``session_ids[i]`` 的输出
+        :rtype: Any
+
+        对活跃会话进行一次单步推理。
+
+        * :ref:`中文API <SessionManager.step-cn>`
+
+        .. _SessionManager.step-en:
+
+        :param session_ids: the ids of the active sessions
+        :type session_ids: Sequence[Hashable]
+        :param x: the input with ``shape = [len(session_ids), *]``, and ``x[i]`` is the input of session
+            ``session_ids[i]``
+        :type x: Any
+        :return: the output of the network, and ``y[i]`` is the output of session ``session_ids[i]``
+        :rtype: Any
+
+        Runs one single-step inference on the active sessions.
+        """
+        slots = [self.slots[session_id] for session_id in session_ids]
+        if len(set(slots)) != len(slots):
+            raise ValueError('session_ids should not contain duplicate sessions!')
+        index = torch.as_tensor(slots, dtype=torch.long)
+
+        for m in self.memory_modules:
+            for name in m._memories.keys():
+                m._memories[name] = self.gather(m, name, index, slots)
+
+        y = self.net(x)
+
+        for m in self.memory_modules:
+            for name in m._memories.keys():
+                self.scatter(m, name, index, slots, len(slots))
+        return y
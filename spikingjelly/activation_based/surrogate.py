@@ -3,6 +3,7 @@ import torch.nn as nn
 import torch.nn.functional as F
 import math
 from .auto_cuda import cfunction
+from . import tensor_cache
 
 tab4_str = '\t\t\t\t'  # used for aligning code
 curly_bracket_l = '{'
@@ -120,6 +121,72 @@ class SurrogateFunctionBase(nn.Module):
         super().__init__()
         self.spiking = spiking
         self.alpha = alpha
+        self.save_mode = 'full'
+
+    @property
+    def save_mode(self):
+        """
+        * :ref:`API in English <SurrogateFunctionBase.save_mode-en>`
+
+        .. _SurrogateFunctionBase.save_mode-cn:
+
+        :return: 反向传播所需的输入的保存方式
+        :rtype: str
+
+        ``'full'`` 时保存完整精度的输入 ``x``。``'bf16'`` 时保存 ``torch.bfloat16`` 的 ``x``，内存减半，反向传播时转换回原来的
+        数据类型。``'band'`` 只用于梯度具有紧支撑的替代函数（``band_width()`` 不为 ``None``，例如 :class:`PiecewiseQuadratic`、
+        :class:`Rect`、:class:`PiecewiseLeakyReLU`），只保存按位压缩的 ``abs(x) < band_width()`` 的掩码和带内元素的值；若带内的
+        梯度是常数（``band_constant = True``），则只保存掩码。
+
+        此选项只在使用Python实现的前向传播时生效（例如神经元的 ``'torch'`` 后端），``'full'`` 以外的选项只在 ``x`` 需要梯度时生效。
+        ``'full'`` 以外的选项只能用于 ``supports_compressed_save()`` 为 ``True`` 的替代函数，否则设置时会报错。
+
+        * :ref:`中文API <SurrogateFunctionBase.save_mode-cn>`
+
+        .. _SurrogateFunctionBase.save_mode-en:
+
+        :return: how the input needed by backward is saved
+        :rtype: str
+
+        If ``'full'``, the full-precision input ``x`` is saved. If ``'bf16'``, ``x`` is saved in ``torch.bfloat16``,
+        which halves the memory, and is cast back to the original dtype in backward. ``'band'`` is only for surrogate
+        functions whose gradients have a compact support (``band_width()`` is not ``None``, e.g.,
+        :class:`PiecewiseQuadratic`, :class:`Rect` and :class:`PiecewiseLeakyReLU`), and only saves the bit-packed mask
+        of ``abs(x) < band_width()`` and the values of elements in the band. If the gradient in the band is a constant
+        (``band_constant = True``), only the mask is saved.
+
+        This option only takes effect when the forward implemented in Python is used (e.g., the ``'torch'`` backend of
+        neurons), and options other than ``'full'`` only take effect when ``x`` requires grad. Options other than
+        ``'full'`` can only be used by surrogate functions whose ``supports_compressed_save()`` is ``True``, and an error
+        will be raised otherwise.
+        """
+        return self._save_mode
+
+    @save_mode.setter
+    def save_mode(self, value: str):
+        if value not in ('full', 'bf16', 'band'):
+            raise ValueError(f"save_mode should be 'full', 'bf16' or 'band', but got {value}!")
+        if value != 'full' and not self.supports_compressed_save():
+            raise NotImplementedError(f"{self._get_name()} does not support save_mode={value!r}!")
+        if value == 'band' and self.band_width() is None:
+            raise NotImplementedError(f"{self._get_name()} does not have a compact support and can not use "
+                                      f"save_mode='band'!")
+        self._save_mode = value
+
+    # the gradient is zero (or a constant if band_constant is True) for abs(x) >= band_width(). None means that the
+    # gradient does not have a compact support
+    band_constant = False
+
+    def band_width(self):
+        return None
+
+    def supports_compressed_save(self):
+        # save modes other than 'full' need the forward of SurrogateFunctionBase, which routes through
+        # compressed_surrogate, and a static backward(grad_output, x, alpha) used by surrogate_backward
+        return type(self).forward is SurrogateFunctionBase.forward and hasattr(type(self), 'backward')
+
+    def surrogate_backward(self, grad_output: torch.Tensor, x: torch.Tensor):
+        return self.backward(grad_output, x, self.alpha)
 
     def set_spiking_mode(self, spiking: bool):
         self.spiking = spiking
@@ -146,6 +213,8 @@ class SurrogateFunctionBase(nn.Module):
 
     def forward(self, x: torch.Tensor):
         if self.spiking:
+            if self.save_mode != 'full' and x.requires_grad and torch.is_grad_enabled():
+                return compressed_surrogate.apply(x, self)
             return self.spiking_function(x, self.alpha)
         else:
             return self.primitive_function(x, self.alpha)
@@ -159,6 +228,71 @@ class MultiArgsSurrogateFunctionBase(nn.Module):
     def __init__(self, spiking: bool, *args, **kwargs):
         super().__init__()
         self.spiking = spiking
+        self.save_mode = 'full'
+
+    @property
+    def save_mode(self):
+        """
+        * :ref:`API in English <MultiArgsSurrogateFunctionBase.save_mode-en>`
+
+        .. _MultiArgsSurrogateFunctionBase.save_mode-cn:
+
+        :return: 反向传播所需的输入的保存方式
+        :rtype: str
+
+        ``'full'`` 时保存完整精度的输入 ``x``。``'bf16'`` 时保存 ``torch.bfloat16`` 的 ``x``，内存减半，反向传播时转换回原来的
+        数据类型。``'band'`` 只用于梯度具有紧支撑的替代函数（``band_width()`` 不为 ``None``，例如 :class:`PiecewiseQuadratic`、
+        :class:`Rect`、:class:`PiecewiseLeakyReLU`），只保存按位压缩的 ``abs(x) < band_width()`` 的掩码和带内元素的值；若带内的
+        梯度是常数（``band_constant = True``），则只保存掩码。
+
+        此选项只在使用Python实现的前向传播时生效（例如神经元的 ``'torch'`` 后端），``'full'`` 以外的选项只在 ``x`` 需要梯度时生效。
+        ``'full'`` 以外的选项只能用于 ``supports_compressed_save()`` 为 ``True`` 的替代函数，否则设置时会报错。
+
+        * :ref:`中文API <MultiArgsSurrogateFunctionBase.save_mode-cn>`
+
+        .. _MultiArgsSurrogateFunctionBase.save_mode-en:
+
+        :return: how the input needed by backward is saved
+        :rtype: str
+
+        If ``'full'``, the full-precision input ``x`` is saved. If ``'bf16'``, ``x`` is saved in ``torch.bfloat16``,
+        which halves the memory, and is cast back to the original dtype in backward. ``'band'`` is only for surrogate
+        functions whose gradients have a compact support (``band_width()`` is not ``None``, e.g.,
+        :class:`PiecewiseQuadratic`, :class:`Rect` and :class:`PiecewiseLeakyReLU`), and only saves the bit-packed mask
+        of ``abs(x) < band_width()`` and the values of elements in the band. If the gradient in the band is a constant
+        (``band_constant = True``), only the mask is saved.
+
+        This option only takes effect when the forward implemented in Python is used (e.g., the ``'torch'`` backend of
+        neurons), and options other than ``'full'`` only take effect when ``x`` requires grad. Options other than
+        ``'full'`` can only be used by surrogate functions whose ``supports_compressed_save()`` is ``True``, and an error
+        will be raised otherwise.
+        """
+        return self._save_mode
+
+    @save_mode.setter
+    def save_mode(self, value: str):
+        if value not in ('full', 'bf16', 'band'):
+            raise ValueError(f"save_mode should be 'full', 'bf16' or 'band', but got {value}!")
+        if value != 'full' and not self.supports_compressed_save():
+            raise NotImplementedError(f"{self._get_name()} does not support save_mode={value!r}!")
+        if value == 'band' and self.band_width() is None:
+            raise NotImplementedError(f"{self._get_name()} does not have a compact support and can not use "
+                                      f"save_mode='band'!")
+        self._save_mode = value
+
+    # the gradient is zero (or a constant if band_constant is True) for abs(x) >= band_width(). None means that the
+    # gradient does not have a compact support
+    band_constant = False
+
+    def band_width(self):
+        return None
+
+    def supports_compressed_save(self):
+        # subclasses whose forward routes through compressed_surrogate override this and surrogate_backward
+        return False
+
+    def surrogate_backward(self, grad_output: torch.Tensor, x: torch.Tensor):
+        raise NotImplementedError(f"{self._get_name()} does not support save_mode other than 'full'!")
 
     def set_spiking_mode(self, spiking: bool):
         self.spiking = spiking
@@ -177,6 +311,53 @@ class MultiArgsSurrogateFunctionBase(nn.Module):
         raise NotImplementedError
 
 
+class compressed_surrogate(torch.autograd.Function):
+    @staticmethod
+    def forward(ctx, x: torch.Tensor, surrogate_function: nn.Module):
+        ctx.surrogate_function = surrogate_function
+        ctx.save_mode = surrogate_function.save_mode
+        if ctx.save_mode == 'bf16':
+            if x.dtype in (torch.float, torch.double):
+                ctx.x_dtype = x.dtype
+                ctx.save_for_backward(x.to(torch.bfloat16))
+            else:
+                ctx.x_dtype = None
+                ctx.save_for_backward(x)
+        elif ctx.save_mode == 'band':
+            band_width = surrogate_function.band_width()
+            if band_width is None:
+                raise NotImplementedError(f"{surrogate_function._get_name()} does not have a compact support and can not "
+                                          f"use save_mode='band'!")
+            # elements outside the band are reconstructed as a value outside the band
+            ctx.outside_value = 2. * band_width
+            ctx.x_dtype = x.dtype
+            mask = x.abs() < band_width
+            mask_b, _, ctx.x_shape, ctx.s_padding = tensor_cache.float_spike_to_bool(mask.half())
+            if surrogate_function.band_constant:
+                # the gradient only depends on whether x is in the band
+                ctx.save_for_backward(mask_b)
+            else:
+                ctx.save_for_backward(mask_b, x[mask])
+        else:
+            raise ValueError(f"save_mode should be 'full', 'bf16' or 'band', but got {ctx.save_mode}!")
+        return heaviside(x)
+
+    @staticmethod
+    def backward(ctx, grad_output: torch.Tensor):
+        if ctx.save_mode == 'bf16':
+            x = ctx.saved_tensors[0]
+            if ctx.x_dtype is not None:
+                x = x.to(ctx.x_dtype)
+        else:
+            mask = tensor_cache.bool_spike_to_float(ctx.saved_tensors[0], torch.half, ctx.x_shape, ctx.s_padding).bool()
+            x = torch.full(ctx.x_shape, ctx.outside_value, dtype=ctx.x_dtype, device=grad_output.device)
+            if ctx.surrogate_function.band_constant:
+                x.masked_fill_(mask, 0.)
+            else:
+                x.masked_scatter_(mask, ctx.saved_tensors[1])
+        return ctx.surrogate_function.surrogate_backward(grad_output, x), None
+
+
 @torch.jit.script
 def piecewise_quadratic_backward(grad_output: torch.Tensor, x: torch.Tensor, alpha: float):
     x_abs = x.abs()
@@ -283,6 +464,9 @@ class PiecewiseQuadratic(SurrogateFunctionBase):
     def backward(grad_output, x, alpha):
         return piecewise_quadratic_backward(grad_output, x, alpha)[0]
 
+    def band_width(self):
+        return 1. / self.alpha
+
     # plt.style.use(['science', 'muted', 'grid'])
     # fig = plt.figure(dpi=200)
     # x = torch.arange(-2.5, 2.5, 0.001)
@@ -700,7 +884,7 @@ class SuperSpike(SurrogateFunctionBase):
 
     @staticmethod
     def spiking_function(x, alpha):
-        return atan.apply(x, alpha)
+        return super_spike.apply(x, alpha)
 
     @staticmethod
     @torch.jit.script
@@ -850,7 +1034,7 @@ class nonzero_sign_log_abs(torch.autograd.Function):
 
     @staticmethod
     def backward(ctx, grad_output):
-        return nonzero_sign_log_abs_backward((grad_output, ctx.saved_tensors[0], ctx.alpha))
+        return nonzero_sign_log_abs_backward(grad_output, ctx.saved_tensors[0], ctx.alpha)
 
 
 class NonzeroSignLogAbs(SurrogateFunctionBase):
@@ -1178,6 +1362,8 @@ class PiecewiseLeakyReLU(MultiArgsSurrogateFunctionBase):
 
     def forward(self, x):
         if self.spiking:
+            if self.save_mode != 'full' and x.requires_grad and torch.is_grad_enabled():
+                return compressed_surrogate.apply(x, self)
             f = self.spiking_function
         else:
             f = self.primitive_function
@@ -1192,6 +1378,17 @@ class PiecewiseLeakyReLU(MultiArgsSurrogateFunctionBase):
     def backward(grad_output, x, w, c):
         return piecewise_leaky_relu_backward(grad_output, x, w, c)[0]
 
+    def supports_compressed_save(self):
+        return True
+
+    def surrogate_backward(self, grad_output: torch.Tensor, x: torch.Tensor):
+        return self.backward(grad_output, x, self.w, self.c)
+
+    band_constant = True
+
+    def band_width(self):
+        return self.w
+
     @staticmethod
     @torch.jit.script
     def primitive_function(x: torch.Tensor, w: float, c: float):
@@ -1616,6 +1813,10 @@ class QPseudoSpike(SurrogateFunctionBase):
     def spiking_function(x, alpha):
         return q_pseudo_spike.apply(x, alpha)
 
+    @staticmethod
+    def backward(grad_output, x, alpha):
+        return ((1 + 2 / (alpha - 1) * x.abs()).pow_(-alpha)) * grad_output
+
     @staticmethod
     def primitive_function(x: torch.Tensor, alpha: float):
         mask_nonnegative = heaviside(x)
@@ -2161,6 +2362,11 @@ class Rect(SurrogateFunctionBase):
     def backward(grad_output, x, alpha):
         return rect_backward(grad_output, x, alpha)[0]
 
+    band_constant = True
+
+    def band_width(self):
+        return 0.5 / self.alpha
+
 
 class poisson_pass(torch.autograd.Function):
     @staticmethod
@@ -1,4 +1,5 @@
 from typing import Union
+import sys
 import torch
 import torch.nn.functional as F
 import threading
@@ -89,9 +90,52 @@ class DataTypeConvertCUDACode:
                 }
             }
     '''
+# on little-endian systems, 8 bytes viewed as int64 * PACK_MAGIC_NUMBER places the lowest bit of the i-th byte at the
+# (56 + i)-th bit, which packs 8 bytes whose values are 0 or 1 to a byte in one multiplication
+PACK_MAGIC_NUMBER = 0x0102040810204080
+
+# UNPACK_TABLES[(dtype, device)][b] is the 8 spikes stored in the byte b
+UNPACK_TABLES = {}
+
+def cpu_pack_bits(spike: torch.Tensor):
+    """
+    :param spike: a flattened spike tensor whose elements are 0 or 1 and ``numel % 8 == 0``
+    :type spike: torch.Tensor
+    :return: an uint8 tensor with ``numel = spike.numel() // 8``, whose ``i``-th element stores ``spike[8i: 8i + 8]``
+    :rtype: torch.Tensor
+
+    Packs spikes to bits by byte-level vectorized operations, which are much faster than looping over the 8 bits.
+    """
+    spike = spike.to(torch.uint8)
+    if sys.byteorder == 'little':
+        return ((spike.view(torch.int64) * PACK_MAGIC_NUMBER) >> 56).to(torch.uint8)
+    else:
+        shifts = torch.arange(8, device=spike.device, dtype=torch.uint8)
+        return (spike.view(-1, 8) << shifts).sum(1, dtype=torch.uint8)
+
+def cpu_unpack_bits(spike_b: torch.Tensor, s_dtype: torch.dtype):
+    """
+    :param spike_b: an uint8 tensor whose each element stores 8 spikes
+    :type spike_b: torch.Tensor
+    :param s_dtype: the dtype of the unpacked spikes
+    :type s_dtype: torch.dtype
+    :return: a flattened spike tensor with ``numel = spike_b.numel() * 8``
+    :rtype: torch.Tensor
+
+    Unpacks bits to spikes by looking up a ``[256, 8]`` table, which is much faster than looping over the 8 bits.
+    """
+    key = (s_dtype, spike_b.device)
+    table = UNPACK_TABLES.get(key)
+    if table is None:
+        table = (torch.arange(256, device=spike_b.device).unsqueeze(1) >> torch.arange(8, device=spike_b.device)) & 1
+        table = table.to(s_dtype)
+        UNPACK_TABLES[key] = table
+    return torch.index_select(table, 0, spike_b.long()).flatten()
+
 def float_spike_to_bool(spike: torch.Tensor):
     """
-    :param spike: a spike tensor whose ``dtype=torch.float`` or ``dtype=torch.half`` and all elements are 0 or 1
+    :param spike: a spike tensor whose ``dtype=torch.float`` or ``dtype=torch.half`` (any floating dtype on CPU) and all
+        elements are 0 or 1
     :type spike: torch.Tensor
     :return: (spike_b, s_dtype, s_shape, s_padding)
         spike_b: a compressed spike tensor with ``dtype=torch.uint8`` and each element stores 8 spikes
@@ -104,15 +148,6 @@ def float_spike_to_bool(spike: torch.Tensor):
     represents 8 elements of ``spike``.
     """
     s_dtype = spike.dtype
-    if s_dtype == torch.float:
-        kernel_codes = DataTypeConvertCUDACode.float2bool
-        kernel_name = 'float2bool'
-    elif s_dtype == torch.half:
-        kernel_codes = DataTypeConvertCUDACode.half2bool
-        kernel_name = 'half2bool'
-    else:
-        raise NotImplementedError
-
     s_shape = spike.shape
 
     spike = spike.flatten()
@@ -120,9 +155,17 @@ def float_spike_to_bool(spike: torch.Tensor):
     if s_padding != 0 and s_padding != 8:
         spike = F.pad(spike, (0, s_padding))
     device_id = spike.get_device()
-    spike_b = torch.zeros([spike.numel() // 8], device=spike.device, dtype=torch.uint8)
 
     if device_id >= 0 and cupy is not None:
+        if s_dtype == torch.float:
+            kernel_codes = DataTypeConvertCUDACode.float2bool
+            kernel_name = 'float2bool'
+        elif s_dtype == torch.half:
+            kernel_codes = DataTypeConvertCUDACode.half2bool
+            kernel_name = 'half2bool'
+        else:
+            raise NotImplementedError
+        spike_b = torch.zeros([spike.numel() // 8], device=spike.device, dtype=torch.uint8)
         with cuda_utils.DeviceEnvironment(device_id):
             numel = spike_b.numel()
             blocks = cuda_utils.cal_blocks(numel)
@@ -142,9 +185,7 @@ def float_spike_to_bool(spike: torch.Tensor):
                 )
             )
     else:
-        spike = spike.view(-1, 8).to(torch.uint8)
-        for i in range(8):
-            spike_b += spike[:, i] << i
+        spike_b = cpu_pack_bits(spike)
 
     return spike_b, s_dtype, s_shape, s_padding
 
@@ -162,17 +203,17 @@ def bool_spike_to_float(spike_b: torch.Tensor, s_dtype: torch.dtype, s_shape: to
     :rtype: torch.Tensor
     """
     device_id = spike_b.get_device()
-    spike = torch.zeros(spike_b.numel() * 8, device=spike_b.device, dtype=s_dtype)
-    if s_dtype == torch.float:
-        kernel_codes = DataTypeConvertCUDACode.bool2float
-        kernel_name = 'bool2float'
-    elif s_dtype == torch.half:
-        kernel_codes = DataTypeConvertCUDACode.bool2half
-        kernel_name = 'bool2half'
-    else:
-        raise NotImplementedError
 
     if device_id >= 0 and cupy is not None:
+        if s_dtype == torch.float:
+            kernel_codes = DataTypeConvertCUDACode.bool2float
+            kernel_name = 'bool2float'
+        elif s_dtype == torch.half:
+            kernel_codes = DataTypeConvertCUDACode.bool2half
+            kernel_name = 'bool2half'
+        else:
+            raise NotImplementedError
+        spike = torch.zeros(spike_b.numel() * 8, device=spike_b.device, dtype=s_dtype)
         with cuda_utils.DeviceEnvironment(device_id):
             numel = spike_b.numel()
             blocks = cuda_utils.cal_blocks(numel)
@@ -192,11 +233,7 @@ def bool_spike_to_float(spike_b: torch.Tensor, s_dtype: torch.dtype, s_shape: to
                 )
             )
     else:
-        spike = spike.view(-1, 8)
-        for i in range(8):
-            spike[:, i] = spike_b % 2
-            spike_b = spike_b >> 1
-
+        spike = cpu_unpack_bits(spike_b, s_dtype)
 
     if s_padding != 0 and s_padding != 8:
         spike = spike[0: spike.numel() - s_padding]
@@ -11,6 +11,8 @@ Do not change them in this way, which will not make effect:
     cuda_threads = 512
 
 '''
+import os
+
 max_threads_number_for_datasets_preprocess = 16
 '''
 `max_threads_number_for_datasets_preprocess` defines the maximum threads for datasets preprocessing, which is 
@@ -20,6 +22,17 @@ max_threads_number_for_datasets_preprocess = 16
 Note that a too larger `max_threads_number_for_datasets_preprocess` will overload the disc and slow down the speed.
 '''
 
+datasets_preprocess_executor = 'thread'
+'''
+`datasets_preprocess_executor` defines the executor for integrating events to frames in `spikingjelly.datasets`, which
+can be 'thread' or 'process'. The decoding and integration hold the GIL in most cases, so a process pool is faster.
+The number of processes is at most `max_threads_number_for_datasets_preprocess` and the number of CPUs.
+
+The process pool only uses the fork start method, because spawn and forkserver re-execute the main script, which
+fails without the `if __name__ == '__main__':` guard. A thread pool will be used if fork is not available (e.g., on
+Windows), if the integration function can not be pickled (e.g., a lambda function), or if the process pool is broken.
+'''
+
 cuda_threads = 512
 '''
 `cuda_threads` defines the default threads number for CUDA kernel.
@@ -51,14 +64,52 @@ If `save_datasets_compressed == True`, events and frames in spikingjelly.dataset
 The compressed npz file consumes less memory in disk but more time in reading.
 '''
 
+datasets_event_storage = 'npz'
+'''
+`datasets_event_storage` defines how samples of a `spikingjelly.datasets.NeuromorphicDatasetFolder` with
+`data_type='event'` are read. It can be 'npz' or 'memmap'.
+
+If `datasets_event_storage == 'npz'`, each sample is read from its own npz file.
+
+If `datasets_event_storage == 'memmap'`, the npz files of each split will be packed once into a few large column files
+(one for each of t/x/y/p) and an index of offsets and labels, which are read by `np.memmap`. Random access is then
+zero-copy, and the page cache is shared by the workers of the data loader, which is much faster for datasets with many
+small samples or on network filesystems.
+'''
+
+datasets_frames_integration = 'eager'
+'''
+`datasets_frames_integration` defines how a `spikingjelly.datasets.NeuromorphicDatasetFolder` with `data_type='frame'`
+and `frames_number` or `duration` integrates events to frames. It can be 'eager' or 'lazy'.
+
+If `datasets_frames_integration == 'eager'`, the whole dataset is integrated to frames and saved in a new directory (e.g.,
+`frames_number_16_split_by_number`) when the dataset is created for the first time.
+
+If `datasets_frames_integration == 'lazy'`, no directory will be created, and frames are integrated from events when
+the sample is loaded. The integrated frames are cached in memory, see `datasets_frames_cache_bytes`. Events are read
+in the way defined by `datasets_event_storage`.
+'''
+
+datasets_frames_cache_bytes = 4 * 1024 ** 3
+'''
+`datasets_frames_cache_bytes` defines the maximum bytes of the frames cached in memory when
+`datasets_frames_integration == 'lazy'`. The cache is keyed by the sample and the integration parameters, and the least
+recently used frames are removed when the cache is full. If `datasets_frames_cache_bytes == 0`, frames will not be
+cached.
+
+Note that each worker process of the data loader has its own cache, and `datasets_frames_cache_bytes` is divided
+equally among the workers. The workers are re-created at each epoch by default, which discards their caches. Thus, the
+later epochs only hit the cache when `num_workers=0` or `persistent_workers=True` is used in `torch.utils.data.DataLoader`.
+'''
+
 save_spike_as_bool_in_neuron_kernel = False
 '''
-If `save_spike_as_bool_in_neuron_kernel == True`, the neuron kernel used in the neuron's cupy backend will save the spike as a bool, rather than float/half tensor for backward, which can reduce the memory consumption.
+If `save_spike_as_bool_in_neuron_kernel == True`, the neuron kernel used in the neuron's cupy backend, and the hard reset of the neuron's torch backend, will save the spike as a bool, rather than float/half tensor for backward, which can reduce the memory consumption.
 '''
 
 save_bool_spike_level = 0
 '''
-`save_bool_spike_level` take effects on SpikeConv/SpikeLinear, and on neuron's cupy kernel when `save_spike_as_bool_in_cuda_utils == True`.
+`save_bool_spike_level` take effects on SpikeConv/SpikeLinear, and on neuron's cupy kernel and torch backend when `save_spike_as_bool_in_neuron_kernel == True`. It works in the same way on CPU and CUDA devices.
 
 If `save_bool_spike_level == 0`, spikes will be saved in bool. Note that bool uses 8-bit, rather than 1-bit.
 
@@ -67,3 +118,9 @@ If `save_bool_spike_level == 1`, spikes will be saved in uint8 with each 8-bit s
 A larger `save_bool_spike_level` means less memory consumption but slower speed.
 '''
 
+autotune_cache_file = os.path.join(os.path.expanduser('~'), '.cache', 'spikingjelly', 'autotune.json')
+'''
+`autotune_cache_file` defines the json file where `spikingjelly.activation_based.functional.autotune` saves the fastest
+backends of layers. The decisions are keyed by the layer signature and the machine, and are reused in later runs to skip
+benchmarking. If `autotune_cache_file` is None, the decisions will not be saved.
+'''
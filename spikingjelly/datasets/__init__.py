@@ -1,4 +1,5 @@
 from torchvision.datasets import DatasetFolder
+from torchvision.datasets.folder import find_classes, make_dataset
 from typing import Callable, Dict, Optional, Tuple, Union
 from abc import abstractmethod
 import scipy.io
@@ -7,7 +8,10 @@ import numpy as np
 from torchvision.datasets import utils
 import torch.utils.data
 import os
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import pickle
 import time
 from torchvision import transforms
 import torch
@@ -15,6 +19,8 @@ from matplotlib import pyplot as plt
 import math
 import tqdm
 import shutil
+import functools
+from collections import OrderedDict
 from .. import configure
 import logging
 np_savez = np.savez_compressed if configure.save_datasets_compressed else np.savez
@@ -168,42 +174,34 @@ def load_aedat_v3(file_name: str) -> Dict:
         }
         while True:
             header = bin_f.read(28)
-            if not header or len(header) == 0:
+            if not header or len(header) < 28:
                 break
 
             # read header
-            e_type = struct.unpack('H', header[0:2])[0]
-            e_source = struct.unpack('H', header[2:4])[0]
-            e_size = struct.unpack('I', header[4:8])[0]
-            e_offset = struct.unpack('I', header[8:12])[0]
-            e_tsoverflow = struct.unpack('I', header[12:16])[0]
-            e_capacity = struct.unpack('I', header[16:20])[0]
-            e_number = struct.unpack('I', header[20:24])[0]
-            e_valid = struct.unpack('I', header[24:28])[0]
+            e_type, e_source, e_size, e_offset, e_tsoverflow, e_capacity, e_number, e_valid = struct.unpack('<HHIIIIII', header)
 
             data_length = e_capacity * e_size
             data = bin_f.read(data_length)
-            counter = 0
 
             if e_type == 1:
-                while data[counter:counter + e_size]:
-                    aer_data = struct.unpack('I', data[counter:counter + 4])[0]
-                    timestamp = struct.unpack('I', data[counter + 4:counter + 8])[0] | e_tsoverflow << 31
-                    x = (aer_data >> 17) & 0x00007FFF
-                    y = (aer_data >> 2) & 0x00007FFF
-                    pol = (aer_data >> 1) & 0x00000001
-                    counter = counter + e_size
-                    txyp['x'].append(x)
-                    txyp['y'].append(y)
-                    txyp['t'].append(timestamp)
-                    txyp['p'].append(pol)
+                # each polarity event is a 32-bit aer data and a 32-bit timestamp, followed by e_size - 8 bytes of padding
+                n_events = len(data) // e_size
+                events = np.frombuffer(data, dtype=np.dtype({
+                    'names': ['aer_data', 'timestamp'],
+                    'formats': ['<u4', '<u4'],
+                    'offsets': [0, 4],
+                    'itemsize': e_size
+                }), count=n_events)
+                aer_data = events['aer_data'].astype(np.int64)
+                txyp['x'].append((aer_data >> 17) & 0x00007FFF)
+                txyp['y'].append((aer_data >> 2) & 0x00007FFF)
+                txyp['p'].append((aer_data >> 1) & 0x00000001)
+                txyp['t'].append(events['timestamp'].astype(np.int64) | (e_tsoverflow << 31))
             else:
                 # non-polarity event packet, not implemented
                 pass
-        txyp['x'] = np.asarray(txyp['x'])
-        txyp['y'] = np.asarray(txyp['y'])
-        txyp['t'] = np.asarray(txyp['t'])
-        txyp['p'] = np.asarray(txyp['p'])
+        for key in txyp.keys():
+            txyp[key] = np.concatenate(txyp[key]) if txyp[key].__len__() > 0 else np.asarray([], dtype=np.int64)
         return txyp
 
 
@@ -305,19 +303,60 @@ def integrate_events_segment_to_frame(x: np.ndarray, y: np.ndarray, p: np.ndarra
     # frames = frames.reshape(2, height, width)
     # print('correct accumulation by bincount\n', frames)
 
-    frame = np.zeros(shape=[2, H * W])
-    x = x[j_l: j_r].astype(int)  # avoid overflow
-    y = y[j_l: j_r].astype(int)
-    p = p[j_l: j_r]
-    mask = []
-    mask.append(p == 0)
-    mask.append(np.logical_not(mask[0]))
-    for c in range(2):
-        position = y[mask[c]] * W + x[mask[c]]
-        events_number_per_pos = np.bincount(position)
-        frame[c][np.arange(events_number_per_pos.size)] += events_number_per_pos
+    x = x[j_l: j_r].astype(np.int64)  # avoid overflow
+    y = y[j_l: j_r].astype(np.int64)
+    p = (p[j_l: j_r] != 0).astype(np.int64)
+    position = (p * H + y) * W + x
+    frame = np.bincount(position, minlength=2 * H * W).astype(np.float64)
     return frame.reshape((2, H, W))
 
+
+def integrate_events_segments_to_frames(x: np.ndarray, y: np.ndarray, p: np.ndarray, H: int, W: int, j_l: np.ndarray, j_r: np.ndarray) -> np.ndarray:
+    '''
+    :param x: x-coordinate of events
+    :type x: numpy.ndarray
+    :param y: y-coordinate of events
+    :type y: numpy.ndarray
+    :param p: polarity of events
+    :type p: numpy.ndarray
+    :param H: height of the frame
+    :type H: int
+    :param W: weight of the frame
+    :type W: int
+    :param j_l: the start indices of the integral intervals, which are included
+    :type j_l: numpy.ndarray
+    :param j_r: the right indices of the integral intervals, which are not included
+    :type j_r: numpy.ndarray
+    :return: frames with ``shape = [j_l.size, 2, H, W]``
+    :rtype: np.ndarray
+    The vectorized version of :class:`integrate_events_segment_to_frame` for many intervals. The ``i``-th frame is
+    integrated from the events whose indices are in ``[j_l[i], j_r[i])``. All frames are integrated by a single
+    ``bincount`` over the combined index of ``(frame, p, y, x)``, rather than a Python loop over frames.
+
+    The number of events at each pixel is returned as ``np.uint16``, which is 4 times smaller than ``np.float64``. If
+    there are more than 65535 events at a pixel, ``np.int32`` is used.
+    '''
+    j_l = np.asarray(j_l, dtype=np.int64)
+    j_r = np.asarray(j_r, dtype=np.int64)
+    frames_num = j_l.size
+    lengths = np.maximum(j_r - j_l, 0)
+    # the frame index of each integrated event
+    frame_index = np.repeat(np.arange(frames_num, dtype=np.int64), lengths)
+    if frames_num > 0 and j_l[0] == 0 and j_r[-1] == x.size and np.all(j_l[1:] == j_r[:-1]) and np.all(j_r >= j_l):
+        # the intervals split all events without overlapping, which is the most common case
+        x, y = x.astype(np.int64), y.astype(np.int64)
+    else:
+        event_index = np.arange(frame_index.size, dtype=np.int64) + np.repeat(j_l - (np.cumsum(lengths) - lengths), lengths)
+        x, y, p = x[event_index].astype(np.int64), y[event_index].astype(np.int64), p[event_index]
+
+    position = ((frame_index * 2 + (p != 0)) * H + y) * W + x
+    frames = np.bincount(position, minlength=frames_num * 2 * H * W)
+    if frames.size > 0 and frames.max() > np.iinfo(np.uint16).max:
+        frames = frames.astype(np.int32)
+    else:
+        frames = frames.astype(np.uint16)
+    return frames.reshape((frames_num, 2, H, W))
+
 def cal_fixed_frames_number_segment_index(events_t: np.ndarray, split_by: str, frames_num: int) -> tuple:
     '''
     :param events_t: events' t
@@ -343,28 +382,21 @@ def cal_fixed_frames_number_segment_index(events_t: np.ndarray, split_by: str, f
         j_{l} & = [\\frac{N}{M}] \\cdot j \\\\
         j_{r} & = \\begin{cases} [\\frac{N}{M}] \\cdot (j + 1), & j <  M - 1 \\cr N, & j = M - 1 \\end{cases}
     '''
-    j_l = np.zeros(shape=[frames_num], dtype=int)
-    j_r = np.zeros(shape=[frames_num], dtype=int)
     N = events_t.size
 
     if split_by == 'number':
         di = N // frames_num
-        for i in range(frames_num):
-            j_l[i] = i * di
-            j_r[i] = j_l[i] + di
+        j_l = np.arange(frames_num, dtype=int) * di
+        j_r = j_l + di
         j_r[-1] = N
 
     elif split_by == 'time':
+        # events_t is sorted, and the boundaries of all frames are found by a single searchsorted
         dt = (events_t[-1] - events_t[0]) // frames_num
-        idx = np.arange(N)
-        for i in range(frames_num):
-            t_l = dt * i + events_t[0]
-            t_r = t_l + dt
-            mask = np.logical_and(events_t >= t_l, events_t < t_r)
-            idx_masked = idx[mask]
-            j_l[i] = idx_masked[0]
-            j_r[i] = idx_masked[-1] + 1
-
+        t_l = dt * np.arange(frames_num) + events_t[0]
+        t_r = t_l + dt
+        j_l = np.searchsorted(events_t, t_l, side='left').astype(int)
+        j_r = np.searchsorted(events_t, t_r, side='left').astype(int)
         j_r[-1] = N
     else:
         raise NotImplementedError
@@ -385,14 +417,11 @@ def integrate_events_by_fixed_frames_number(events: Dict, split_by: str, frames_
     :type W: int
     :return: frames
     :rtype: np.ndarray
-    Integrate events to frames by fixed frames number. See :class:`cal_fixed_frames_number_segment_index` and :class:`integrate_events_segment_to_frame` for more details.
+    Integrate events to frames by fixed frames number. See :class:`cal_fixed_frames_number_segment_index` and :class:`integrate_events_segments_to_frames` for more details.
     '''
     t, x, y, p = (events[key] for key in ('t', 'x', 'y', 'p'))
     j_l, j_r = cal_fixed_frames_number_segment_index(t, split_by, frames_num)
-    frames = np.zeros([frames_num, 2, H, W])
-    for i in range(frames_num):
-        frames[i] = integrate_events_segment_to_frame(x, y, p, H, W, j_l[i], j_r[i])
-    return frames
+    return integrate_events_segments_to_frames(x, y, p, H, W, j_l, j_r)
 
 def integrate_events_file_to_frames_file_by_fixed_frames_number(loader: Callable, events_np_file: str, output_dir: str, split_by: str, frames_num: int, H: int, W: int, print_save: bool = False) -> None:
     '''
@@ -416,7 +445,7 @@ def integrate_events_file_to_frames_file_by_fixed_frames_number(loader: Callable
     Integrate a events file to frames by fixed frames number and save it. See :class:`cal_fixed_frames_number_segment_index` and :class:`integrate_events_segment_to_frame` for more details.
     '''
     fname = os.path.join(output_dir, os.path.basename(events_np_file))
-    np_savez(fname, frames=integrate_events_by_fixed_frames_number(loader(events_np_file), split_by, frames_num, H, W))
+    np_savez_atomically(fname, frames=integrate_events_by_fixed_frames_number(loader(events_np_file), split_by, frames_num, H, W))
     if print_save:
         print(f'Frames [{fname}] saved.')
 
@@ -434,7 +463,7 @@ def integrate_events_by_fixed_duration(events: Dict, duration: int, H: int, W: i
     :type W: int
     :return: frames
     :rtype: np.ndarray
-    Integrate events to frames by fixed time duration of each frame.
+    Integrate events to frames by fixed time duration of each frame. See :class:`integrate_events_segments_to_frames` for more details.
     '''
     x = events['x']
     y = events['y']
@@ -445,17 +474,11 @@ def integrate_events_by_fixed_duration(events: Dict, duration: int, H: int, W: i
     t = t - t.min()
 
     frames_num = int(math.ceil(t[-1] / duration))
-    frames = np.zeros([frames_num, 2, H, W])
     frame_index = t // duration
-    left = 0
-
-    for i in range(frames_num - 1):
-        right = np.searchsorted(frame_index, i + 1, side='left')
-        frames[i] = integrate_events_segment_to_frame(x, y, p, H, W, left, right)
-        left = right
-
-    frames[-1] = integrate_events_segment_to_frame(x, y, p, H, W, left, N)
-    return frames
+    # the events after the last boundary are integrated to the last frame
+    j_l = np.searchsorted(frame_index, np.arange(frames_num), side='left')
+    j_r = np.append(j_l[1:], N)
+    return integrate_events_segments_to_frames(x, y, p, H, W, j_l, j_r)
 
 
 
@@ -481,15 +504,195 @@ def integrate_events_file_to_frames_file_by_fixed_duration(loader: Callable, eve
     frames = integrate_events_by_fixed_duration(loader(events_np_file), duration, H, W)
     fname, _ = os.path.splitext(os.path.basename(events_np_file))
     fname = os.path.join(output_dir, f'{fname}_{frames.shape[0]}.npz')
-    np_savez(fname, frames=frames)
+    np_savez_atomically(fname, frames=frames)
     if print_save:
         print(f'Frames [{fname}] saved.')
     return frames.shape[0]
 
 def save_frames_to_npz_and_print(fname: str, frames):
-    np_savez(fname, frames=frames)
+    np_savez_atomically(fname, frames=frames)
     print(f'Frames [{fname}] saved.')
 
+
+def integrate_events_file_to_frames_file_by_custom_function(custom_integrate_function: Callable, events_np_file: str, output_dir: str, H: int, W: int, print_save: bool = False) -> None:
+    '''
+    :param custom_integrate_function: a user-defined function that inputs are ``events, H, W``, and returns frames
+    :type custom_integrate_function: Callable
+    :param events_np_file: path of the events np file
+    :type events_np_file: str
+    :param output_dir: output directory for saving the frames
+    :type output_dir: str
+    :param H: the height of frame
+    :type H: int
+    :param W: the weight of frame
+    :type W: int
+    :param print_save: If ``True``, this function will print saved files' paths.
+    :type print_save: bool
+    :return: None
+    Integrate a events file to frames by ``custom_integrate_function`` and save it.
+    '''
+    fname = os.path.join(output_dir, os.path.basename(events_np_file))
+    np_savez_atomically(fname, frames=custom_integrate_function(np.load(events_np_file), H, W))
+    if print_save:
+        print(f'Frames [{fname}] saved.')
+
+
+def np_savez_atomically(fname: str, **kwargs):
+    '''
+    :param fname: path of the npz file. ``.npz`` will be appended if ``fname`` does not end with ``.npz``
+    :type fname: str
+    :return: None
+    Save arrays by ``np_savez`` to a temporary file, and then rename it to ``fname``. Thus, an interrupted saving will
+    not leave a broken ``fname``.
+    '''
+    if not fname.endswith('.npz'):
+        fname = fname + '.npz'
+    tmp_fname = fname + '.tmp'
+    with open(tmp_fname, 'wb') as f:
+        np_savez(f, **kwargs)
+    os.replace(tmp_fname, fname)
+
+
+# the manifest in a preprocessed directory, which records the finished files and ends with preprocess_manifest_complete
+preprocess_manifest_name = 'preprocess_manifest.txt'
+preprocess_manifest_complete = '# complete'
+
+
+def read_preprocess_manifest(output_root: str) -> Tuple:
+    '''
+    :param output_root: the preprocessed directory
+    :type output_root: str
+    :return: a tuple ``(finished, complete)``. ``finished`` is a set of the finished files recorded in the manifest, or
+        ``None`` if there is no manifest (e.g., the directory is created by older versions of SpikingJelly).
+        ``complete`` is ``True`` if the preprocessing is complete
+    :rtype: tuple
+    '''
+    manifest = os.path.join(output_root, preprocess_manifest_name)
+    if not os.path.exists(manifest):
+        return None, False
+    with open(manifest, 'r') as f:
+        lines = [line.rstrip('\n') for line in f]
+    complete = preprocess_manifest_complete in lines
+    return set(line for line in lines if line and line != preprocess_manifest_complete), complete
+
+
+def run_preprocess_tasks(executor, preprocess_function: Callable, rel_files: list, events_np_files: list, output_dirs: list, manifest) -> None:
+    '''
+    :param executor: the executor, which will be shut down after all tasks are finished
+    :param preprocess_function: a function whose inputs are ``events_np_file, output_dir``
+    :type preprocess_function: Callable
+    :param rel_files: the relative paths of the events files, which are written to ``manifest`` when finished
+    :type rel_files: list
+    :param events_np_files: the paths of the events files
+    :type events_np_files: list
+    :param output_dirs: the output directories
+    :type output_dirs: list
+    :param manifest: the opened manifest file
+    :return: None
+    Run ``preprocess_function`` on all files by ``executor`` with tasks submitted in chunks, and record the finished files.
+    '''
+    with executor:
+        print(f'Start {type(executor).__name__} with max workers = [{executor._max_workers}].')
+        chunksize = max(1, events_np_files.__len__() // (executor._max_workers * 4))
+        try:
+            for rel_file, _ in zip(rel_files, executor.map(preprocess_function, events_np_files, output_dirs, chunksize=chunksize)):
+                manifest.write(rel_file + '\n')
+                manifest.flush()
+        except BaseException:
+            # do not wait for the pending tasks, whose outputs will not be recorded
+            try:
+                executor.shutdown(wait=True, cancel_futures=True)
+            except TypeError:
+                # cancel_futures requires python >= 3.9
+                pass
+            raise
+
+
+def preprocess_events_files(events_np_root: str, output_root: str, preprocess_function: Callable) -> None:
+    '''
+    :param events_np_root: Root directory path which saves events files
+    :type events_np_root: str
+    :param output_root: Root directory path which saves the outputs, which has the same directory structure with that
+        of ``events_np_root``
+    :type output_root: str
+    :param preprocess_function: a function whose inputs are ``events_np_file, output_dir``, which processes an events
+        file and saves the outputs in ``output_dir``
+    :type preprocess_function: Callable
+    :return: None
+    Apply ``preprocess_function`` on all ``.npz`` and ``.npy`` files in ``events_np_root`` by the executor defined by
+    ``spikingjelly.configure.datasets_preprocess_executor``. The tasks are submitted in chunks.
+
+    The finished files are recorded in a manifest in ``output_root``, which is marked as complete after all files are
+    finished. If the preprocessing is interrupted, the next call will resume from the unfinished files, rather than
+    trusting the existing directory. ``preprocess_function`` should save files atomically, e.g., by
+    :class:`np_savez_atomically`. A directory without the manifest is regarded as complete for compatibility.
+    '''
+    if os.path.exists(output_root):
+        finished, complete = read_preprocess_manifest(output_root)
+        if finished is None or complete:
+            print(f'The directory [{output_root}] already exists.')
+            return
+        print(f'The directory [{output_root}] is not complete. Resume from [{finished.__len__()}] finished files.')
+    else:
+        os.mkdir(output_root)
+        print(f'Mkdir [{output_root}].')
+        open(os.path.join(output_root, preprocess_manifest_name), 'w').close()
+        finished = set()
+
+    # create the same directory structure
+    create_same_directory_structure(events_np_root, output_root)
+
+    rel_files = []
+    events_np_files = []
+    output_dirs = []
+    for e_root, e_dirs, e_files in os.walk(events_np_root):
+        for e_file in sorted(e_files):
+            if not e_file.endswith(('.npz', '.npy')):
+                continue
+            events_np_file = os.path.join(e_root, e_file)
+            rel_file = os.path.relpath(events_np_file, events_np_root)
+            if rel_file not in finished:
+                rel_files.append(rel_file)
+                events_np_files.append(events_np_file)
+                output_dirs.append(os.path.join(output_root, os.path.relpath(e_root, events_np_root)))
+
+    max_workers = configure.max_threads_number_for_datasets_preprocess
+    mp_context = None
+    if configure.datasets_preprocess_executor == 'process':
+        # only the fork start method is used. With spawn/forkserver, the main script is re-executed in each worker,
+        # which fails if the script does not have the `if __name__ == '__main__':` guard
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            print('The fork start method is not available, and ThreadPoolExecutor will be used.')
+        else:
+            try:
+                pickle.dumps(preprocess_function)
+                mp_context = multiprocessing.get_context('fork')
+            except Exception as e:
+                print(f'The preprocessing function can not be pickled, and ThreadPoolExecutor will be used. {e}')
+    elif configure.datasets_preprocess_executor != 'thread':
+        raise ValueError(f"configure.datasets_preprocess_executor should be 'process' or 'thread', but got {configure.datasets_preprocess_executor}!")
+
+    t_ckp = time.time()
+    with open(os.path.join(output_root, preprocess_manifest_name), 'a') as manifest:
+        if mp_context is not None:
+            try:
+                executor = ProcessPoolExecutor(max_workers=max(min(max_workers, os.cpu_count() or 1), 1), mp_context=mp_context)
+                run_preprocess_tasks(executor, preprocess_function, rel_files, events_np_files, output_dirs, manifest)
+                rel_files = []
+            except BrokenProcessPool as e:
+                print(f'The process pool is broken, and ThreadPoolExecutor will be used for the unfinished files. {e}')
+                finished, _ = read_preprocess_manifest(output_root)
+                unfinished = [i for i, rel_file in enumerate(rel_files) if rel_file not in finished]
+                rel_files = [rel_files[i] for i in unfinished]
+                events_np_files = [events_np_files[i] for i in unfinished]
+                output_dirs = [output_dirs[i] for i in unfinished]
+
+        if rel_files.__len__() > 0:
+            run_preprocess_tasks(ThreadPoolExecutor(max_workers=max_workers), preprocess_function, rel_files, events_np_files, output_dirs, manifest)
+        manifest.write(preprocess_manifest_complete + '\n')
+
+    print(f'Used time = [{round(time.time() - t_ckp, 2)}s].')
+
 def create_same_directory_structure(source_dir: str, target_dir: str) -> None:
     '''
     :param source_dir: Path of the directory that be copied from
@@ -503,8 +706,9 @@ def create_same_directory_structure(source_dir: str, target_dir: str) -> None:
         source_sub_dir = os.path.join(source_dir, sub_dir_name)
         if os.path.isdir(source_sub_dir):
             target_sub_dir = os.path.join(target_dir, sub_dir_name)
-            os.mkdir(target_sub_dir)
-            print(f'Mkdir [{target_sub_dir}].')
+            if not os.path.exists(target_sub_dir):
+                os.mkdir(target_sub_dir)
+                print(f'Mkdir [{target_sub_dir}].')
             create_same_directory_structure(source_sub_dir, target_sub_dir)
 
 def split_to_train_test_set(train_ratio: float, origin_dataset: torch.utils.data.Dataset, num_classes: int, random_split: bool = False):
@@ -691,6 +895,169 @@ def padded_sequence_mask(sequence_len: torch.Tensor, T=None):
         t_seq = torch.arange(0, T).unsqueeze(1).repeat(1, N).to(sequence_len)  # [T, N]
         return t_seq < sequence_len.unsqueeze(0).repeat(T, 1)
 
+class EventMemmapStore:
+    def __init__(self, store_dir: str):
+        '''
+        :param store_dir: the directory created by :class:`EventMemmapStore.build`
+        :type store_dir: str
+
+        A split of events packed into a few large column files, which are read by ``np.memmap``. The ``i``-th sample is
+        a dict whose keys are the column names (e.g., ``['t', 'x', 'y', 'p']``) and values are read-only
+        ``numpy.ndarray`` views of the column files, which are zero-copy. The column files are opened lazily in each
+        process, and are not pickled with this object. Thus, the workers of a data loader share the page cache.
+        '''
+        self.store_dir = store_dir
+        index = np.load(os.path.join(store_dir, 'index.npz'))
+        self.offsets = index['offsets']
+        self.labels = index['labels']
+        self.names = index['names'].tolist()
+        self.classes = index['classes'].tolist()
+        self.columns = index['columns'].tolist()
+        self.dtypes = index['dtypes'].tolist()
+        self._memmaps = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_memmaps'] = None
+        return state
+
+    def memmaps(self) -> Dict:
+        if self._memmaps is None:
+            total = int(self.offsets[-1])
+            self._memmaps = {}
+            for key, dtype in zip(self.columns, self.dtypes):
+                if total > 0:
+                    self._memmaps[key] = np.memmap(os.path.join(self.store_dir, f'{key}.bin'), dtype=dtype, mode='r', shape=(total,))
+                else:
+                    self._memmaps[key] = np.zeros([0], dtype=dtype)
+        return self._memmaps
+
+    def __len__(self):
+        return self.labels.size
+
+    def __getitem__(self, i: int) -> Dict:
+        start = self.offsets[i]
+        end = self.offsets[i + 1]
+        return {key: value[start: end] for key, value in self.memmaps().items()}
+
+    @staticmethod
+    def build(source_dir: str, store_dir: str, loader: Callable = np.load):
+        '''
+        :param source_dir: the directory of a split whose sub-directories are classes and contain ``.npz`` or ``.npy`` files
+        :type source_dir: str
+        :param store_dir: the directory for saving the column files and the index
+        :type store_dir: str
+        :param loader: a function that loads a sample as a dict from a file in ``source_dir``
+        :type loader: Callable
+        :return: None
+
+        Pack all samples in ``source_dir`` into ``store_dir``. The samples are in the same order, and have the same
+        labels, as those of a ``DatasetFolder`` on ``source_dir``. The columns and their dtypes are determined by the
+        first sample. The files are written to a temporary directory which is renamed to ``store_dir`` at last, so an
+        interrupted build will not leave a broken store.
+        '''
+        classes, class_to_idx = find_classes(source_dir)
+        samples = make_dataset(source_dir, class_to_idx, extensions=('.npz', '.npy'))
+
+        tmp_dir = store_dir + '.tmp'
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+
+        offsets = np.zeros([samples.__len__() + 1], dtype=np.int64)
+        labels = np.asarray([target for _, target in samples], dtype=np.int64)
+        names = [os.path.relpath(path, source_dir) for path, _ in samples]
+        columns = None
+        dtypes = None
+        files = None
+        try:
+            for i, (path, _) in enumerate(samples):
+                events = loader(path)
+                if columns is None:
+                    columns = [key for key in ('t', 'x', 'y', 'p') if key in events]
+                    dtypes = [np.asarray(events[key]).dtype.str for key in columns]
+                    files = [open(os.path.join(tmp_dir, f'{key}.bin'), 'wb') for key in columns]
+
+                for key, dtype, f in zip(columns, dtypes, files):
+                    f.write(np.ascontiguousarray(events[key], dtype=dtype).tobytes())
+                offsets[i + 1] = offsets[i] + np.asarray(events[columns[0]]).size
+        finally:
+            if files is not None:
+                for f in files:
+                    f.close()
+
+        if columns is None:
+            columns = ['t', 'x', 'y', 'p']
+            dtypes = [np.dtype(np.int64).str] * 4
+
+        np.savez(os.path.join(tmp_dir, 'index.npz'), offsets=offsets, labels=labels, names=np.asarray(names, dtype=str),
+                 classes=np.asarray(classes, dtype=str), columns=np.asarray(columns, dtype=str),
+                 dtypes=np.asarray(dtypes, dtype=str))
+        if os.path.exists(store_dir):
+            # an incomplete store, e.g., created by older versions
+            shutil.rmtree(store_dir)
+        os.replace(tmp_dir, store_dir)
+
+    @staticmethod
+    def is_complete(store_dir: str) -> bool:
+        '''
+        :param store_dir: the directory of the store
+        :type store_dir: str
+        :return: whether the store in ``store_dir`` is completely built
+        :rtype: bool
+
+        The index is written after all column files, so the store is complete if the index exists.
+        '''
+        return os.path.exists(os.path.join(store_dir, 'index.npz'))
+
+
+class FramesLRUCache:
+    def __init__(self, max_bytes: int):
+        '''
+        :param max_bytes: the maximum total bytes of cached frames
+        :type max_bytes: int
+
+        A least recently used cache of frames, which is keyed by the sample and the integration parameters. When the
+        total bytes exceed ``max_bytes``, the least recently used frames will be removed. Frames larger than
+        ``max_bytes`` are not cached.
+        '''
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.frames = OrderedDict()
+
+    def get(self, key):
+        frames = self.frames.get(key)
+        if frames is not None:
+            self.frames.move_to_end(key)
+        return frames
+
+    def put(self, key, frames: np.ndarray):
+        if frames.nbytes > self.max_bytes:
+            return
+        if key in self.frames:
+            self.n_bytes -= self.frames.pop(key).nbytes
+        self.frames[key] = frames
+        self.n_bytes += frames.nbytes
+        self.evict()
+
+    def evict(self):
+        while self.n_bytes > self.max_bytes:
+            _, removed = self.frames.popitem(last=False)
+            self.n_bytes -= removed.nbytes
+
+    def set_max_bytes(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.evict()
+
+    def clear(self):
+        self.frames.clear()
+        self.n_bytes = 0
+
+
+# shared by all datasets in this process, e.g., datasets with different frames_number
+lazy_frames_cache = FramesLRUCache(configure.datasets_frames_cache_bytes)
+
+
 class NeuromorphicDatasetFolder(DatasetFolder):
     def __init__(
             self,
@@ -740,12 +1107,21 @@ class NeuromorphicDatasetFolder(DatasetFolder):
         all abstract methods. Users can refer to :class:`spikingjelly.datasets.dvs128_gesture.DVS128Gesture`.
         If ``data_type == 'event'``
             the sample in this dataset is a dict whose keys are ``['t', 'x', 'y', 'p']`` and values are ``numpy.ndarray``.
+            If ``spikingjelly.configure.datasets_event_storage == 'memmap'``, the samples of the split are packed into an
+            :class:`EventMemmapStore` in the ``events_memmap`` directory in ``root`` directory at the first time, and the
+            values are read-only views of ``np.memmap``.
         If ``data_type == 'frame'`` and ``frames_number`` is not ``None``
             events will be integrated to frames with fixed frames number. ``split_by`` will define how to split events.
             See :class:`cal_fixed_frames_number_segment_index` for
             more details.
         If ``data_type == 'frame'``, ``frames_number`` is ``None``, and ``duration`` is not ``None``
             events will be integrated to frames with fixed time duration.
+        If ``data_type == 'frame'`` and ``spikingjelly.configure.datasets_frames_integration == 'lazy'``
+            when ``frames_number`` or ``duration`` is used, events will be integrated to frames when the sample is loaded,
+            rather than saved to a new directory, and the frames will be cached in :class:`FramesLRUCache`. Each worker
+            process of the data loader has its own cache with ``1 / num_workers`` of
+            ``spikingjelly.configure.datasets_frames_cache_bytes``. The cache is kept across epochs only if
+            ``num_workers == 0`` or ``persistent_workers=True``, because other workers are re-created at each epoch.
         If ``data_type == 'frame'``, ``frames_number`` is ``None``, ``duration`` is ``None``, and ``custom_integrate_function`` is not ``None``:
             events will be integrated by the user-defined function and saved to the ``custom_integrated_frames_dir_name`` directory in ``root`` directory.
             Here is an example from SpikingJelly's tutorials:
@@ -772,6 +1148,12 @@ class NeuromorphicDatasetFolder(DatasetFolder):
 
         events_np_root = os.path.join(root, 'events_np')
 
+        finished, complete = read_preprocess_manifest(events_np_root)
+        if finished is not None and not complete:
+            # the conversion is defined by the subclass and can not be resumed by files
+            print(f'The directory [{events_np_root}] is not complete. Remove it and convert again.')
+            shutil.rmtree(events_np_root)
+
         if not os.path.exists(events_np_root):
 
             download_root = os.path.join(root, 'download')
@@ -831,10 +1213,15 @@ class NeuromorphicDatasetFolder(DatasetFolder):
             # Now let us convert the origin binary files to npz files
             os.mkdir(events_np_root)
             print(f'Mkdir [{events_np_root}].')
+            open(os.path.join(events_np_root, preprocess_manifest_name), 'w').close()
             print(f'Start to convert the origin data from [{extract_root}] to [{events_np_root}] in np.ndarray format.')
             self.create_events_np_files(extract_root, events_np_root)
+            with open(os.path.join(events_np_root, preprocess_manifest_name), 'a') as manifest:
+                manifest.write(preprocess_manifest_complete + '\n')
 
         H, W = self.get_H_W()
+        # (the key of the integration parameters, the integration function) when frames are integrated lazily
+        lazy_integration = None
 
         if data_type == 'event':
             _root = events_np_root
@@ -843,40 +1230,33 @@ class NeuromorphicDatasetFolder(DatasetFolder):
             _target_transform = target_transform
 
         elif data_type == 'frame':
-            if frames_number is not None:
-                assert frames_number > 0 and isinstance(frames_number, int)
-                assert split_by == 'time' or split_by == 'number'
-                frames_np_root = os.path.join(root, f'frames_number_{frames_number}_split_by_{split_by}')
-                if os.path.exists(frames_np_root):
-                    print(f'The directory [{frames_np_root}] already exists.')
+            if configure.datasets_frames_integration == 'lazy' and (frames_number is not None or duration is not None):
+                if frames_number is not None:
+                    assert frames_number > 0 and isinstance(frames_number, int)
+                    assert split_by == 'time' or split_by == 'number'
+                    lazy_integration = (('frames_number', frames_number, split_by, H, W), functools.partial(
+                        integrate_events_by_fixed_frames_number, split_by=split_by, frames_num=frames_number, H=H, W=W))
                 else:
-                    os.mkdir(frames_np_root)
-                    print(f'Mkdir [{frames_np_root}].')
-
-                    # create the same directory structure
-                    create_same_directory_structure(events_np_root, frames_np_root)
-
-                    # use multi-thread to accelerate
-                    t_ckp = time.time()
-                    with ThreadPoolExecutor(max_workers=configure.max_threads_number_for_datasets_preprocess) as tpe:
-                        sub_threads = []
-                        print(f'Start ThreadPoolExecutor with max workers = [{tpe._max_workers}].')
-                        for e_root, e_dirs, e_files in os.walk(events_np_root):
-                            if e_files.__len__() > 0:
-                                output_dir = os.path.join(frames_np_root, os.path.relpath(e_root, events_np_root))
-                                for e_file in e_files:
-                                    events_np_file = os.path.join(e_root, e_file)
-                                    print(f'Start to integrate [{events_np_file}] to frames and save to [{output_dir}].')
-                                    sub_threads.append(tpe.submit(integrate_events_file_to_frames_file_by_fixed_frames_number, self.load_events_np, events_np_file, output_dir, split_by, frames_number, H, W, True))
-                        for sub_thread in sub_threads:
-                            if sub_thread.exception():
-                                print(sub_thread.exception())
-                                exit(-1)
-
+                    assert duration > 0 and isinstance(duration, int)
+                    lazy_integration = (('duration', duration, H, W), functools.partial(
+                        integrate_events_by_fixed_duration, duration=duration, H=H, W=W))
 
+                lazy_frames_cache.set_max_bytes(configure.datasets_frames_cache_bytes)
+                _root = events_np_root
+                _loader = self.load_events_np
+                _transform = transform
+                _target_transform = target_transform
 
+            elif configure.datasets_frames_integration != 'eager':
+                raise ValueError(f"configure.datasets_frames_integration should be 'eager' or 'lazy', but got {configure.datasets_frames_integration}!")
 
-                    print(f'Used time = [{round(time.time() - t_ckp, 2)}s].')
+            elif frames_number is not None:
+                assert frames_number > 0 and isinstance(frames_number, int)
+                assert split_by == 'time' or split_by == 'number'
+                frames_np_root = os.path.join(root, f'frames_number_{frames_number}_split_by_{split_by}')
+                preprocess_events_files(events_np_root, frames_np_root, functools.partial(
+                    integrate_events_file_to_frames_file_by_fixed_frames_number, self.load_events_np,
+                    split_by=split_by, frames_num=frames_number, H=H, W=W, print_save=True))
 
                 _root = frames_np_root
                 _loader = load_npz_frames
@@ -886,32 +1266,9 @@ class NeuromorphicDatasetFolder(DatasetFolder):
             elif duration is not None:
                 assert duration > 0 and isinstance(duration, int)
                 frames_np_root = os.path.join(root, f'duration_{duration}')
-                if os.path.exists(frames_np_root):
-                    print(f'The directory [{frames_np_root}] already exists.')
-
-                else:
-                    os.mkdir(frames_np_root)
-                    print(f'Mkdir [{frames_np_root}].')
-                    # create the same directory structure
-                    create_same_directory_structure(events_np_root, frames_np_root)
-                    # use multi-thread to accelerate
-                    t_ckp = time.time()
-                    with ThreadPoolExecutor(max_workers=configure.max_threads_number_for_datasets_preprocess) as tpe:
-                        print(f'Start ThreadPoolExecutor with max workers = [{tpe._max_workers}].')
-                        sub_threads = []
-                        for e_root, e_dirs, e_files in os.walk(events_np_root):
-                            if e_files.__len__() > 0:
-                                output_dir = os.path.join(frames_np_root, os.path.relpath(e_root, events_np_root))
-                                for e_file in e_files:
-                                    events_np_file = os.path.join(e_root, e_file)
-                                    print(f'Start to integrate [{events_np_file}] to frames and save to [{output_dir}].')
-                                    sub_threads.append(tpe.submit(integrate_events_file_to_frames_file_by_fixed_duration, self.load_events_np, events_np_file, output_dir, duration, H, W, True))
-                        for sub_thread in sub_threads:
-                            if sub_thread.exception():
-                                print(sub_thread.exception())
-                                exit(-1)
-
-                    print(f'Used time = [{round(time.time() - t_ckp, 2)}s].')
+                preprocess_events_files(events_np_root, frames_np_root, functools.partial(
+                    integrate_events_file_to_frames_file_by_fixed_duration, self.load_events_np,
+                    duration=duration, H=H, W=W, print_save=True))
 
                 _root = frames_np_root
                 _loader = load_npz_frames
@@ -923,39 +1280,15 @@ class NeuromorphicDatasetFolder(DatasetFolder):
                     custom_integrated_frames_dir_name = custom_integrate_function.__name__
 
                 frames_np_root = os.path.join(root, custom_integrated_frames_dir_name)
-                if os.path.exists(frames_np_root):
-                    print(f'The directory [{frames_np_root}] already exists.')
-                else:
-                    os.mkdir(frames_np_root)
-                    print(f'Mkdir [{frames_np_root}].')
-                    # create the same directory structure
-                    create_same_directory_structure(events_np_root, frames_np_root)
-                    # use multi-thread to accelerate
-                    t_ckp = time.time()
-                    with ThreadPoolExecutor(max_workers=configure.max_threads_number_for_datasets_preprocess) as tpe:
-                        print(f'Start ThreadPoolExecutor with max workers = [{tpe._max_workers}].')
-                        sub_threads = []
-                        for e_root, e_dirs, e_files in os.walk(events_np_root):
-                            if e_files.__len__() > 0:
-                                output_dir = os.path.join(frames_np_root, os.path.relpath(e_root, events_np_root))
-                                for e_file in e_files:
-                                    events_np_file = os.path.join(e_root, e_file)
-                                    print(
-                                        f'Start to integrate [{events_np_file}] to frames and save to [{output_dir}].')
-                                    sub_threads.append(tpe.submit(save_frames_to_npz_and_print, os.path.join(output_dir, os.path.basename(events_np_file)), custom_integrate_function(np.load(events_np_file), H, W)))
-
-                        for sub_thread in sub_threads:
-                            if sub_thread.exception():
-                                print(sub_thread.exception())
-                                exit(-1)
-                    print(f'Used time = [{round(time.time() - t_ckp, 2)}s].')
+                preprocess_events_files(events_np_root, frames_np_root, functools.partial(
+                    integrate_events_file_to_frames_file_by_custom_function, custom_integrate_function,
+                    H=H, W=W, print_save=True))
 
                 _root = frames_np_root
                 _loader = load_npz_frames
                 _transform = transform
                 _target_transform = target_transform
 
-
             else:
                 raise ValueError('At least one of "frames_number", "duration" and "custom_integrate_function" should not be None.')
 
@@ -967,8 +1300,74 @@ class NeuromorphicDatasetFolder(DatasetFolder):
         else:
             _root = self.set_root_when_train_is_none(_root)
 
-        super().__init__(root=_root, loader=_loader, extensions=('.npz', '.npy'), transform=_transform,
-                         target_transform=_target_transform)
+        self.lazy_integration = lazy_integration
+        read_events = data_type == 'event' or lazy_integration is not None
+        if read_events and configure.datasets_event_storage == 'memmap':
+            split_name = os.path.normpath(os.path.relpath(_root, events_np_root))
+            if split_name == '.':
+                # the dataset does not provide train/test division
+                split_name = 'all'
+            store_dir = os.path.join(root, 'events_memmap', split_name)
+            if EventMemmapStore.is_complete(store_dir):
+                print(f'The directory [{store_dir}] already exists.')
+            else:
+                t_ckp = time.time()
+                print(f'Start to pack [{_root}] to [{store_dir}].')
+                os.makedirs(os.path.dirname(os.path.abspath(store_dir)), exist_ok=True)
+                EventMemmapStore.build(_root, store_dir, self.load_events_np)
+                print(f'Used time = [{round(time.time() - t_ckp, 2)}s].')
+
+            # the samples are read from the store, and the npz files are not scanned again
+            self.event_store = EventMemmapStore(store_dir)
+            super(DatasetFolder, self).__init__(root=_root, transform=_transform, target_transform=_target_transform)
+            self.loader = _loader
+            self.extensions = ('.npz', '.npy')
+            self.classes = self.event_store.classes
+            self.class_to_idx = {cls_name: i for i, cls_name in enumerate(self.classes)}
+            self.samples = [(os.path.join(_root, name), int(label)) for name, label in zip(self.event_store.names, self.event_store.labels)]
+            self.targets = [s[1] for s in self.samples]
+            self.imgs = self.samples
+
+        elif read_events and configure.datasets_event_storage != 'npz':
+            raise ValueError(f"configure.datasets_event_storage should be 'npz' or 'memmap', but got {configure.datasets_event_storage}!")
+
+        else:
+            self.event_store = None
+            super().__init__(root=_root, loader=_loader, extensions=('.npz', '.npy'), transform=_transform,
+                             target_transform=_target_transform)
+
+    def __getitem__(self, index: int):
+        if self.event_store is None and self.lazy_integration is None:
+            return super().__getitem__(index)
+
+        path, target = self.samples[index]
+        if self.lazy_integration is None:
+            sample = self.event_store[index]
+        else:
+            key = (path, self.lazy_integration[0])
+            sample = lazy_frames_cache.get(key)
+            if sample is None:
+                events = self.loader(path) if self.event_store is None else self.event_store[index]
+                # cache the compact integer frames returned by the integration, which are smaller than float32
+                sample = self.lazy_integration[1](events)
+                worker_info = torch.utils.data.get_worker_info()
+                if worker_info is not None:
+                    # each worker of the data loader has its own cache, which shares the budget with other workers
+                    lazy_frames_cache.set_max_bytes(configure.datasets_frames_cache_bytes // worker_info.num_workers)
+                lazy_frames_cache.put(key, sample)
+            # astype returns a new array, so the cached frames will not be modified by an in-place transform
+            sample = sample.astype(np.float32)
+
+        if self.transform is not None:
+            sample = self.transform(sample)
+        if self.target_transform is not None:
+            target = self.target_transform(target)
+        return sample, target
+
+    def __len__(self):
+        if self.event_store is None:
+            return super().__len__()
+        return self.event_store.__len__()
 
     def set_root_when_train_is_none(self, _root: str):
         return _root